@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'amity_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from realtime.asgi import RealtimeRouter  # noqa: E402 (needs the app registry loaded above)
+
+application = RealtimeRouter(django_application)
@@ -0,0 +1,52 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, migrations
+from django.db.models import CharField, F, Func, Value
+
+
+def conditional_update_returning(queryset, field, value, returning=('id',), increment=()):
+    """
+    Sets `field` to `value` and adds one to the `increment` fields for the rows of `queryset` that have
+    a different value, in one UPDATE ... RETURNING statement. Returns the changed rows as tuples of the
+    `returning` columns.
+    """
+    model = queryset.model
+    quote = connection.ops.quote_name
+    column = quote(model._meta.get_field(field).column)
+    try:
+        subquery, params = queryset.order_by().values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        return []
+    assignments = ''.join(f', {name} = {name} + 1' for name in
+                          (quote(model._meta.get_field(counter).column) for counter in increment))
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {quote(model._meta.db_table)} SET {column} = %s{assignments} '
+                       f'WHERE {quote(model._meta.pk.column)} IN ({subquery}) AND {column} <> %s '
+                       f'RETURNING {", ".join(quote(name) for name in returning)}',
+                       [value, *params, value])
+        return cursor.fetchall()
+
+
+class FullName(Func):
+    """
+    `first_name last_name` of a user, or of the user the `prefix` leads to (e.g. 'contact_person__').
+    Concat renders CONCAT(), which PostgreSQL only marks STABLE; `||` over the two NOT NULL columns
+    is immutable, so this expression can back an index.
+    """
+    template = '(%(expressions)s)'
+    arg_joiner = ' || '
+    output_field = CharField()
+
+    def __init__(self, prefix=''):
+        super().__init__(F(f'{prefix}first_name'), Value(' '), F(f'{prefix}last_name'))
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """AddIndex for index types only PostgreSQL has, e.g. GIN with trigram operator classes; skipped elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
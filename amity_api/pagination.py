@@ -0,0 +1,104 @@
+from django.db import connection
+from django.db.models import Q, Subquery
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first pagination over (`ordering_field`, id). `?before=<id>` returns the rows that come
+    after the given row, so every page is a single index range scan regardless of table size.
+    """
+    ordering_field = 'created_at'
+    page_size = 50
+    max_page_size = 200
+    before_query_param = 'before'
+    limit_query_param = 'limit'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+        if before := self.get_before(request):
+            anchor = Subquery(queryset.model.objects.filter(id=before).values(self.ordering_field))
+            queryset = queryset.filter(Q(**{f'{self.ordering_field}__lt': anchor}) |
+                                       Q(**{self.ordering_field: anchor, 'id__lt': before}))
+        return self.set_page(list(queryset[:self.limit + 1]))
+
+    def paginate_partitions(self, model, partition_field, partition_ids, request):
+        """
+        Same page as `paginate_queryset` over the rows of `model` whose `partition_field` is one of
+        `partition_ids`, built as a k-way merge. On PostgreSQL every partition contributes at most one page
+        read from its own (partition, -ordering field, -id) index through a LATERAL join, so the cost does
+        not depend on how busy the rows of other partitions are.
+        """
+        partition_ids = list(partition_ids)
+        if connection.vendor != 'postgresql':
+            return self.paginate_queryset(model.objects.filter(**{f'{partition_field}__in': partition_ids}), request)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        anchor = None
+        if before := self.get_before(request):
+            anchor = model.objects.filter(id=before).values_list(self.ordering_field, 'id').first()
+            if anchor is None:
+                return self.set_page([])
+        if not partition_ids:
+            return self.set_page([])
+        quote = connection.ops.quote_name
+        table, pk = quote(model._meta.db_table), quote(model._meta.pk.column)
+        ordering = quote(model._meta.get_field(self.ordering_field).column)
+        partition = quote(model._meta.get_field(partition_field).column)
+        keyset = f'AND ({ordering}, {pk}) < (%s, %s) ' if anchor else ''
+        page = model.objects.raw(
+            f'SELECT page.* FROM unnest(%s) AS partitions(value) CROSS JOIN LATERAL ('
+            f'SELECT * FROM {table} WHERE {partition} = partitions.value {keyset}'
+            f'ORDER BY {ordering} DESC, {pk} DESC LIMIT %s) page '
+            f'ORDER BY page.{ordering} DESC, page.{pk} DESC LIMIT %s',
+            [partition_ids, *(anchor or ()), self.limit + 1, self.limit + 1])
+        return self.set_page(list(page))
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.limit
+        self.page = rows[:self.limit]
+        return self.page
+
+    def get_before(self, request):
+        before = request.query_params.get(self.before_query_param)
+        if before and not before.isdigit():
+            raise ValidationError({self.before_query_param: 'A valid integer is required.'})
+        return int(before) if before else None
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(limit, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.before_query_param, self.page[-1].id)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class RecentActivityPagination(KeysetPagination):
+    ordering_field = 'switch_time'
+
+
+class AlertPagination(KeysetPagination):
+    ordering_field = 'triggered_at'
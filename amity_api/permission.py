@@ -2,6 +2,7 @@ from rest_framework import permissions
 from rest_framework.permissions import IsAuthenticated
 
 from communities.models import Community
+from stoves.models import Gateway
 from users.choices_types import ProfileRoles
 from users.models import Profile
 
@@ -34,7 +35,8 @@ class IsAmityAdministratorOrCommunityContactPerson(IsAuthenticated):
 
     def has_permission(self, request, view):
         perm = super().has_permission(request, view)
-        community_contact_person_permission = Community.objects.filter(id=view.kwargs.get('pk'),
+        community_pk = view.kwargs.get(getattr(view, 'community_url_kwarg', 'pk'))
+        community_contact_person_permission = Community.objects.filter(id=community_pk,
                                                                        contact_person__id=request.user.id).exists()
         return bool(perm and (request.auth['role'] == ProfileRoles.AMITY_ADMINISTRATOR or
                             (request.auth['role'] == ProfileRoles.SUPERVISOR and community_contact_person_permission)))
@@ -48,3 +50,8 @@ class IsAmityAdministratorOrSupervisorOrCoordinator(IsAuthenticated):
             ProfileRoles.SUPERVISOR,
             ProfileRoles.COORDINATOR
         ))
+
+
+class IsGateway(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return isinstance(request.auth, Gateway)
@@ -9,6 +9,8 @@ https://docs.djangoproject.com/en/4.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
+import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 from decouple import config
@@ -44,6 +46,9 @@ INSTALLED_APPS = [
     'users',
     'communities',
     'buildings',
+    'realtime',
+    'stoves',
+    'notifications',
 ]
 
 MIDDLEWARE = [
@@ -190,6 +195,97 @@ FRONT_END_NEW_PASSWORD_URL = f'{FRONT_END_DOMAIN_URL}{FRONT_END_NEW_PASSWORD_PAR
 
 VALID_EXTENSIONS = ['jpg', 'png', 'jpeg']
 
+# Safety status fan-out
+SAFETY_FAN_OUT_BATCH_SIZE = config('SAFETY_FAN_OUT_BATCH_SIZE', default=500, cast=int)
+SAFETY_FAN_OUT_IDLE_SLEEP = config('SAFETY_FAN_OUT_IDLE_SLEEP', default=1.0, cast=float)
+# Hours an Idempotency-Key of a safety status request is replayed before it may be used again
+SAFETY_IDEMPOTENCY_KEY_TTL = config('SAFETY_IDEMPOTENCY_KEY_TTL', default=24, cast=int)
+
+# Scheduled safety lock windows
+SAFETY_SCHEDULER_BATCH_SIZE = config('SAFETY_SCHEDULER_BATCH_SIZE', default=1000, cast=int)
+SAFETY_SCHEDULER_INTERVAL = config('SAFETY_SCHEDULER_INTERVAL', default=15.0, cast=float)
+
+# Safety status notifications: digests per recipient once their changes are NOTIFICATION_QUIET_PERIOD seconds
+# old, or NOTIFICATION_MAX_DELAY seconds after the first one; every channel in NOTIFICATION_CHANNELS gets them
+NOTIFICATION_CHANNELS = config('NOTIFICATION_CHANNELS',
+                               default='notifications.channels.EmailChannel,notifications.channels.LocalChannel',
+                               cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+NOTIFICATION_QUIET_PERIOD = config('NOTIFICATION_QUIET_PERIOD', default=60.0, cast=float)
+NOTIFICATION_MAX_DELAY = config('NOTIFICATION_MAX_DELAY', default=600.0, cast=float)
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=100, cast=int)  # recipients per batch
+NOTIFICATION_IDLE_SLEEP = config('NOTIFICATION_IDLE_SLEEP', default=5.0, cast=float)
+NOTIFICATION_CLAIM_TIMEOUT = config('NOTIFICATION_CLAIM_TIMEOUT', default=300.0, cast=float)  # a sender's lease
+# A channel that fails for a recipient is retried after NOTIFICATION_RETRY_DELAY seconds, doubling every attempt
+NOTIFICATION_RETRY_DELAY = config('NOTIFICATION_RETRY_DELAY', default=30.0, cast=float)
+NOTIFICATION_MAX_RETRY_DELAY = config('NOTIFICATION_MAX_RETRY_DELAY', default=3600.0, cast=float)
+
+# Real-time events (realtime.brokers.InMemoryBroker for a single process, PostgresBroker across workers)
+REALTIME_BROKER = config('REALTIME_BROKER', default='realtime.brokers.InMemoryBroker')
+REALTIME_KEEPALIVE = config('REALTIME_KEEPALIVE', default=15.0, cast=float)
+REALTIME_QUEUE_SIZE = config('REALTIME_QUEUE_SIZE', default=100, cast=int)
+GATEWAY_LONG_POLL_TIMEOUT = config('GATEWAY_LONG_POLL_TIMEOUT', default=25.0, cast=float)  # seconds
+
+# Stove telemetry
+STOVE_INGEST_MAX_READINGS = config('STOVE_INGEST_MAX_READINGS', default=100000, cast=int)
+STOVE_REPORT_INTERVAL = config('STOVE_REPORT_INTERVAL', default=10, cast=int)  # seconds between stove readings
+STOVE_ROLLUP_MAX_POINTS = config('STOVE_ROLLUP_MAX_POINTS', default=1000, cast=int)
+STOVE_SERIES_MAX_POINTS = config('STOVE_SERIES_MAX_POINTS', default=5000, cast=int)  # downsampled series
+STOVE_SERIES_MAX_ROWS = config('STOVE_SERIES_MAX_ROWS', default=1000000, cast=int)  # readings behind one series
+STOVE_RATED_POWER = config('STOVE_RATED_POWER', default=2.0, cast=float)  # kW drawn by a stove that is on
+USAGE_REPORT_REFRESH = config('USAGE_REPORT_REFRESH', default=3600, cast=int)  # seconds, month still in progress
+
+# Heartbeats live in this cache and the sweeper reads them from another process, so it has to be shared:
+# the database cache by default (`./manage.py createcachetable`), or a faster one such as
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and CACHE_LOCATION=redis://redis:6379
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='amity_cache'),
+    }
+}
+if not CACHE_BACKEND.endswith('RedisCache'):
+    # Culling silently drops heartbeats, so keep room for one entry per stove.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=1000000, cast=int)}
+
+# Stove heartbeats (seconds)
+STOVE_OFFLINE_AFTER = config('STOVE_OFFLINE_AFTER', default=120, cast=int)
+STOVE_HEARTBEAT_SWEEP_INTERVAL = config('STOVE_HEARTBEAT_SWEEP_INTERVAL', default=30.0, cast=float)
+STOVE_HEARTBEAT_SWEEP_BATCH_SIZE = config('STOVE_HEARTBEAT_SWEEP_BATCH_SIZE', default=2000, cast=int)
+
+# Current stove state shared by all worker processes through a memory-mapped file
+STOVE_SNAPSHOT_PATH = config('STOVE_SNAPSHOT_PATH', default=os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'amity-stove-snapshot'))
+STOVE_SNAPSHOT_STOVES = config('STOVE_SNAPSHOT_STOVES', default=1000000, cast=int)  # highest stove id + 1
+STOVE_SNAPSHOT_BUILDINGS = config('STOVE_SNAPSHOT_BUILDINGS', default=100000, cast=int)
+
+# Cold storage of aged stove readings, one directory of column files per building
+STOVE_ARCHIVE_DIR = config('STOVE_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive'))
+STOVE_ARCHIVE_AFTER_DAYS = config('STOVE_ARCHIVE_AFTER_DAYS', default=21, cast=int)
+STOVE_ARCHIVE_BATCH_SIZE = config('STOVE_ARCHIVE_BATCH_SIZE', default=100000, cast=int)
+STOVE_READINGS_MAX_ROWS = config('STOVE_READINGS_MAX_ROWS', default=100000, cast=int)  # per readings request
+
+# Stove "left on" detection
+STOVE_USAGE_BASELINE_WEIGHT = config('STOVE_USAGE_BASELINE_WEIGHT', default=0.2, cast=float)
+STOVE_USAGE_MIN_SAMPLES = config('STOVE_USAGE_MIN_SAMPLES', default=3, cast=int)
+STOVE_LEFT_ON_FACTOR = config('STOVE_LEFT_ON_FACTOR', default=3.0, cast=float)
+
+# Stove command outbox (seconds for delays and timeouts)
+STOVE_COMMAND_TRANSPORT = config('STOVE_COMMAND_TRANSPORT', default='stoves.transports.LocalTransport')
+STOVE_COMMAND_BATCH_SIZE = config('STOVE_COMMAND_BATCH_SIZE', default=100, cast=int)
+STOVE_COMMAND_MAX_ATTEMPTS = config('STOVE_COMMAND_MAX_ATTEMPTS', default=10, cast=int)
+STOVE_COMMAND_RETRY_DELAY = config('STOVE_COMMAND_RETRY_DELAY', default=1.0, cast=float)
+STOVE_COMMAND_MAX_RETRY_DELAY = config('STOVE_COMMAND_MAX_RETRY_DELAY', default=300.0, cast=float)
+STOVE_COMMAND_ACK_TIMEOUT = config('STOVE_COMMAND_ACK_TIMEOUT', default=30.0, cast=float)
+STOVE_COMMAND_IDLE_SLEEP = config('STOVE_COMMAND_IDLE_SLEEP', default=0.5, cast=float)
+
+# Recent activity retention
+RECENT_ACTIVITY_RETENTION_DAYS = config('RECENT_ACTIVITY_RETENTION_DAYS', default=90, cast=int)
+
+# Write-behind buffer for activity records of single changes, filled as their transactions commit
+RECENT_ACTIVITY_BUFFER_SIZE = config('RECENT_ACTIVITY_BUFFER_SIZE', default=200, cast=int)
+RECENT_ACTIVITY_FLUSH_INTERVAL = config('RECENT_ACTIVITY_FLUSH_INTERVAL', default=1.0, cast=float)  # seconds
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 CSRF_TRUSTED_ORIGINS = [
@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 from .base import *
 from decouple import config
 
@@ -15,3 +18,10 @@ DATABASES = {
 }
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# Activity records are written as soon as their transaction commits, so tests can read them back at once.
+RECENT_ACTIVITY_BUFFER_SIZE = 1
+
+# A stove snapshot of the test run's own, removed when the run ends, so tests never write into the shared one.
+_snapshot_directory = tempfile.TemporaryDirectory(prefix='amity-test-')
+STOVE_SNAPSHOT_PATH = os.path.join(_snapshot_directory.name, 'stove-snapshot')
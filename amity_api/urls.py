@@ -44,6 +44,7 @@ v1_0_patterns = [
     path('users/', include('users.urls')),
     path('communities/', include('communities.urls')),
     path('', include('buildings.urls')),
+    path('', include('stoves.urls')),
 ]
 
 urlpatterns = [
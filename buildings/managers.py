@@ -0,0 +1,43 @@
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+
+from amity_api.db import conditional_update_returning
+from realtime.events import publish_community_event, publish_building_event, BUILDINGS_SAFETY_STATUS, \
+    DESIRED_STATE
+from stoves.snapshot import get_snapshot
+
+
+class BuildingQuerySet(models.QuerySet):
+    def set_safety_status(self, safety_status, user_id=None):
+        """
+        Moves the buildings to the given safety status, bumps their desired-state version, adjusts the
+        locked buildings counter of their communities, records the status intervals and queues the stove
+        commands in the same transaction. Returns the ids of the buildings that changed.
+        """
+        with transaction.atomic():
+            changed = conditional_update_returning(self, 'safety_status', safety_status,
+                                                   returning=('id', 'community_id', 'safety_version'),
+                                                   increment=('safety_version',))
+            changed_by_community = {}
+            for pk, community_id, _ in changed:
+                changed_by_community.setdefault(community_id, []).append(pk)
+            if changed_by_community:
+                sign = 1 if safety_status else -1
+                community_model = self.model._meta.get_field('community').related_model
+                community_model.objects.filter(id__in=changed_by_community).update(
+                    locked_buildings_count=F('locked_buildings_count') + Case(
+                        *[When(id=community_id, then=Value(sign * len(building_ids)))
+                          for community_id, building_ids in changed_by_community.items()]))
+            apps.get_model('communities', 'SafetyStatusInterval').record(
+                [(community_id, pk) for pk, community_id, _ in changed], safety_status, user_id)
+            apps.get_model('stoves', 'StoveCommand').issue([(pk, community_id) for pk, community_id, _ in changed],
+                                                           safety_status)
+            for community_id, building_ids in changed_by_community.items():
+                publish_community_event(community_id, BUILDINGS_SAFETY_STATUS,
+                                        {'buildings': building_ids, 'safety_status': safety_status})
+            for pk, _, version in changed:
+                publish_building_event(pk, DESIRED_STATE, {'version': version})
+            changed_ids = [pk for pk, _, _ in changed]
+            transaction.on_commit(lambda: get_snapshot().set_locked(changed_ids, safety_status))
+            return changed_ids
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0002_alter_building_contact_person'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='offline_stoves_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0003_offline_stoves'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='safety_version',
+            field=models.BigIntegerField(default=1),
+        ),
+    ]
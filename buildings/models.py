@@ -1,9 +1,12 @@
+from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
 from localflavor.us.models import USStateField
 
 from users.validators import phone_regex
+from .managers import BuildingQuerySet
 
 User = get_user_model()
 
@@ -16,3 +19,37 @@ class Building(models.Model):
     contact_person = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='buildings')
     phone_number = models.CharField('phone number', validators=[phone_regex], max_length=20, null=True, blank=True)
     safety_status = models.BooleanField(default=True)
+    offline_stoves_count = models.IntegerField(default=0)
+    safety_version = models.BigIntegerField(default=1)
+
+    objects = BuildingQuerySet.as_manager()
+
+    # Kept up to date by set-based updates, so saving an instance must not write its loaded values back.
+    MAINTAINED_FIELDS = ('offline_stoves_count', 'safety_version')
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            adding = self._state.adding
+            if not adding and (update_fields is None or 'safety_status' in update_fields):
+                Building.objects.filter(id=self.id).set_safety_status(self.safety_status)
+            if not adding and update_fields is None:
+                kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                           if not field.primary_key and field.name not in self.MAINTAINED_FIELDS]
+            super().save(*args, **kwargs)
+            if adding:
+                self._update_community_counters(1)
+                apps.get_model('communities', 'SafetyStatusInterval').record([(self.community_id, self.id)],
+                                                                             self.safety_status)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.offline_stoves_count = Building.objects.values_list('offline_stoves_count', flat=True).get(id=self.id)
+            self._update_community_counters(-1)
+            return super().delete(*args, **kwargs)
+
+    def _update_community_counters(self, delta):
+        self._meta.get_field('community').related_model.objects.filter(id=self.community_id).update(
+            buildings_count=F('buildings_count') + delta,
+            locked_buildings_count=F('locked_buildings_count') + (delta if self.safety_status else 0),
+            offline_stoves_count=F('offline_stoves_count') + delta * self.offline_stoves_count)
@@ -18,13 +18,18 @@ class CreateBuildingSerializer(serializers.ModelSerializer):
         return attr
 
 
+class BuildingSafetyStatusSerializer(serializers.Serializer):
+    safety_status = serializers.BooleanField(required=True)
+
+
 class ListBuildingSerializer(serializers.ModelSerializer):
     contact_person_name = serializers.CharField()
     state = serializers.SerializerMethodField()
 
     class Meta:
         model = Building
-        fields = ['id', 'community', 'name', 'state', 'address', 'contact_person_name', 'phone_number', 'safety_status']
+        fields = ['id', 'community', 'name', 'state', 'address', 'contact_person_name', 'phone_number', 'safety_status',
+                  'offline_stoves_count']
 
     def get_state(self, obj):
         return dict(US_STATES)[obj.state]
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from buildings.models import Building
+from communities.models import Community
+
+User = get_user_model()
+
+
+class BuildingCountersTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+
+    def counters(self):
+        community = Community.objects.get(id=self.community.id)
+        return community.buildings_count, community.locked_buildings_count
+
+    def test_creating_and_deleting_buildings_updates_counters(self):
+        build1 = Building.objects.create(community=self.community, name='building1', state='AL', address='address1')
+        Building.objects.create(community=self.community, name='building2', state='AL', address='address2',
+                                safety_status=False)
+        self.assertEqual(self.counters(), (2, 1))
+        build1.delete()
+        self.assertEqual(self.counters(), (1, 0))
+
+    def test_set_safety_status_counts_only_changed_buildings(self):
+        for i in range(3):
+            Building.objects.create(community=self.community, name=f'building{i}', state='AL', address=f'address{i}')
+        changed = Building.objects.filter(community=self.community).set_safety_status(False)
+        self.assertEqual(len(changed), 3)
+        self.assertEqual(self.counters(), (3, 0))
+        self.assertEqual(Building.objects.filter(community=self.community).set_safety_status(False), [])
+        self.assertEqual(self.counters(), (3, 0))
+
+    def test_saving_building_with_new_safety_status_updates_counters(self):
+        building = Building.objects.create(community=self.community, name='building1', state='AL', address='address1')
+        building.safety_status = False
+        building.save()
+        self.assertEqual(self.counters(), (1, 0))
+
+    def test_set_safety_status_bumps_version_of_changed_buildings_only(self):
+        building = Building.objects.create(community=self.community, name='building1', state='AL', address='address1')
+        Building.objects.filter(id=building.id).set_safety_status(False)
+        Building.objects.filter(id=building.id).set_safety_status(False)
+        self.assertEqual(Building.objects.get(id=building.id).safety_version, 2)
+        building.refresh_from_db()
+        building.name = 'renamed'
+        building.save()
+        self.assertEqual(Building.objects.get(id=building.id).safety_version, 2)
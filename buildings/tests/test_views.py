@@ -5,7 +5,7 @@ from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
 from buildings.models import Building
-from communities.models import Community
+from communities.models import Community, RecentActivity
 from users.choices_types import ProfileRoles
 
 User = get_user_model()
@@ -138,3 +138,61 @@ class BuildingUnassignContactPersonAPIViewTestCase(APITestCase):
         response = self.client.put(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Building.objects.values_list('contact_person').filter(pk=self.build.id)[0][0], None)
+
+
+class BuildingSafetyStatusAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.user1 = User.objects.create_user(email='user1@user.com', password='strong1',
+                                              first_name='First User1', last_name='Last User1',
+                                              role=ProfileRoles.SUPERVISOR)
+        self.user2 = User.objects.create_user(email='user2@user.com', password='strong2',
+                                              first_name='First User2', last_name='Last User2',
+                                              role=ProfileRoles.SUPERVISOR)
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user1, phone_number=1234567)
+        self.build1 = Building.objects.create(community_id=self.community.id, name='building1', state='AL',
+                                              address='address1', phone_number=1234567)
+        self.build2 = Building.objects.create(community_id=self.community.id, name='building2', state='AL',
+                                              address='address2', phone_number=1234567)
+        self.url = reverse('v1.0:buildings:building-safety-status', args=[self.community.id, self.build1.id])
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_building_safety_status_changes_single_building_and_counters(self):
+        self.login('user1@user.com', 'strong1')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(self.url, {'safety_status': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['changed'])
+        self.assertFalse(Building.objects.get(id=self.build1.id).safety_status)
+        self.assertTrue(Building.objects.get(id=self.build2.id).safety_status)
+        community = Community.objects.get(id=self.community.id)
+        self.assertEqual(community.buildings_count, 2)
+        self.assertEqual(community.locked_buildings_count, 1)
+        self.assertTrue(RecentActivity.objects.filter(building=self.build1).exists())
+
+    def test_building_safety_status_same_value_does_nothing(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.put(self.url, {'safety_status': True}, format='json')
+        self.assertFalse(response.data['changed'])
+        self.assertEqual(Community.objects.get(id=self.community.id).locked_buildings_count, 2)
+        self.assertFalse(RecentActivity.objects.exists())
+
+    def test_building_safety_status_for_building_of_other_community(self):
+        self.login('super@super.super', 'strong')
+        other = Community.objects.create(name='community2', state='AL', zip_code=1234, address='address2',
+                                         contact_person=self.user2, phone_number=1234567)
+        url = reverse('v1.0:buildings:building-safety-status', args=[other.id, self.build1.id])
+        response = self.client.put(url, {'safety_status': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Building.objects.get(id=self.build1.id).safety_status)
+
+    def test_building_safety_status_no_access_for_supervisor_not_contact_person(self):
+        self.login('user2@user.com', 'strong2')
+        response = self.client.put(self.url, {'safety_status': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import BuildingViewSet, BuildingUnassignContactPersonAPIView
+from .views import BuildingViewSet, BuildingUnassignContactPersonAPIView, BuildingSafetyStatusAPIView
 
 app_name = 'buildings'
 
@@ -8,4 +8,6 @@ urlpatterns = [
   path('communities/<int:pk>/buildings/', BuildingViewSet.as_view({'post': 'create', 'get': 'list'}), name='buildings-list'),
   path('communities/<int:community_id>/buildings/<int:pk>/unassign-contact-person/',
        BuildingUnassignContactPersonAPIView.as_view(), name='building-unassign-contact-person'),
+  path('communities/<int:community_id>/buildings/<int:pk>/safety-status/',
+       BuildingSafetyStatusAPIView.as_view(), name='building-safety-status'),
 ]
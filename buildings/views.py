@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.db.models import Value, CharField
 from django.db.models.functions import Concat
 from django.utils.decorators import method_decorator
@@ -8,8 +9,10 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
 from amity_api.permission import IsAmityAdministratorOrCommunityContactPerson
+from communities.activity import record_activity
+from communities.models import RecentActivity
 from .models import Building
-from .serializers import CreateBuildingSerializer, ListBuildingSerializer
+from .serializers import CreateBuildingSerializer, ListBuildingSerializer, BuildingSafetyStatusSerializer
 
 
 @method_decorator(name='list', decorator=swagger_auto_schema(
@@ -53,3 +56,26 @@ class BuildingUnassignContactPersonAPIView(APIView):
     def put(self, request, pk, *args, **kwargs):
         Building.objects.filter(id=pk).update(contact_person=None)
         return Response(status=status.HTTP_200_OK)
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    operation_summary="Set safety lock status for a single building",
+    request_body=BuildingSafetyStatusSerializer
+))
+class BuildingSafetyStatusAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson, )
+    community_url_kwarg = 'community_id'
+
+    def put(self, request, community_id, pk, *args, **kwargs):
+        serializer = BuildingSafetyStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        safety_status = serializer.validated_data['safety_status']
+        with transaction.atomic():
+            changed = Building.objects.filter(id=pk, community=community_id).\
+                set_safety_status(safety_status, request.user.id)
+            if changed:
+                record_activity(community_id=community_id, building_id=pk, user_id=request.user.id,
+                                activity=RecentActivity.SAFETY_STATUS, status=safety_status)
+            elif not Building.objects.filter(id=pk, community=community_id).exists():
+                return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'safety_status': safety_status, 'changed': bool(changed)}, status=status.HTTP_200_OK)
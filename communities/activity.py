@@ -0,0 +1,112 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import DatabaseError, close_old_connections, transaction
+
+from amity_api.settings import RECENT_ACTIVITY_BUFFER_SIZE, RECENT_ACTIVITY_FLUSH_INTERVAL
+from .models import RecentActivity
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def write_activities(activities):
+    for activity in RecentActivity.objects.bulk_create(activities):
+        activity.publish()
+
+
+class ActivityBuffer:
+    """
+    Write-behind buffer for activity records outside an `activity_batch()`, added once their transaction
+    commits. They are written with one bulk INSERT once RECENT_ACTIVITY_BUFFER_SIZE records are waiting, at
+    least every RECENT_ACTIVITY_FLUSH_INTERVAL seconds by a background thread, and when the process exits.
+    """
+
+    def __init__(self, max_size=RECENT_ACTIVITY_BUFFER_SIZE, flush_interval=RECENT_ACTIVITY_FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._activities = []
+        self._lock = threading.Lock()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def add(self, activity):
+        with self._lock:
+            self._activities.append(activity)
+            full = len(self._activities) >= self.max_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-buffer', daemon=True)
+                self._thread.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Writes the waiting records. Returns how many were written."""
+        with self._lock:
+            activities, self._activities = self._activities, []
+        if not activities:
+            return 0
+        try:
+            write_activities(activities)
+        except DatabaseError:
+            # Keep the records for the next flush rather than losing them.
+            with self._lock:
+                self._activities[:0] = activities
+            raise
+        return len(activities)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except DatabaseError:
+                logger.exception('Could not write buffered activity records')
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+
+
+def get_activity_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = ActivityBuffer()
+    return _buffer
+
+
+@contextmanager
+def activity_batch():
+    """
+    Collects the activity records made in the block and writes them with one INSERT at its end, in the
+    same transaction as the change they describe. Nested batches join the outermost one.
+    """
+    if getattr(_local, 'batch', None) is not None:
+        yield _local.batch
+        return
+    _local.batch = batch = []
+    try:
+        with transaction.atomic():
+            yield batch
+            write_activities(batch)
+    finally:
+        _local.batch = None
+
+
+def record_activity(**fields):
+    """
+    Records an activity. Inside `activity_batch()` it joins the batch and commits with it; otherwise it goes
+    to the write-behind buffer, inside a transaction only once that commits, so a rolled back change leaves
+    no record and a request does not wait for its own INSERT.
+    """
+    activity = RecentActivity(**fields)
+    if getattr(_local, 'batch', None) is not None:
+        _local.batch.append(activity)
+    else:
+        transaction.on_commit(lambda: get_activity_buffer().add(activity))
+    return activity
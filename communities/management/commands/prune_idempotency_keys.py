@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from communities.models import SafetyStatusRequest
+
+
+class Command(BaseCommand):
+    help = 'Delete safety status Idempotency-Keys older than SAFETY_IDEMPOTENCY_KEY_TTL hours'
+
+    def handle(self, *args, **options):
+        removed = SafetyStatusRequest.expired().delete()[0]
+        self.stdout.write(f'Removed {removed} expired idempotency keys')
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from amity_api.settings import RECENT_ACTIVITY_RETENTION_DAYS
+from communities.models import RecentActivity, RecentActivityDailySummary
+
+
+class Command(BaseCommand):
+    help = 'Roll recent activity older than the retention period up into daily summaries and delete it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RECENT_ACTIVITY_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        removed = 0
+        while ids := list(RecentActivity.objects.filter(switch_time__lt=cutoff).order_by('-switch_time', '-id').
+                          values_list('id', flat=True)[:options['batch_size']]):
+            with transaction.atomic():
+                self.roll_up(RecentActivity.objects.filter(id__in=ids))
+                removed += RecentActivity.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(f'Removed {removed} activity records older than {cutoff:%Y-%m-%d}')
+
+    @staticmethod
+    def roll_up(queryset):
+        days = queryset.order_by().annotate(day=TruncDate('switch_time')).values('community', 'day', 'activity').\
+            annotate(events=Count('id'))
+        for row in days:
+            summary = RecentActivityDailySummary.objects.filter(community=row['community'], day=row['day'],
+                                                                activity=row['activity'])
+            if not summary.update(events_count=F('events_count') + row['events']):
+                RecentActivityDailySummary.objects.create(community_id=row['community'], day=row['day'],
+                                                          activity=row['activity'], events_count=row['events'])
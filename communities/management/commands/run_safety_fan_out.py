@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from amity_api.settings import SAFETY_FAN_OUT_BATCH_SIZE, SAFETY_FAN_OUT_IDLE_SLEEP
+from communities.models import SafetyStatusFanOut
+
+
+class Command(BaseCommand):
+    help = 'Spread pending community safety status changes to buildings in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SAFETY_FAN_OUT_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='Exit when there is nothing left to process')
+
+    def handle(self, *args, **options):
+        while True:
+            fan_out = SafetyStatusFanOut.process_next_batch(options['batch_size'])
+            if fan_out is None:
+                if options['once']:
+                    return
+                time.sleep(SAFETY_FAN_OUT_IDLE_SLEEP)
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from amity_api.settings import SAFETY_SCHEDULER_BATCH_SIZE, SAFETY_SCHEDULER_INTERVAL
+from communities.models import SafetySchedule
+
+
+class Command(BaseCommand):
+    help = 'Apply due transitions of scheduled safety lock windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SAFETY_SCHEDULER_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='Exit when there are no due transitions')
+
+    def handle(self, *args, **options):
+        while True:
+            if not SafetySchedule.apply_due(batch_size=options['batch_size']):
+                if options['once']:
+                    return
+                time.sleep(SAFETY_SCHEDULER_INTERVAL)
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.1 on 2026-10-18 01:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0005_alter_community_contact_person'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SafetyStatusFanOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('safety_status', models.BooleanField()),
+                ('status', models.SmallIntegerField(choices=[(1, 'pending'), (2, 'running'), (3, 'done'), (4, 'superseded')], default=1, verbose_name='status')),
+                ('last_building_id', models.BigIntegerField(default=0)),
+                ('processed_buildings', models.IntegerField(default=0)),
+                ('total_buildings', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='safety_fan_outs', to='communities.community')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='safetystatusfanout',
+            index=models.Index(fields=['status', 'id'], name='communities_status_f6feb3_idx'),
+        ),
+    ]
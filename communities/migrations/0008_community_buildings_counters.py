@@ -0,0 +1,42 @@
+# Generated by Django 4.1.1 on 2026-10-18 01:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_buildings_counters(apps, schema_editor):
+    Community = apps.get_model('communities', 'Community')
+    Building = apps.get_model('buildings', 'Building')
+    counters = Building.objects.filter(community=OuterRef('pk')).order_by().values('community').\
+        annotate(total=Count('id'), locked=Count('id', filter=Q(safety_status=True)))
+    Community.objects.update(buildings_count=Coalesce(Subquery(counters.values('total')), 0),
+                             locked_buildings_count=Coalesce(Subquery(counters.values('locked')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0002_alter_building_contact_person'),
+        ('communities', '0007_safetystatusrequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='buildings_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='community',
+            name='locked_buildings_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recentactivity',
+            name='building',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='buildings.building'),
+        ),
+        migrations.RunPython(fill_buildings_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0008_community_buildings_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentActivityDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('activity', models.CharField(choices=[(1, 'safety_status'), (2, 'master_off')], max_length=15, verbose_name='activity')),
+                ('events_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='recentactivity',
+            options={'ordering': ['-switch_time', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='recentactivity',
+            index=models.Index(fields=['community', '-switch_time', '-id'], name='communities_communi_48d66c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recentactivity',
+            index=models.Index(fields=['-switch_time', '-id'], name='communities_switch__0ed226_idx'),
+        ),
+        migrations.AddField(
+            model_name='recentactivitydailysummary',
+            name='community',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='communities.community'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recentactivitydailysummary',
+            unique_together={('community', 'day', 'activity')},
+        ),
+    ]
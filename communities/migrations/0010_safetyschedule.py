@@ -0,0 +1,35 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:09
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0002_alter_building_contact_person'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('communities', '0009_recentactivity_indexes_and_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SafetySchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lock_time', models.TimeField(verbose_name='lock time')),
+                ('unlock_time', models.TimeField(verbose_name='unlock time')),
+                ('weekdays', models.SmallIntegerField(default=127, help_text='Bit mask of the days the lock starts on, Monday is 1, Sunday is 64.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(127)], verbose_name='weekdays')),
+                ('time_zone', models.CharField(default='UTC', max_length=50, verbose_name='time zone')),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_transition_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('next_safety_status', models.BooleanField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='safety_schedules', to='buildings.building')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='safety_schedules', to='communities.community')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
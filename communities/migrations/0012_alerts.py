@@ -0,0 +1,31 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('communities', '0011_offline_stoves'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recentactivity',
+            name='activity',
+            field=models.CharField(choices=[(1, 'safety_status'), (2, 'master_off'), (3, 'alert')], max_length=15, verbose_name='activity'),
+        ),
+        migrations.AlterField(
+            model_name='recentactivity',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='recentactivitydailysummary',
+            name='activity',
+            field=models.CharField(choices=[(1, 'safety_status'), (2, 'master_off'), (3, 'alert')], max_length=15, verbose_name='activity'),
+        ),
+    ]
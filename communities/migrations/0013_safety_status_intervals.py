@@ -0,0 +1,58 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def open_current_intervals(apps, schema_editor):
+    # Earlier history is only in RecentActivity; the timeline starts with the current statuses.
+    Community = apps.get_model('communities', 'Community')
+    Building = apps.get_model('buildings', 'Building')
+    SafetyStatusInterval = apps.get_model('communities', 'SafetyStatusInterval')
+    now = timezone.now()
+    SafetyStatusInterval.objects.bulk_create(
+        [SafetyStatusInterval(community_id=pk, safety_status=safety_status, started_at=now)
+         for pk, safety_status in Community.objects.values_list('id', 'safety_status').iterator()] +
+        [SafetyStatusInterval(community_id=community_id, building_id=pk, safety_status=safety_status, started_at=now)
+         for pk, community_id, safety_status in
+         Building.objects.values_list('id', 'community_id', 'safety_status').iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('buildings', '0004_safety_version'),
+        ('communities', '0012_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SafetyStatusInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('safety_status', models.BooleanField()),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='safety_intervals', to='buildings.building')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='safety_intervals', to='communities.community')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='safetystatusinterval',
+            index=models.Index(fields=['community', 'building', '-started_at'], name='communities_communi_c48db8_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='safetystatusinterval',
+            constraint=models.UniqueConstraint(condition=models.Q(('building__isnull', True), ('ended_at__isnull', True)), fields=('community',), name='one_open_community_safety_interval'),
+        ),
+        migrations.AddConstraint(
+            model_name='safetystatusinterval',
+            constraint=models.UniqueConstraint(condition=models.Q(('ended_at__isnull', True)), fields=('building',), name='one_open_building_safety_interval'),
+        ),
+        migrations.RunPython(open_current_intervals, migrations.RunPython.noop),
+    ]
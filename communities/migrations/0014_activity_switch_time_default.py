@@ -0,0 +1,19 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0013_safety_status_intervals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recentactivity',
+            name='switch_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
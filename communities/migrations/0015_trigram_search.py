@@ -0,0 +1,25 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:40
+
+import amity_api.db
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0014_activity_switch_time_default'),
+        ('users', '0008_trigram_search'),
+    ]
+
+    operations = [
+        amity_api.db.AddPostgresIndex(
+            model_name='community',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='community_name_trgm'),
+        ),
+        amity_api.db.AddPostgresIndex(
+            model_name='community',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('state'), name='gin_trgm_ops'), name='community_state_trgm'),
+        ),
+    ]
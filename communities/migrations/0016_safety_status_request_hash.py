@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0015_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='safetystatusrequest',
+            name='request_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='request hash'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.1 on 2026-10-18 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('communities', '0016_safety_status_request_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='safetystatusfanout',
+            name='changed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
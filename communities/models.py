@@ -1,13 +1,24 @@
+import hashlib
+import json
 import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
 from django.contrib.auth import get_user_model
-from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
+from django.db import connection, models, transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 from localflavor.us.models import USStateField
 
-from amity_api.settings import VALID_EXTENSIONS
+from amity_api.db import conditional_update_returning
+from amity_api.settings import VALID_EXTENSIONS, SAFETY_FAN_OUT_BATCH_SIZE, SAFETY_SCHEDULER_BATCH_SIZE, TIME_ZONE, \
+    SAFETY_IDEMPOTENCY_KEY_TTL
 from buildings.models import Building
+from realtime.events import publish_community_event, SAFETY_STATUS, ACTIVITY
 from users.validators import phone_regex, validate_size
 
 User = get_user_model()
@@ -28,29 +39,358 @@ class Community(models.Model):
         FileExtensionValidator(VALID_EXTENSIONS), validate_size])
     logo_coord = models.JSONField(null=True, blank=True)
     safety_status = models.BooleanField(default=True)
+    buildings_count = models.IntegerField(default=0)
+    locked_buildings_count = models.IntegerField(default=0)
+    offline_stoves_count = models.IntegerField(default=0)
+
+    class Meta:
+        # Serve the `icontains` searches of the community list, which compare UPPER() of the column.
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='community_name_trgm'),
+            GinIndex(OpClass(Upper('state'), name='gin_trgm_ops'), name='community_state_trgm'),
+        ]
 
     def __str__(self):
         return self.name
 
-    def switch_safety_status(self):
-        self.safety_status = not self.safety_status
-        self.save()
-        Building.objects.filter(community=self.id).update(safety_status=self.safety_status)
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                SafetyStatusInterval.record([(self.id, None)], self.safety_status)
+
+    def switch_safety_status(self, user_id=None):
+        from notifications.models import Notification
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {Community._meta.db_table} SET safety_status = NOT safety_status '
+                           f'WHERE id = %s RETURNING safety_status', [self.id])
+            self.safety_status = bool(cursor.fetchone()[0])
+            SafetyStatusInterval.record([(self.id, None)], self.safety_status, user_id)
+            Notification.enqueue([self.id], self.safety_status, user_id)
+            publish_community_event(self.id, SAFETY_STATUS, {'safety_status': self.safety_status})
+            return SafetyStatusFanOut.start(self.id, self.safety_status, user_id)
+
+    @classmethod
+    def set_safety_status(cls, pk, safety_status, user_id):
+        """
+        Moves the community to the given safety status with a single conditional UPDATE.
+        Returns the started fan-out, or None when the community already had that status.
+        """
+        from notifications.models import Notification
+        from .activity import record_activity
+        with transaction.atomic():
+            if not conditional_update_returning(cls.objects.filter(id=pk), 'safety_status', safety_status):
+                return None
+            SafetyStatusInterval.record([(pk, None)], safety_status, user_id)
+            Notification.enqueue([pk], safety_status, user_id)
+            record_activity(community_id=pk, user_id=user_id, activity=RecentActivity.SAFETY_STATUS,
+                            status=safety_status)
+            publish_community_event(pk, SAFETY_STATUS, {'safety_status': safety_status})
+            return SafetyStatusFanOut.start(pk, safety_status, user_id)
+
+    @classmethod
+    def bulk_set_safety_status(cls, queryset, safety_status, user_id):
+        """
+        Set-based variant of `set_safety_status` for many communities at once: one UPDATE for the
+        communities, one for their buildings and one INSERT for all activity records.
+        Returns the ids of the communities that actually changed.
+        """
+        from notifications.models import Notification
+        from .activity import activity_batch, record_activity
+        with transaction.atomic(), activity_batch():
+            changed_ids = [pk for pk, in conditional_update_returning(queryset, 'safety_status', safety_status)]
+            if changed_ids:
+                SafetyStatusInterval.record([(pk, None) for pk in changed_ids], safety_status, user_id)
+                Notification.enqueue(changed_ids, safety_status, user_id)
+                SafetyStatusFanOut.supersede(changed_ids)
+                Building.objects.filter(community__in=changed_ids).set_safety_status(safety_status, user_id)
+                for pk in changed_ids:
+                    publish_community_event(pk, SAFETY_STATUS, {'safety_status': safety_status})
+                    record_activity(community_id=pk, user_id=user_id, activity=RecentActivity.SAFETY_STATUS,
+                                    status=safety_status)
+            return changed_ids
 
     def create_recent_activity_record(self, user_id, activity):
-        RecentActivity.objects.create(community=self,
-                                      user_id=user_id,
-                                      activity=activity,
-                                      status=self.safety_status)
+        from .activity import record_activity
+        record_activity(community_id=self.id, user_id=user_id, activity=activity, status=self.safety_status)
 
 
 class RecentActivity(models.Model):
     SAFETY_STATUS = 1
     MASTER_OFF = 2
-    ACTIVITY_CHOICES = ((SAFETY_STATUS, "safety_status"), (MASTER_OFF, "master_off"),)
+    ALERT = 3
+    ACTIVITY_CHOICES = ((SAFETY_STATUS, "safety_status"), (MASTER_OFF, "master_off"), (ALERT, "alert"),)
 
     community = models.ForeignKey(Community, on_delete=models.DO_NOTHING)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    switch_time = models.DateTimeField(auto_now_add=True)
+    building = models.ForeignKey(Building, on_delete=models.SET_NULL, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Set when the record is made rather than when it is written, as records may wait in the write-behind buffer.
+    switch_time = models.DateTimeField(default=timezone.now)
     activity = models.CharField('activity', choices=ACTIVITY_CHOICES, max_length=15)
     status = models.BooleanField()
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            self.publish()
+
+    def publish(self):
+        from .serializers import RecentActivitySerializer
+        publish_community_event(self.community_id, ACTIVITY, RecentActivitySerializer(self).data)
+
+    class Meta:
+        ordering = ['-switch_time', '-id']
+        indexes = [
+            models.Index(fields=['community', '-switch_time', '-id']),
+            models.Index(fields=['-switch_time', '-id']),
+        ]
+
+
+class RecentActivityDailySummary(models.Model):
+    """Per-day event counts kept for activity records removed by `prune_recent_activity`."""
+    community = models.ForeignKey(Community, on_delete=models.CASCADE)
+    day = models.DateField()
+    activity = models.CharField('activity', choices=RecentActivity.ACTIVITY_CHOICES, max_length=15)
+    events_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['community', 'day', 'activity']
+
+
+class SafetyStatusInterval(models.Model):
+    """
+    Period during which a community, or one of its buildings when `building` is set, kept one safety status.
+    Every change closes the open interval of its target and opens a new one, so the status at any moment
+    is the latest interval started before it: one backward scan of the (community, building, started_at) index.
+    """
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='safety_intervals')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='safety_intervals')
+    safety_status = models.BooleanField()
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [models.Index(fields=['community', 'building', '-started_at'])]
+        constraints = [
+            models.UniqueConstraint(fields=['community'],
+                                    condition=models.Q(building__isnull=True, ended_at__isnull=True),
+                                    name='one_open_community_safety_interval'),
+            models.UniqueConstraint(fields=['building'], condition=models.Q(ended_at__isnull=True),
+                                    name='one_open_building_safety_interval'),
+        ]
+
+    @classmethod
+    def record(cls, targets, safety_status, user_id=None, moment=None):
+        """Closes the open intervals of the (community_id, building_id or None) targets and opens new ones."""
+        if not targets:
+            return
+        moment = moment or timezone.now()
+        community_ids = [community_id for community_id, building_id in targets if building_id is None]
+        building_ids = [building_id for _, building_id in targets if building_id is not None]
+        cls.objects.filter(ended_at__isnull=True).filter(
+            models.Q(community__in=community_ids, building__isnull=True) | models.Q(building__in=building_ids)).\
+            update(ended_at=moment)
+        cls.objects.bulk_create([
+            cls(community_id=community_id, building_id=building_id, safety_status=safety_status, started_at=moment,
+                changed_by_id=user_id) for community_id, building_id in targets
+        ])
+
+    @classmethod
+    def for_target(cls, community_id, building_id=None):
+        intervals = cls.objects.filter(community=community_id)
+        return intervals.filter(building=building_id) if building_id else intervals.filter(building__isnull=True)
+
+    @classmethod
+    def as_of(cls, community_id, moment, building_id=None):
+        """The interval holding the safety status of the target at `moment`, or None before its history starts."""
+        return cls.for_target(community_id, building_id).filter(started_at__lte=moment).\
+            select_related('changed_by').order_by('-started_at', '-id').first()
+
+    @classmethod
+    def between(cls, community_id, start, end, building_id=None):
+        """The intervals of the target overlapping [start, end), oldest first."""
+        current = cls.as_of(community_id, start, building_id)
+        later = cls.for_target(community_id, building_id).filter(started_at__gt=start, started_at__lt=end).\
+            select_related('changed_by').order_by('started_at', 'id')
+        return ([current] if current else []) + list(later)
+
+
+class SafetyStatusFanOut(models.Model):
+    """
+    Spreads a community safety status change to its buildings in bounded batches.
+
+    The switching request only commits the community row and this record; a worker
+    (`manage.py run_safety_fan_out`) then walks the buildings by id so that every
+    batch locks at most `SAFETY_FAN_OUT_BATCH_SIZE` rows in its own transaction.
+    """
+    PENDING = 1
+    RUNNING = 2
+    DONE = 3
+    SUPERSEDED = 4
+    STATUS_CHOICES = ((PENDING, "pending"), (RUNNING, "running"), (DONE, "done"), (SUPERSEDED, "superseded"),)
+
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='safety_fan_outs')
+    safety_status = models.BooleanField()
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.SmallIntegerField('status', choices=STATUS_CHOICES, default=PENDING)
+    last_building_id = models.BigIntegerField(default=0)
+    processed_buildings = models.IntegerField(default=0)
+    total_buildings = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'])]
+
+    @classmethod
+    def start(cls, community_id, safety_status, user_id=None):
+        cls.supersede([community_id])
+        return cls.objects.create(community_id=community_id, safety_status=safety_status, changed_by_id=user_id)
+
+    @classmethod
+    def supersede(cls, community_ids):
+        cls.objects.filter(community__in=community_ids, status__in=(cls.PENDING, cls.RUNNING)).\
+            update(status=cls.SUPERSEDED, finished_at=timezone.now())
+
+    @classmethod
+    def process_next_batch(cls, batch_size=None):
+        with transaction.atomic():
+            fan_out = cls.objects.select_for_update(skip_locked=True).\
+                filter(status__in=(cls.PENDING, cls.RUNNING)).order_by('id').first()
+            if fan_out:
+                fan_out.process_batch(batch_size)
+            return fan_out
+
+    def process_batch(self, batch_size=None):
+        batch_size = batch_size or SAFETY_FAN_OUT_BATCH_SIZE
+        buildings = Building.objects.filter(community=self.community_id)
+        if self.status == self.PENDING:
+            self.status = self.RUNNING
+            self.total_buildings = buildings.count()
+
+        building_ids = list(buildings.filter(id__gt=self.last_building_id).order_by('id').
+                            values_list('id', flat=True)[:batch_size])
+        Building.objects.filter(id__in=building_ids).set_safety_status(self.safety_status, self.changed_by_id)
+
+        if building_ids:
+            self.last_building_id = building_ids[-1]
+            self.processed_buildings += len(building_ids)
+        if len(building_ids) < batch_size:
+            self.status = self.DONE
+            self.finished_at = timezone.now()
+        self.save()
+
+
+class SafetyStatusRequest(models.Model):
+    """
+    Stored outcome of an explicit safety status change, replayed for a repeated `Idempotency-Key`. A key is
+    only replayed for the same community and request body, whose hash is kept in `request_hash`, and for
+    SAFETY_IDEMPOTENCY_KEY_TTL hours; `manage.py prune_idempotency_keys` deletes it afterwards.
+    """
+    key = models.CharField('idempotency key', max_length=64)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    community = models.ForeignKey(Community, on_delete=models.CASCADE)
+    request_hash = models.CharField('request hash', max_length=64, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+    @staticmethod
+    def hash_request(data):
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def matches(self, community_id, request_hash):
+        return self.community_id == community_id and self.request_hash == request_hash
+
+    @classmethod
+    def expired(cls):
+        return cls.objects.filter(created_at__lt=timezone.now() - timedelta(hours=SAFETY_IDEMPOTENCY_KEY_TTL))
+
+
+class SafetySchedule(models.Model):
+    """
+    Recurring lock window of a community, or of one of its buildings when `building` is set.
+    `next_transition_at` always holds the next lock or unlock moment, so `manage.py run_safety_scheduler`
+    finds every due schedule with one range scan instead of evaluating each schedule.
+    """
+    ALL_WEEKDAYS = 0b1111111
+
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='safety_schedules')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='safety_schedules')
+    lock_time = models.TimeField('lock time')
+    unlock_time = models.TimeField('unlock time')
+    weekdays = models.SmallIntegerField('weekdays', default=ALL_WEEKDAYS,
+                                        validators=[MinValueValidator(1), MaxValueValidator(ALL_WEEKDAYS)],
+                                        help_text='Bit mask of the days the lock starts on, Monday is 1, Sunday is 64.')
+    time_zone = models.CharField('time zone', max_length=50, default=TIME_ZONE)
+    is_active = models.BooleanField(default=True)
+    next_transition_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    next_safety_status = models.BooleanField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        self.schedule_next(timezone.now())
+        super().save(*args, **kwargs)
+
+    def schedule_next(self, after):
+        """Moves `next_transition_at` to the first transition after `after`, skipping the missed ones."""
+        if not self.is_active:
+            self.next_transition_at, self.next_safety_status = None, None
+            return
+        self.next_transition_at, self.next_safety_status = self.next_transition(after)
+
+    def next_transition(self, after):
+        zone = ZoneInfo(self.time_zone)
+        today = after.astimezone(zone).date()
+        transitions = []
+        # Starting a day back catches an overnight window that began yesterday.
+        for offset in range(-1, 8):
+            day = today + timedelta(days=offset)
+            if not self.weekdays & (1 << day.weekday()):
+                continue
+            unlock_day = day if self.unlock_time > self.lock_time else day + timedelta(days=1)
+            transitions += [(datetime.combine(day, self.lock_time, zone), True),
+                            (datetime.combine(unlock_day, self.unlock_time, zone), False)]
+        return min((transition for transition in transitions if transition[0] > after), default=(None, None))
+
+    @classmethod
+    def apply_due(cls, now=None, batch_size=None):
+        """
+        Applies the transitions due by `now` as set-based updates, one per target kind, status and author,
+        then reschedules the schedules. Returns the number of applied schedules.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            schedules = list(cls.objects.select_for_update(skip_locked=True).filter(next_transition_at__lte=now).
+                             order_by('next_transition_at')[:batch_size or SAFETY_SCHEDULER_BATCH_SIZE])
+            groups = defaultdict(list)
+            for schedule in schedules:
+                groups[schedule.building_id is not None, schedule.next_safety_status, schedule.created_by_id].\
+                    append(schedule)
+            for (for_building, safety_status, user_id), group in sorted(groups.items()):
+                if for_building:
+                    cls._apply_to_buildings(group, safety_status, user_id)
+                else:
+                    Community.bulk_set_safety_status(Community.objects.filter(id__in=[s.community_id for s in group]),
+                                                     safety_status, user_id)
+            for schedule in schedules:
+                schedule.schedule_next(now)
+            cls.objects.bulk_update(schedules, ['next_transition_at', 'next_safety_status'])
+            return len(schedules)
+
+    @staticmethod
+    def _apply_to_buildings(schedules, safety_status, user_id):
+        from .activity import activity_batch, record_activity
+        community_of = {schedule.building_id: schedule.community_id for schedule in schedules}
+        with activity_batch():
+            for pk in Building.objects.filter(id__in=community_of).set_safety_status(safety_status, user_id):
+                record_activity(community_id=community_of[pk], building_id=pk, user_id=user_id,
+                                activity=RecentActivity.SAFETY_STATUS, status=safety_status)
@@ -1,4 +1,7 @@
+from zoneinfo import available_timezones
+
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from localflavor.us.us_states import US_STATES
 from rest_framework import serializers
 
@@ -6,7 +9,7 @@ from buildings.models import Building
 from users.choices_types import ProfileRoles
 from users.serializers import MemberSerializer
 from users.validators import phone_regex
-from .models import Community, RecentActivity
+from .models import Community, RecentActivity, SafetyStatusFanOut, SafetySchedule, SafetyStatusInterval
 
 User = get_user_model()
 
@@ -17,7 +20,8 @@ class CommunitiesListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Community
-        fields = ['id', 'name', 'state', 'address', 'contact_person_name', 'phone_number', 'safety_status']
+        fields = ['id', 'name', 'state', 'address', 'contact_person_name', 'phone_number', 'safety_status',
+                  'buildings_count', 'locked_buildings_count', 'offline_stoves_count']
 
     def get_state(self, obj):
         return dict(US_STATES)[obj.state]
@@ -29,6 +33,7 @@ class CommunitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Community
         fields = '__all__'
+        read_only_fields = ['buildings_count', 'locked_buildings_count', 'offline_stoves_count']
 
 
 class CommunityEditSerializer(CommunitySerializer):
@@ -54,6 +59,89 @@ class RecentActivitySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class SafetyStatusFanOutSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display')
+
+    class Meta:
+        model = SafetyStatusFanOut
+        fields = ['id', 'safety_status', 'status', 'processed_buildings', 'total_buildings', 'created_at',
+                  'finished_at']
+
+
+class ActivityFeedQuerySerializer(serializers.Serializer):
+    community = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=5000)
+
+
+class SafetyStatusIntervalSerializer(serializers.ModelSerializer):
+    changed_by = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SafetyStatusInterval
+        fields = ['community', 'building', 'safety_status', 'started_at', 'ended_at', 'changed_by']
+
+    def get_changed_by(self, obj):
+        if obj.changed_by is None:
+            return None
+        return {'id': obj.changed_by.id, 'first_name': obj.changed_by.first_name,
+                'last_name': obj.changed_by.last_name}
+
+
+class SafetyStatusAsOfQuerySerializer(serializers.Serializer):
+    at = serializers.DateTimeField()
+    building = serializers.IntegerField(required=False)
+
+
+class SafetyTimelineQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField(required=False)
+    building = serializers.IntegerField(required=False)
+
+    def validate(self, attr):
+        attr.setdefault('end', timezone.now())
+        if attr['start'] >= attr['end']:
+            raise serializers.ValidationError({'error': "start must be before end."})
+        return attr
+
+
+class SafetyStatusSerializer(serializers.Serializer):
+    safety_status = serializers.BooleanField(required=True)
+
+
+class BulkSafetyStatusSerializer(SafetyStatusSerializer):
+    community_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    state = serializers.ChoiceField(choices=US_STATES, required=False)
+
+    def validate(self, attr):
+        if 'community_ids' not in attr and 'state' not in attr:
+            raise serializers.ValidationError({'error': "Provide community_ids or state."})
+        return attr
+
+
+class SafetyScheduleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SafetySchedule
+        fields = ['id', 'building', 'lock_time', 'unlock_time', 'weekdays', 'time_zone', 'is_active',
+                  'next_transition_at', 'next_safety_status', 'created_by', 'created_at']
+        read_only_fields = ['next_transition_at', 'next_safety_status', 'created_by', 'created_at']
+
+    def validate_time_zone(self, value):
+        if value not in available_timezones():
+            raise serializers.ValidationError("Unknown time zone.")
+        return value
+
+    def validate_building(self, value):
+        if value is not None and value.community_id != self.context['community_id']:
+            raise serializers.ValidationError("There is no such building in the community.")
+        return value
+
+    def validate(self, attr):
+        lock_time = attr.get('lock_time', getattr(self.instance, 'lock_time', None))
+        unlock_time = attr.get('unlock_time', getattr(self.instance, 'unlock_time', None))
+        if lock_time == unlock_time:
+            raise serializers.ValidationError({'error': "Lock and unlock time must differ."})
+        return attr
+
+
 class CommunityMembersListSerializer(serializers.ModelSerializer):
     role = serializers.SerializerMethodField()
     full_name = serializers.CharField()
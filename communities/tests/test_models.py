@@ -0,0 +1,233 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from buildings.models import Building
+from communities.activity import ActivityBuffer, activity_batch, record_activity
+from communities.models import Community, SafetyStatusFanOut, RecentActivity, RecentActivityDailySummary, \
+    SafetySchedule, SafetyStatusInterval
+
+User = get_user_model()
+
+
+class SafetyStatusFanOutTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204, safety_status=True)
+        for i in range(5):
+            Building.objects.create(community=self.com, name=f'building{i}', state='DC', address=f'address{i}')
+
+    def test_switch_does_not_touch_buildings_until_processed(self):
+        fan_out = self.com.switch_safety_status()
+        self.assertEqual(fan_out.status, SafetyStatusFanOut.PENDING)
+        self.assertFalse(Community.objects.get(id=self.com.id).safety_status)
+        self.assertEqual(Building.objects.filter(community=self.com, safety_status=True).count(), 5)
+
+    def test_buildings_are_processed_in_bounded_batches(self):
+        fan_out = self.com.switch_safety_status()
+        SafetyStatusFanOut.process_next_batch(batch_size=2)
+        fan_out.refresh_from_db()
+        self.assertEqual(fan_out.status, SafetyStatusFanOut.RUNNING)
+        self.assertEqual(fan_out.processed_buildings, 2)
+        self.assertEqual(Building.objects.filter(community=self.com, safety_status=False).count(), 2)
+
+        while SafetyStatusFanOut.process_next_batch(batch_size=2):
+            pass
+        fan_out.refresh_from_db()
+        self.assertEqual(fan_out.status, SafetyStatusFanOut.DONE)
+        self.assertEqual(fan_out.processed_buildings, 5)
+        self.assertIsNotNone(fan_out.finished_at)
+        self.assertFalse(Building.objects.filter(community=self.com, safety_status=True).exists())
+
+    def test_new_switch_supersedes_unfinished_fan_out(self):
+        first = self.com.switch_safety_status()
+        SafetyStatusFanOut.process_next_batch(batch_size=2)
+        second = self.com.switch_safety_status()
+        first.refresh_from_db()
+        self.assertEqual(first.status, SafetyStatusFanOut.SUPERSEDED)
+
+        while SafetyStatusFanOut.process_next_batch(batch_size=2):
+            pass
+        second.refresh_from_db()
+        self.assertEqual(second.status, SafetyStatusFanOut.DONE)
+        self.assertEqual(Building.objects.filter(community=self.com, safety_status=True).count(), 5)
+
+
+class PruneRecentActivityTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+
+    def test_old_activity_is_rolled_up_and_removed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.com.create_recent_activity_record(user_id=self.user.id, activity=RecentActivity.SAFETY_STATUS)
+        old_time = timezone.now() - timedelta(days=100)
+        RecentActivity.objects.update(switch_time=old_time)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.com.create_recent_activity_record(user_id=self.user.id, activity=RecentActivity.SAFETY_STATUS)
+
+        call_command('prune_recent_activity', '--days', '90', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(RecentActivity.objects.count(), 1)
+        summary = RecentActivityDailySummary.objects.get(community=self.com)
+        self.assertEqual(summary.day, old_time.date())
+        self.assertEqual(summary.events_count, 3)
+
+
+class SafetyScheduleTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204, safety_status=False)
+        self.com2 = Community.objects.create(name='Fiona', state='DC', zip_code=2222, address='fiona_address',
+                                             contact_person=self.user, phone_number=1230456205, safety_status=False)
+        self.build = Building.objects.create(community=self.com2, name='building1', state='DC', address='address1',
+                                             safety_status=False)
+        # Sunday 2026-10-18 12:00 UTC
+        self.noon = datetime(2026, 10, 18, 12, tzinfo=dt_timezone.utc)
+
+    def create_schedule(self, **kwargs):
+        kwargs = {'community': self.com, 'lock_time': time(22), 'unlock_time': time(6), 'created_by': self.user,
+                  **kwargs}
+        with mock.patch('communities.models.timezone.now', return_value=self.noon):
+            return SafetySchedule.objects.create(**kwargs)
+
+    def test_overnight_window_transitions(self):
+        schedule = self.create_schedule()
+        self.assertEqual(schedule.next_transition(self.noon), (datetime(2026, 10, 18, 22, tzinfo=dt_timezone.utc), True))
+        self.assertEqual(schedule.next_transition(self.noon.replace(hour=23)),
+                         (datetime(2026, 10, 19, 6, tzinfo=dt_timezone.utc), False))
+
+    def test_transitions_respect_weekdays_and_time_zone(self):
+        schedule = self.create_schedule(weekdays=1, time_zone='America/New_York')  # Mondays only
+        moment, safety_status = schedule.next_transition(self.noon)
+        self.assertEqual(moment, datetime(2026, 10, 20, 2, tzinfo=dt_timezone.utc))  # Monday 22:00 EDT
+        self.assertTrue(safety_status)
+
+    def test_inactive_schedule_is_not_scheduled(self):
+        schedule = self.create_schedule(is_active=False)
+        self.assertIsNone(schedule.next_transition_at)
+
+    def test_due_transitions_are_applied_and_rescheduled(self):
+        community_schedule = self.create_schedule()
+        building_schedule = self.create_schedule(community=self.com2, building=self.build)
+        due = community_schedule.next_transition_at
+        self.assertEqual(SafetySchedule.apply_due(now=due - timedelta(seconds=1)), 0)
+        self.assertEqual(SafetySchedule.apply_due(now=due), 2)
+
+        self.assertTrue(Community.objects.get(id=self.com.id).safety_status)
+        self.assertFalse(Community.objects.get(id=self.com2.id).safety_status)
+        self.assertTrue(Building.objects.get(id=self.build.id).safety_status)
+        self.assertEqual(set(RecentActivity.objects.values_list('community', 'building', 'user', 'status')),
+                         {(self.com.id, None, self.user.id, True), (self.com2.id, self.build.id, self.user.id, True)})
+        for schedule in (community_schedule, building_schedule):
+            schedule.refresh_from_db()
+            self.assertEqual(schedule.next_transition_at, due + timedelta(hours=8))
+            self.assertFalse(schedule.next_safety_status)
+
+
+class SafetyStatusIntervalTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.start = datetime(2026, 3, 2, 12, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('communities.models.timezone.now', return_value=self.start):
+            self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                                contact_person=self.user, phone_number=1230456204)
+            self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+
+    def switch_at(self, moment, safety_status):
+        with mock.patch('communities.models.timezone.now', return_value=moment):
+            Community.bulk_set_safety_status(Community.objects.filter(id=self.com.id), safety_status, self.user.id)
+
+    def test_as_of_returns_status_and_author_at_moment(self):
+        self.switch_at(self.start + timedelta(hours=2), False)
+        self.switch_at(self.start + timedelta(hours=5), True)
+        self.assertIsNone(SafetyStatusInterval.as_of(self.com.id, self.start - timedelta(seconds=1)))
+        first = SafetyStatusInterval.as_of(self.com.id, self.start + timedelta(hours=1))
+        self.assertEqual((first.safety_status, first.changed_by_id), (True, None))
+        unlocked = SafetyStatusInterval.as_of(self.com.id, self.start + timedelta(hours=3))
+        self.assertEqual((unlocked.safety_status, unlocked.changed_by_id), (False, self.user.id))
+        self.assertEqual(unlocked.ended_at, self.start + timedelta(hours=5))
+        building = SafetyStatusInterval.as_of(self.com.id, self.start + timedelta(hours=3), self.build.id)
+        self.assertFalse(building.safety_status)
+
+    def test_building_intervals_of_fan_out_keep_author(self):
+        Community.set_safety_status(self.com.id, False, self.user.id)
+        SafetyStatusFanOut.process_next_batch()
+        building = SafetyStatusInterval.objects.get(building=self.build, ended_at__isnull=True)
+        self.assertEqual((building.safety_status, building.changed_by_id), (False, self.user.id))
+
+    def test_between_returns_overlapping_intervals(self):
+        self.switch_at(self.start + timedelta(hours=2), False)
+        self.switch_at(self.start + timedelta(hours=5), True)
+        self.switch_at(self.start + timedelta(hours=9), False)
+        intervals = SafetyStatusInterval.between(self.com.id, self.start + timedelta(hours=3),
+                                                 self.start + timedelta(hours=6))
+        self.assertEqual([interval.safety_status for interval in intervals], [False, True])
+        self.assertEqual(SafetyStatusInterval.objects.filter(community=self.com, building__isnull=True,
+                                                             ended_at__isnull=True).count(), 1)
+
+
+class RecentActivityBufferTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+
+    def activity(self):
+        return RecentActivity(community=self.com, user=self.user, activity=RecentActivity.SAFETY_STATUS, status=True)
+
+    def test_buffer_writes_records_in_one_insert_when_full(self):
+        buffer = ActivityBuffer(max_size=3, flush_interval=3600)
+        buffer.add(self.activity())
+        buffer.add(self.activity())
+        self.assertFalse(RecentActivity.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            buffer.add(self.activity())
+        self.assertEqual(sum(query['sql'].startswith('INSERT') for query in queries.captured_queries), 1)
+        self.assertEqual(RecentActivity.objects.count(), 3)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_buffered_record_keeps_time_it_was_made(self):
+        buffer = ActivityBuffer(max_size=10, flush_interval=3600)
+        activity = self.activity()
+        made_at = activity.switch_time
+        buffer.add(activity)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(RecentActivity.objects.get().switch_time, made_at)
+
+    def test_record_in_transaction_is_buffered_once_committed(self):
+        with mock.patch('communities.activity.get_activity_buffer') as get_buffer:
+            with self.captureOnCommitCallbacks(execute=True):
+                activity = record_activity(community_id=self.com.id, user_id=self.user.id,
+                                           activity=RecentActivity.SAFETY_STATUS, status=False)
+                with self.assertRaises(ValueError), transaction.atomic():
+                    record_activity(community_id=self.com.id, user_id=self.user.id,
+                                    activity=RecentActivity.SAFETY_STATUS, status=True)
+                    raise ValueError
+                get_buffer.return_value.add.assert_not_called()
+        get_buffer.return_value.add.assert_called_once_with(activity)
+        self.assertFalse(RecentActivity.objects.exists())
+
+    def test_batch_writes_its_records_with_the_transaction(self):
+        with CaptureQueriesContext(connection) as queries, activity_batch():
+            for _ in range(4):
+                record_activity(community_id=self.com.id, user_id=self.user.id,
+                                activity=RecentActivity.SAFETY_STATUS, status=False)
+            self.assertFalse(RecentActivity.objects.exists())
+        self.assertEqual(sum(query['sql'].startswith('INSERT') for query in queries.captured_queries), 1)
+        self.assertEqual(RecentActivity.objects.count(), 4)
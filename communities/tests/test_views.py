@@ -1,14 +1,18 @@
 import tempfile
+from datetime import time, timedelta
+from io import StringIO
 from PIL import Image
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from localflavor.us.us_states import US_STATES
 
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
 from buildings.models import Building
-from communities.models import Community
+from communities.models import Community, RecentActivity, SafetyStatusFanOut, SafetyStatusRequest, SafetySchedule
 from users.choices_types import ProfileRoles
 from users.models import Profile
 
@@ -58,19 +62,33 @@ class CommunitiesListAPIViewTestCase(APITestCase):
                                                              'address': self.com1.address,
                                                              'contact_person_name': self.com1.contact_person.get_full_name(),
                                                              'phone_number': str(self.com1.phone_number),
-                                                             'safety_status': self.com1.safety_status})
+                                                             'safety_status': self.com1.safety_status,
+                                                             'buildings_count': 0, 'locked_buildings_count': 0,
+                                                             'offline_stoves_count': 0})
         self.assertEqual(dict(response.data['results'][1]), {'id': self.com2.id, 'name': self.com2.name,
                                                              'state': dict(US_STATES)[self.com2.state],
                                                              'address': self.com2.address,
                                                              'contact_person_name': self.com2.contact_person.get_full_name(),
                                                              'phone_number': str(self.com2.phone_number),
-                                                             'safety_status': self.com2.safety_status})
+                                                             'safety_status': self.com2.safety_status,
+                                                             'buildings_count': 0, 'locked_buildings_count': 0,
+                                                             'offline_stoves_count': 0})
         self.assertEqual(dict(response.data['results'][2]), {'id': self.com3.id, 'name': self.com3.name,
                                                              'state': dict(US_STATES)[self.com3.state],
                                                              'address': self.com3.address,
                                                              'contact_person_name': self.com3.contact_person.get_full_name(),
                                                              'phone_number': str(self.com3.phone_number),
-                                                             'safety_status': self.com3.safety_status})
+                                                             'safety_status': self.com3.safety_status,
+                                                             'buildings_count': 0, 'locked_buildings_count': 0,
+                                                             'offline_stoves_count': 0})
+
+    def test_list_shows_locked_buildings_counters(self):
+        Building.objects.create(community=self.com1, name='building1', state='AL', address='address1')
+        Building.objects.create(community=self.com1, name='building2', state='AL', address='address2',
+                                safety_status=False)
+        response = self.client.get(self.url, data={'search': 'comm'})
+        self.assertEqual(response.data['results'][0]['buildings_count'], 2)
+        self.assertEqual(response.data['results'][0]['locked_buildings_count'], 1)
 
     def test_get_search_by_contact_person(self):
         response = self.client.get(self.url, data={'search': 'lastsuper'})
@@ -229,6 +247,21 @@ class CommunitiesListAPIViewFilterTestCase(APITestCase):
         self.assertEqual(response_order, expected_order)
 
 
+    def test_communities_list_search_by_name_state_or_contact_person(self):
+        response = self.client.get(self.url + '?search=www')
+        self.assertEqual(sorted(item['id'] for item in response.data['results']), [self.com3.id, self.com4.id])
+        response = self.client.get(self.url + '?search=de')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.com5.id])
+        response = self.client.get(self.url + '?search=user2_first last2')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.com5.id])
+
+    def test_communities_list_search_terms_must_all_match(self):
+        response = self.client.get(self.url + '?search=www user3')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.com4.id])
+        response = self.client.get(self.url + '?search=www&safety_status=true')
+        self.assertEqual(response.data['count'], 0)
+
+
 class CommunitySwitchSafetyStatusTestCase(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -251,9 +284,28 @@ class CommunitySwitchSafetyStatusTestCase(APITestCase):
         response = self.client.put(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['safety_status'], False)
+        self.assertEqual(response.data['fan_out']['status'], 'pending')
+        call_command('run_safety_fan_out', '--once')
         self.assertEqual(Building.objects.get(id=self.build1.id).safety_status, False)
         self.assertEqual(Building.objects.get(id=self.build2.id).safety_status, False)
 
+    def test_safety_status_fan_out_progress(self):
+        response = self.client.put(self.url)
+        fan_out_url = reverse('v1.0:communities:safety-status-fan-out', args=[self.com.id, response.data['fan_out']['id']])
+        call_command('run_safety_fan_out', '--once', '--batch-size', '1')
+        response = self.client.get(fan_out_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['processed_buildings'], 2)
+        self.assertEqual(response.data['total_buildings'], 2)
+
+    def test_safety_status_fan_out_of_other_community(self):
+        com = Community.objects.create(name='Other', state='DC', zip_code=1111, address='other_address',
+                                       contact_person=self.user, phone_number=1230456204)
+        fan_out = com.switch_safety_status()
+        response = self.client.get(reverse('v1.0:communities:safety-status-fan-out', args=[self.com.id, fan_out.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_communities_ensure_switch_safety_status_by_non_authorised_not_work(self):
         self.client.force_authenticate(user=None, token=None)
         response = self.client.put(self.url)
@@ -270,6 +322,148 @@ class CommunitySwitchSafetyStatusTestCase(APITestCase):
         self.assertEqual(response.data['detail'], 'You do not have permission to perform this action.')
 
 
+class CommunitySetSafetyStatusTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204, safety_status=True)
+        self.build = Building.objects.create(community_id=self.com.id, name='building1', state='DC',
+                                             address='address1', contact_person=self.user, phone_number=1234567)
+        self.url = reverse('v1.0:communities:set-safety-status', args=[self.com.id])
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_set_safety_status_changes_community_and_buildings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(self.url, {'safety_status': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['safety_status'], False)
+        self.assertTrue(response.data['changed'])
+        self.assertFalse(Community.objects.get(id=self.com.id).safety_status)
+        self.assertEqual(RecentActivity.objects.filter(community=self.com).count(), 1)
+        call_command('run_safety_fan_out', '--once')
+        self.assertFalse(Building.objects.get(id=self.build.id).safety_status)
+
+    def test_setting_same_safety_status_does_nothing(self):
+        response = self.client.put(self.url, {'safety_status': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['changed'])
+        self.assertIsNone(response.data['fan_out'])
+        self.assertFalse(RecentActivity.objects.filter(community=self.com).exists())
+        self.assertFalse(SafetyStatusFanOut.objects.filter(community=self.com).exists())
+
+    def test_repeated_requests_do_not_flip_flop(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(self.url, {'safety_status': False}, format='json')
+            self.client.put(self.url, {'safety_status': False}, format='json')
+        self.assertFalse(Community.objects.get(id=self.com.id).safety_status)
+        self.assertEqual(RecentActivity.objects.filter(community=self.com).count(), 1)
+
+    def test_idempotency_key_replays_first_response(self):
+        first = self.client.put(self.url, {'safety_status': False}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        Community.objects.filter(id=self.com.id).update(safety_status=True)
+        second = self.client.put(self.url, {'safety_status': False}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertTrue(Community.objects.get(id=self.com.id).safety_status)
+
+    def test_idempotency_key_reused_for_different_request(self):
+        self.client.put(self.url, {'safety_status': False}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.put(self.url, {'safety_status': True}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        other = Community.objects.create(name='Other', state='DC', zip_code=1111, address='other_address',
+                                         contact_person=self.user, phone_number=1230456205, safety_status=True)
+        response = self.client.put(reverse('v1.0:communities:set-safety-status', args=[other.id]),
+                                   {'safety_status': False}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Community.objects.get(id=self.com.id).safety_status)
+        self.assertTrue(Community.objects.get(id=other.id).safety_status)
+
+    def test_too_long_idempotency_key(self):
+        response = self.client.put(self.url, {'safety_status': False}, format='json', HTTP_IDEMPOTENCY_KEY='k' * 65)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Community.objects.get(id=self.com.id).safety_status)
+
+    def test_expired_idempotency_key_is_used_again_and_pruned(self):
+        self.client.put(self.url, {'safety_status': False}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        SafetyStatusRequest.objects.update(created_at=timezone.now() - timedelta(days=2))
+        response = self.client.put(self.url, {'safety_status': True}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['changed'])
+        SafetyStatusRequest.objects.update(created_at=timezone.now() - timedelta(days=2))
+        call_command('prune_idempotency_keys', stdout=StringIO())
+        self.assertFalse(SafetyStatusRequest.objects.exists())
+
+    def test_set_safety_status_requires_value(self):
+        response = self.client.put(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_set_safety_status_for_wrong_community(self):
+        response = self.client.put(reverse('v1.0:communities:set-safety-status', args=[333]),
+                                   {'safety_status': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'There is no such community')
+
+
+class BulkSetCommunitiesSafetyStatusTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('v1.0:communities:bulk-set-safety-status')
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.user1 = User.objects.create_user(email='user1@user1.user1', password='user1',
+                                              first_name='User1_first', last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.com1 = Community.objects.create(name='com1', state='DC', zip_code=1111, address='address1',
+                                             contact_person=self.user1, phone_number=1230456204)
+        self.com2 = Community.objects.create(name='com2', state='DC', zip_code=1111, address='address2',
+                                             contact_person=self.user, phone_number=1230456204)
+        self.com3 = Community.objects.create(name='com3', state='AL', zip_code=1111, address='address3',
+                                             contact_person=self.user1, phone_number=1230456204, safety_status=False)
+        self.build1 = Building.objects.create(community=self.com1, name='building1', state='DC', address='address1')
+        self.build2 = Building.objects.create(community=self.com2, name='building2', state='DC', address='address2')
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_bulk_set_by_ids(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.put(self.url, {'safety_status': False, 'community_ids': [self.com1.id, self.com2.id,
+                                                                                        self.com3.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['changed_communities']), [self.com1.id, self.com2.id])
+        self.assertFalse(Community.objects.filter(safety_status=True).exists())
+        self.assertFalse(Building.objects.filter(safety_status=True).exists())
+        self.assertEqual(RecentActivity.objects.count(), 2)
+
+    def test_bulk_set_by_state(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.put(self.url, {'safety_status': True, 'state': 'AL'}, format='json')
+        self.assertEqual(response.data['changed_communities'], [self.com3.id])
+        self.assertTrue(Community.objects.get(id=self.com3.id).safety_status)
+
+    def test_bulk_set_is_scoped_to_supervisor_communities(self):
+        self.login('user1@user1.user1', 'user1')
+        response = self.client.put(self.url, {'safety_status': False, 'state': 'DC'}, format='json')
+        self.assertEqual(response.data['changed_communities'], [self.com1.id])
+        self.assertTrue(Community.objects.get(id=self.com2.id).safety_status)
+        self.assertTrue(Building.objects.get(id=self.build2.id).safety_status)
+
+    def test_bulk_set_supersedes_running_fan_out(self):
+        self.login('super@super.super', 'strong')
+        fan_out = self.com1.switch_safety_status()
+        self.client.put(self.url, {'safety_status': True, 'community_ids': [self.com1.id]}, format='json')
+        fan_out.refresh_from_db()
+        self.assertEqual(fan_out.status, SafetyStatusFanOut.SUPERSEDED)
+
+    def test_bulk_set_requires_filter(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.put(self.url, {'safety_status': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class CommunityAPIViewTestCase(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -363,7 +557,8 @@ class RecentActivityAPIViewTestCase(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.data['results'], [])
 
-        self.client.put(reverse('v1.0:communities:switch-safety-status', args=[self.com.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('v1.0:communities:switch-safety-status', args=[self.com.id]))
         response1 = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response1.data['results']), 1)
@@ -371,10 +566,174 @@ class RecentActivityAPIViewTestCase(APITestCase):
         self.assertEqual(response1.data['results'][0]['user'], self.user.id)
         self.assertEqual(response1.data['results'][0]['status'], Community.objects.get(id=self.com.id).safety_status)
 
-        self.client.put(reverse('v1.0:communities:switch-safety-status', args=[self.com.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('v1.0:communities:switch-safety-status', args=[self.com.id]))
         response2 = self.client.get(self.url)
         self.assertEqual(len(response2.data['results']), 2)
-        self.assertEqual(response2.data['results'][1]['status'], self.com.safety_status)
+        self.assertEqual(response2.data['results'][0]['status'], self.com.safety_status)
+
+    def test_recent_activity_keyset_pagination(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                self.com.switch_safety_status()
+                self.com.create_recent_activity_record(user_id=self.user.id, activity=RecentActivity.SAFETY_STATUS)
+        ids = list(RecentActivity.objects.order_by('-id').values_list('id', flat=True))
+
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual([item['id'] for item in response.data['results']], ids[:2])
+        self.assertIn(f'before={ids[1]}', response.data['next'])
+
+        response = self.client.get(self.url, {'limit': 2, 'before': ids[1]})
+        self.assertEqual([item['id'] for item in response.data['results']], ids[2:4])
+
+        response = self.client.get(self.url, {'limit': 2, 'before': ids[3]})
+        self.assertEqual([item['id'] for item in response.data['results']], ids[4:])
+        self.assertIsNone(response.data['next'])
+
+    def test_recent_activity_wrong_before(self):
+        response = self.client.get(self.url, {'before': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ActivityFeedAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.user1 = User.objects.create_user(email='user1@user.com', password='strong1', first_name='Supervisor',
+                                              last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.communities = [
+            Community.objects.create(name=f'community{i}', state='DC', zip_code=1111, address=f'address{i}',
+                                     contact_person=self.user1 if i % 2 else self.user, phone_number=1230456204)
+            for i in range(4)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                for community in self.communities:
+                    community.create_recent_activity_record(user_id=self.user.id,
+                                                            activity=RecentActivity.SAFETY_STATUS)
+        self.url = reverse('v1.0:communities:activity-feed')
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_administrator_feed_merges_all_communities_newest_first(self):
+        self.login('super@super.super', 'strong')
+        ids = list(RecentActivity.objects.order_by('-switch_time', '-id').values_list('id', flat=True))
+        response = self.client.get(self.url, {'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], ids[:5])
+        response = self.client.get(self.url, {'limit': 5, 'before': ids[4]})
+        self.assertEqual([item['id'] for item in response.data['results']], ids[5:10])
+
+    def test_supervisor_feed_has_only_own_communities(self):
+        self.login('user1@user.com', 'strong1')
+        own = {self.communities[1].id, self.communities[3].id}
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual({item['community'] for item in response.data['results']}, own)
+        response = self.client.get(self.url, {'community': [self.communities[0].id, self.communities[1].id]})
+        self.assertEqual({item['community'] for item in response.data['results']}, {self.communities[1].id})
+
+
+class SafetyStatusHistoryAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+        self.login('super@super.super', 'strong')
+        self.client.put(reverse('v1.0:buildings:building-safety-status', args=[self.com.id, self.build.id]),
+                        {'safety_status': False}, format='json')
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_building_status_as_of_now_names_who_changed_it(self):
+        response = self.client.get(reverse('v1.0:communities:safety-status-as-of', args=[self.com.id]),
+                                   {'at': timezone.now().isoformat(), 'building': self.build.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['safety_status'])
+        self.assertEqual(response.data['changed_by']['id'], self.user.id)
+
+    def test_status_before_history_is_bad_request(self):
+        response = self.client.get(reverse('v1.0:communities:safety-status-as-of', args=[self.com.id]),
+                                   {'at': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_timeline_lists_building_intervals(self):
+        response = self.client.get(reverse('v1.0:communities:safety-timeline', args=[self.com.id]),
+                                   {'start': (timezone.now() - timedelta(hours=1)).isoformat(),
+                                    'building': self.build.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([interval['safety_status'] for interval in response.data], [True, False])
+
+
+class SafetySchedulesAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.user1 = User.objects.create_user(email='user1@user.com', password='strong1', first_name='Supervisor',
+                                              last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.com2 = Community.objects.create(name='Fiona', state='DC', zip_code=2222, address='fiona_address',
+                                             contact_person=self.user, phone_number=1230456205, safety_status=True)
+        self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+        self.other_build = Building.objects.create(community=self.com2, name='building2', state='DC',
+                                                   address='address2')
+        self.url = reverse('v1.0:communities:safety-schedules', args=[self.com.id])
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_create_and_list_schedules(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.post(self.url, {'lock_time': '22:00', 'unlock_time': '06:00',
+                                               'time_zone': 'America/New_York', 'building': self.build.id},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created_by'], self.user.id)
+        self.assertIsNotNone(response.data['next_transition_at'])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_create_schedule_with_building_of_other_community(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.post(self.url, {'lock_time': '22:00', 'unlock_time': '06:00',
+                                               'building': self.other_build.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_schedule_with_equal_times_or_unknown_time_zone(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.post(self.url, {'lock_time': '22:00', 'unlock_time': '22:00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'lock_time': '22:00', 'unlock_time': '06:00', 'time_zone': 'Mars/Base'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deactivate_and_delete_schedule(self):
+        schedule = SafetySchedule.objects.create(community=self.com, lock_time=time(22), unlock_time=time(6),
+                                                 created_by=self.user)
+        url = reverse('v1.0:communities:safety-schedule', args=[self.com.id, schedule.id])
+        self.login('super@super.super', 'strong')
+        response = self.client.put(url, {'is_active': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['next_transition_at'])
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(SafetySchedule.objects.exists())
+
+    def test_schedules_no_access_for_supervisor_not_contact_person(self):
+        self.login('user1@user.com', 'strong1')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
 class CommunityMembersViewSetTestCase(APITestCase):
@@ -4,7 +4,9 @@ from .views import SearchPredictionsAPIView, SupervisorDataAPIView, \
     StatesListAPIView, SwitchCommunitySafetyLockAPIView, CommunitiesViewSet, CommunityAPIView, CommunityLogoAPIView, \
     RecentActivityAPIView, CommunityMembersListAPIView, MembersSearchPredictionsAPIView, DetailMemberPageAPIView, \
     DetailMemberPageAccessListAPIView, InactivateSpecificMemberAPIView, BelowRolesWithFreePropertiesListAPIView, \
-    CommunityUnassignContactPersonAPIView
+    CommunityUnassignContactPersonAPIView, SafetyStatusFanOutAPIView, SetCommunitySafetyStatusAPIView, \
+    BulkSetCommunitiesSafetyStatusAPIView, SafetySchedulesAPIView, SafetyScheduleAPIView, SafetyStatusAsOfAPIView, \
+    SafetyTimelineAPIView, ActivityFeedAPIView
 
 app_name = 'communities'
 
@@ -19,9 +21,18 @@ urlpatterns = [
     path('<int:pk>/logo/', CommunityLogoAPIView.as_view(), name='community-logo'),
     path('<int:pk>/unassign-contact-person/', CommunityUnassignContactPersonAPIView.as_view(), name='community-unassign-contact-person'),
     path('search-predictions/', SearchPredictionsAPIView.as_view(), name='search-predictions'),
+    path('activity-feed/', ActivityFeedAPIView.as_view(), name='activity-feed'),
     path('supervisor-data/', SupervisorDataAPIView.as_view(), name='supervisor-data'),
+    path('safety-status/', BulkSetCommunitiesSafetyStatusAPIView.as_view(), name='bulk-set-safety-status'),
     path('states/', StatesListAPIView.as_view(), name='states-list'),
     path('<int:pk>/switch-safety-status/', SwitchCommunitySafetyLockAPIView.as_view(), name='switch-safety-status'),
+    path('<int:pk>/safety-status/', SetCommunitySafetyStatusAPIView.as_view(), name='set-safety-status'),
+    path('<int:pk>/switch-safety-status/<int:fan_out_pk>/', SafetyStatusFanOutAPIView.as_view(),
+         name='safety-status-fan-out'),
+    path('<int:pk>/safety-status/as-of/', SafetyStatusAsOfAPIView.as_view(), name='safety-status-as-of'),
+    path('<int:pk>/safety-timeline/', SafetyTimelineAPIView.as_view(), name='safety-timeline'),
+    path('<int:pk>/safety-schedules/', SafetySchedulesAPIView.as_view(), name='safety-schedules'),
+    path('<int:pk>/safety-schedules/<int:schedule_pk>/', SafetyScheduleAPIView.as_view(), name='safety-schedule'),
     path('<int:pk>/recent-activity/', RecentActivityAPIView.as_view(), name='recent-activity'),
     path('<int:pk>/community-free-roles/', BelowRolesWithFreePropertiesListAPIView.as_view(), name='community-free-roles'),
 ]
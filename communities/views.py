@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import IntegrityError, transaction
 from django.db.models import Value, CharField, F, Q, Case, When
 from django.db.models.functions import Concat
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from localflavor.us.us_states import US_STATES
 from rest_framework import mixins, generics, status
@@ -14,16 +16,23 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from amity_api.db import FullName
+from amity_api.filters import IndexedSearchFilter
+from amity_api.pagination import RecentActivityPagination
 from amity_api.permission import IsAmityAdministrator, IsAmityAdministratorOrSupervisor, \
     IsAmityAdministratorOrCommunityContactPerson, IsAmityAdministratorOrSupervisorOrCoordinator
 from buildings.models import Building
 from users.choices_types import ProfileRoles
 from users.filters import CommunityMembersFilter
 from users.mixins import PropertyMixin, BelowRolesListMixin
-from .models import Community, RecentActivity
+from .models import Community, RecentActivity, SafetyStatusFanOut, SafetyStatusRequest, SafetySchedule, \
+    SafetyStatusInterval
 from .serializers import CommunitiesListSerializer, CommunitySerializer, \
     CommunityViewSerializer, CommunityLogoSerializer, CommunityEditSerializer, RecentActivitySerializer, \
-    CommunityMembersListSerializer, DetailMemberPageAccessSerializer, CommunityMemberSerializer
+    CommunityMembersListSerializer, DetailMemberPageAccessSerializer, CommunityMemberSerializer, \
+    SafetyStatusFanOutSerializer, SafetyStatusSerializer, BulkSafetyStatusSerializer, SafetyScheduleSerializer, \
+    SafetyStatusIntervalSerializer, SafetyStatusAsOfQuerySerializer, SafetyTimelineQuerySerializer, \
+    ActivityFeedQuerySerializer
 
 User = get_user_model()
 
@@ -44,11 +53,12 @@ class CommunitiesViewSet(mixins.CreateModelMixin,
     default_serializer_class = CommunitySerializer
     permission_classes = (IsAmityAdministratorOrSupervisor,)
 
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, IndexedSearchFilter]
     filterset_fields = ['safety_status']
     ordering_fields = ['name', 'address', 'state', 'contact_person_name']
     ordering = ['name', 'address', 'state', 'contact_person_name']
     search_fields = ['name', 'state', 'contact_person_name']
+    search_expressions = {'contact_person_name': FullName('contact_person__')}
 
     def get_serializer_class(self):
         return self.serializer_classes.get(self.action, self.default_serializer_class)
@@ -134,9 +144,166 @@ class SwitchCommunitySafetyLockAPIView(generics.UpdateAPIView):
 
     def put(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.switch_safety_status()
-        instance.create_recent_activity_record(user_id=self.request.user.id, activity=RecentActivity.SAFETY_STATUS)
-        return Response({'safety_status': instance.safety_status}, status=status.HTTP_200_OK)
+        with transaction.atomic():
+            fan_out = instance.switch_safety_status(self.request.user.id)
+            instance.create_recent_activity_record(user_id=self.request.user.id, activity=RecentActivity.SAFETY_STATUS)
+        return Response({'safety_status': instance.safety_status,
+                         'fan_out': SafetyStatusFanOutSerializer(fan_out).data}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    operation_summary="Set safety lock status for community and its buildings",
+    request_body=SafetyStatusSerializer,
+    manual_parameters=[openapi.Parameter('Idempotency-Key', openapi.IN_HEADER, type=openapi.TYPE_STRING)]
+))
+class SetCommunitySafetyStatusAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def put(self, request, pk, *args, **kwargs):
+        serializer = SafetyStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        safety_status = serializer.validated_data['safety_status']
+        key = request.headers.get('Idempotency-Key')
+        if key and len(key) > SafetyStatusRequest._meta.get_field('key').max_length:
+            return Response({'error': 'Idempotency-Key is too long'}, status=status.HTTP_400_BAD_REQUEST)
+        request_hash = SafetyStatusRequest.hash_request(serializer.validated_data)
+        if key:
+            # An expired key may be used for a new request.
+            SafetyStatusRequest.expired().filter(user=request.user, key=key).delete()
+            if previous := SafetyStatusRequest.objects.filter(user=request.user, key=key).first():
+                return self.replay(previous, pk, request_hash)
+
+        try:
+            with transaction.atomic():
+                fan_out = Community.set_safety_status(pk, safety_status, request.user.id)
+                if fan_out is None and not Community.objects.filter(id=pk).exists():
+                    return Response({'error': "There is no such community"}, status=status.HTTP_400_BAD_REQUEST)
+                data = {'safety_status': safety_status,
+                        'changed': fan_out is not None,
+                        'fan_out': SafetyStatusFanOutSerializer(fan_out).data if fan_out else None}
+                if key:
+                    SafetyStatusRequest.objects.create(key=key, user=request.user, community_id=pk,
+                                                       request_hash=request_hash, response=data)
+        except IntegrityError:
+            return self.replay(SafetyStatusRequest.objects.get(user=request.user, key=key), pk, request_hash)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def replay(previous, pk, request_hash):
+        if not previous.matches(pk, request_hash):
+            return Response({'error': 'Idempotency-Key was already used for a different request'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(previous.response, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    operation_summary="Set safety lock status for many communities and their buildings at once",
+    request_body=BulkSafetyStatusSerializer
+))
+class BulkSetCommunitiesSafetyStatusAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrSupervisor,)
+
+    def put(self, request, *args, **kwargs):
+        serializer = BulkSafetyStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        query = Community.objects.all()
+        if request.auth['role'] == ProfileRoles.SUPERVISOR:
+            query = query.filter(contact_person=request.user)
+        if 'community_ids' in data:
+            query = query.filter(id__in=data['community_ids'])
+        if 'state' in data:
+            query = query.filter(state=data['state'])
+        changed_ids = Community.bulk_set_safety_status(query, data['safety_status'], request.user.id)
+        return Response({'safety_status': data['safety_status'], 'changed_communities': changed_ids},
+                        status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Progress of safety status propagation to community buildings"
+))
+class SafetyStatusFanOutAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, fan_out_pk, *args, **kwargs):
+        if fan_out := SafetyStatusFanOut.objects.filter(id=fan_out_pk, community=pk).first():
+            return Response(SafetyStatusFanOutSerializer(fan_out).data, status=status.HTTP_200_OK)
+        return Response({'error': 'There is no such safety status change.'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Safety status of community, or of one of its buildings, at a moment",
+    query_serializer=SafetyStatusAsOfQuerySerializer
+))
+class SafetyStatusAsOfAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, *args, **kwargs):
+        serializer = SafetyStatusAsOfQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if not (interval := SafetyStatusInterval.as_of(pk, data['at'], data.get('building'))):
+            return Response({'error': "There is no safety status history at that moment."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(SafetyStatusIntervalSerializer(interval).data, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Safety status intervals of community, or of one of its buildings, over a time range",
+    query_serializer=SafetyTimelineQuerySerializer
+))
+class SafetyTimelineAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, *args, **kwargs):
+        serializer = SafetyTimelineQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        intervals = SafetyStatusInterval.between(pk, data['start'], data['end'], data.get('building'))
+        return Response(SafetyStatusIntervalSerializer(intervals, many=True).data, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="List of community safety lock schedules"
+))
+@method_decorator(name='post', decorator=swagger_auto_schema(
+    operation_summary="Create safety lock schedule for community or one of its buildings"
+))
+class SafetySchedulesAPIView(generics.ListCreateAPIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+    serializer_class = SafetyScheduleSerializer
+
+    def get_queryset(self):
+        return SafetySchedule.objects.filter(community=self.kwargs['pk']).order_by('id')
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'community_id': self.kwargs['pk']}
+
+    def perform_create(self, serializer):
+        serializer.save(community_id=self.kwargs['pk'], created_by=self.request.user)
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    operation_summary="Edit safety lock schedule",
+    request_body=SafetyScheduleSerializer
+))
+@method_decorator(name='delete', decorator=swagger_auto_schema(
+    operation_summary="Delete safety lock schedule"
+))
+class SafetyScheduleAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def put(self, request, pk, schedule_pk, *args, **kwargs):
+        if not (schedule := SafetySchedule.objects.filter(id=schedule_pk, community=pk).first()):
+            return Response({'error': "There is no such schedule."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = SafetyScheduleSerializer(schedule, data=request.data, partial=True, context={'community_id': pk})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk, schedule_pk, *args, **kwargs):
+        SafetySchedule.objects.filter(id=schedule_pk, community=pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @method_decorator(name='get', decorator=swagger_auto_schema(
@@ -181,9 +348,42 @@ class CommunityLogoAPIView(RetrieveUpdateDestroyAPIView):
 class RecentActivityAPIView(generics.ListAPIView):
     permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
     serializer_class = RecentActivitySerializer
+    pagination_class = RecentActivityPagination
+
+    def get_queryset(self):
+        return RecentActivity.objects.filter(community=self.kwargs['pk'])
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Recent activity across all communities, or across the communities of the supervisor",
+    query_serializer=ActivityFeedQuerySerializer
+))
+class ActivityFeedAPIView(generics.ListAPIView):
+    permission_classes = (IsAmityAdministratorOrSupervisor,)
+    serializer_class = RecentActivitySerializer
+    pagination_class = RecentActivityPagination
 
     def get_queryset(self):
-        return RecentActivity.objects.filter(community=self.kwargs['pk'])[:50]
+        return RecentActivity.objects.all()
+
+    def get_community_ids(self):
+        """Communities to merge the feed from, or None for every community."""
+        serializer = ActivityFeedQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        requested = serializer.validated_data.get('community')
+        if self.request.auth['role'] == ProfileRoles.AMITY_ADMINISTRATOR:
+            return requested
+        communities = Community.objects.filter(contact_person=self.request.user)
+        if requested is not None:
+            communities = communities.filter(id__in=requested)
+        return communities.values_list('id', flat=True)
+
+    def paginate_queryset(self, queryset):
+        community_ids = self.get_community_ids()
+        if community_ids is None:
+            # The whole feed is one range scan of the (-switch_time, -id) index.
+            return super().paginate_queryset(queryset)
+        return self.paginator.paginate_partitions(RecentActivity, 'community', community_ids, self.request)
 
 
 @method_decorator(name='post', decorator=swagger_auto_schema(
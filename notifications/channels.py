@@ -0,0 +1,71 @@
+import smtplib
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils.module_loading import import_string
+
+from amity_api.settings import EMAIL_HOST_USER, NOTIFICATION_CHANNELS
+
+
+class NotificationDeliveryError(Exception):
+    pass
+
+
+class BaseChannel:
+    """
+    Sends one digest (see digests.build_digests); raises NotificationDeliveryError when it could not. `name` is
+    what Notification.sent_channels records, so it must stay the same across deployments.
+    """
+    name = None
+
+    def send(self, digest):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class EmailChannel(BaseChannel):
+    """Sends digests through the configured EMAIL_BACKEND, keeping one connection open across batches."""
+    name = 'email'
+
+    def __init__(self):
+        self.connection = get_connection()
+
+    def send(self, digest):
+        message = EmailMultiAlternatives(digest['subject'], digest['message'], EMAIL_HOST_USER,
+                                         [digest['recipient'].email])
+        message.attach_alternative(digest['html'], 'text/html')
+        try:
+            # A no-op while the connection is open; reopens it after a failure closed it.
+            self.connection.open()
+            self.connection.send_messages([message])
+        except (smtplib.SMTPException, OSError) as error:
+            self.connection.close()
+            raise NotificationDeliveryError(str(error))
+
+    def close(self):
+        self.connection.close()
+
+
+class LocalChannel(BaseChannel):
+    """Keeps sent short messages in memory in place of an SMS or push provider. Used in tests and local runs."""
+    name = 'local'
+
+    def __init__(self):
+        self.sent = []
+        self.unreachable_recipients = set()
+
+    def send(self, digest):
+        if digest['recipient'].id in self.unreachable_recipients:
+            raise NotificationDeliveryError(f'Recipient {digest["recipient"].id} is unreachable.')
+        self.sent.append((digest['recipient'].phone_number or digest['recipient'].email, digest['short']))
+
+
+_channels = None
+
+
+def get_channels():
+    global _channels
+    if _channels is None:
+        _channels = [import_string(path)() for path in NOTIFICATION_CHANNELS]
+    return _channels
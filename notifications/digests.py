@@ -0,0 +1,40 @@
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+SUBJECT = 'Amity safety status changes'
+
+
+def status_name(safety_status):
+    return 'locked' if safety_status else 'unlocked'
+
+
+def build_digests(notifications):
+    """
+    One digest per recipient of notifications ordered by time: every community appears once with its
+    latest status, how many times it changed and who changed it.
+    """
+    changes = {}
+    for notification in notifications:
+        recipient_changes = changes.setdefault(notification.recipient, {})
+        change = recipient_changes.setdefault(notification.community_id, {
+            'community': notification.community.name, 'count': 0, 'changed_by': []})
+        change['status'] = status_name(notification.safety_status)
+        change['count'] += 1
+        if notification.changed_by and (name := notification.changed_by.get_full_name()) not in change['changed_by']:
+            change['changed_by'].append(name)
+    digests = []
+    for recipient, recipient_changes in changes.items():
+        html = render_to_string('safety_status_digest.html', context={
+            'first_name': recipient.first_name,
+            'last_name': recipient.last_name,
+            'changes': list(recipient_changes.values()),
+        })
+        digests.append({
+            'recipient': recipient,
+            'subject': SUBJECT,
+            'html': html,
+            'message': strip_tags(html),
+            'short': 'Amity: ' + ', '.join(f'{change["community"]} {change["status"]}'
+                                           for change in recipient_changes.values()),
+        })
+    return digests
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from amity_api.settings import NOTIFICATION_BATCH_SIZE, NOTIFICATION_IDLE_SLEEP
+from notifications.channels import get_channels
+from notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Send contact persons one digest of their pending safety status notifications through every channel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=NOTIFICATION_BATCH_SIZE, help='Recipients per batch')
+        parser.add_argument('--once', action='store_true', help='Exit when there is no digest due')
+
+    def handle(self, *args, **options):
+        channels = get_channels()
+        try:
+            while True:
+                # Digests a channel failed to send are retried later by send_next_batch itself.
+                if not Notification.send_next_batch(channels, options['batch_size']):
+                    if options['once']:
+                        return
+                    time.sleep(NOTIFICATION_IDLE_SLEEP)
+        finally:
+            for channel in channels:
+                channel.close()
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='sent_channels',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.1 on 2026-10-18 03:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0016_safety_status_request_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0002_notification_delivery_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SafetyStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('safety_status', models.BooleanField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='communities.community')),
+            ],
+        ),
+    ]
@@ -0,0 +1,154 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from amity_api.settings import NOTIFICATION_BATCH_SIZE, NOTIFICATION_QUIET_PERIOD, NOTIFICATION_MAX_DELAY, \
+    NOTIFICATION_CLAIM_TIMEOUT, NOTIFICATION_RETRY_DELAY, NOTIFICATION_MAX_RETRY_DELAY
+from buildings.models import Building
+from .channels import NotificationDeliveryError
+from .digests import build_digests
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class SafetyStatusChange(models.Model):
+    """
+    One row per community safety status change, written in the transaction that changes the status.
+    `send_notifications` turns it into a Notification per contact person, so the request does not pay
+    for looking up the contact persons of every building.
+    """
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE, related_name='+')
+    safety_status = models.BooleanField()
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+
+class Notification(models.Model):
+    """
+    Safety status changes pending for the contact persons of a community and of its buildings, expanded from
+    SafetyStatusChange rows. `manage.py send_notifications` sends each recipient one digest
+    of their pending changes once no new change came for NOTIFICATION_QUIET_PERIOD seconds. `sent_channels`
+    records the channels that already carried the change, so a retry only goes through the ones that failed.
+    """
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE, related_name='+')
+    safety_status = models.BooleanField()
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_channels = models.JSONField(default=list)
+    attempts = models.SmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], condition=Q(sent_at__isnull=True),
+                         name='pending_notifications'),
+        ]
+
+    @classmethod
+    def enqueue(cls, community_ids, safety_status, user_id=None):
+        """Queues the change of the communities; the recipients are resolved by `expand_changes`."""
+        now = timezone.now()
+        SafetyStatusChange.objects.bulk_create([
+            SafetyStatusChange(community_id=community_id, safety_status=safety_status, changed_by_id=user_id,
+                               created_at=now) for community_id in community_ids], batch_size=1000)
+
+    @classmethod
+    def expand_changes(cls, batch_size=None):
+        """
+        Turns queued changes into notifications for the active contact persons of the community and of its
+        buildings, except who made the change, batch by batch. Returns the number of changes expanded.
+        """
+        from communities.models import Community
+        expanded = 0
+        while True:
+            with transaction.atomic():
+                changes = list(SafetyStatusChange.objects.select_for_update(skip_locked=True).
+                               order_by('id')[:batch_size or NOTIFICATION_BATCH_SIZE])
+                if not changes:
+                    return expanded
+                community_ids = {change.community_id for change in changes}
+                recipients = defaultdict(list)
+                # UNION leaves one row per community and contact person, however many buildings they manage.
+                for community_id, recipient_id in Community.objects.\
+                        filter(id__in=community_ids, contact_person__is_active=True).\
+                        order_by().values_list('id', 'contact_person_id').\
+                        union(Building.objects.filter(community__in=community_ids, contact_person__is_active=True).
+                              order_by().values_list('community_id', 'contact_person_id')):
+                    recipients[community_id].append(recipient_id)
+                cls.objects.bulk_create([
+                    cls(recipient_id=recipient_id, community_id=change.community_id,
+                        safety_status=change.safety_status, changed_by_id=change.changed_by_id,
+                        created_at=change.created_at)
+                    for change in changes for recipient_id in recipients[change.community_id]
+                    if recipient_id != change.changed_by_id], batch_size=1000)
+                SafetyStatusChange.objects.filter(id__in=[change.id for change in changes]).delete()
+            expanded += len(changes)
+
+    @classmethod
+    def claim_next_batch(cls, batch_size=None):
+        """
+        Claims the pending notifications of up to `batch_size` recipients whose digest is due by moving their
+        next attempt NOTIFICATION_CLAIM_TIMEOUT ahead, so other senders skip them and they come back if this
+        one dies. The rows are only locked while claimed, not while sending.
+        """
+        now = timezone.now()
+        due = cls.objects.filter(sent_at__isnull=True, next_attempt_at__lte=now).values('recipient').\
+            annotate(first=Min('created_at'), last=Max('created_at')).\
+            filter(Q(last__lte=now - timedelta(seconds=NOTIFICATION_QUIET_PERIOD)) |
+                   Q(first__lte=now - timedelta(seconds=NOTIFICATION_MAX_DELAY))).\
+            order_by('first').values_list('recipient', flat=True)[:batch_size or NOTIFICATION_BATCH_SIZE]
+        with transaction.atomic():
+            notifications = list(cls.objects.select_for_update(skip_locked=True, of=('self',)).
+                                 filter(sent_at__isnull=True, next_attempt_at__lte=now, recipient__in=list(due)).
+                                 select_related('recipient', 'community', 'changed_by').order_by('created_at', 'id'))
+            cls.objects.filter(id__in=[notification.id for notification in notifications]).\
+                update(next_attempt_at=now + timedelta(seconds=NOTIFICATION_CLAIM_TIMEOUT))
+        return notifications
+
+    @classmethod
+    def send_next_batch(cls, channels, batch_size=None):
+        """
+        Sends the due digests through every channel and returns for how many recipients. A channel that fails
+        for a recipient holds back only that recipient on that channel, retried with an increasing delay.
+        """
+        cls.expand_changes()
+        notifications = cls.claim_next_batch(batch_size)
+        by_recipient = defaultdict(list)
+        for notification in notifications:
+            by_recipient[notification.recipient_id].append(notification)
+        for channel in channels:
+            for digest in build_digests([notification for notification in notifications
+                                         if channel.name not in notification.sent_channels]):
+                try:
+                    channel.send(digest)
+                except NotificationDeliveryError:
+                    logger.warning('Could not send digest to user %s through %s', digest['recipient'].id,
+                                   channel.name, exc_info=True)
+                    continue
+                for notification in by_recipient[digest['recipient'].id]:
+                    if channel.name not in notification.sent_channels:
+                        notification.sent_channels.append(channel.name)
+        now = timezone.now()
+        names = {channel.name for channel in channels}
+        for recipient_notifications in by_recipient.values():
+            for notification in recipient_notifications:
+                if names <= set(notification.sent_channels):
+                    notification.sent_at = now
+                else:
+                    notification.attempts += 1
+                    notification.next_attempt_at = now + cls.retry_delay(notification.attempts)
+        cls.objects.bulk_update(notifications, ['sent_channels', 'attempts', 'next_attempt_at', 'sent_at'])
+        return len(by_recipient)
+
+    @staticmethod
+    def retry_delay(attempts):
+        return timedelta(seconds=min(NOTIFICATION_RETRY_DELAY * 2 ** (attempts - 1), NOTIFICATION_MAX_RETRY_DELAY))
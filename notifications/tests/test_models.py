@@ -0,0 +1,129 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from buildings.models import Building
+from communities.models import Community
+from notifications.channels import EmailChannel, LocalChannel
+from notifications.models import Notification, SafetyStatusChange
+from users.choices_types import ProfileRoles
+
+User = get_user_model()
+
+
+class NotificationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.supervisor = User.objects.create_user(email='supervisor@amity.com', password='strong',
+                                                   first_name='Super', last_name='Visor', phone_number='+12025550100',
+                                                   role=ProfileRoles.SUPERVISOR)
+        self.manager = User.objects.create_user(email='manager@amity.com', password='strong', first_name='Build',
+                                                last_name='Manager', role=ProfileRoles.SUPERVISOR)
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.supervisor, phone_number=1230456204)
+        Building.objects.create(community=self.com, name='building1', state='DC', address='address1',
+                                contact_person=self.supervisor)
+        Building.objects.create(community=self.com, name='building2', state='DC', address='address2',
+                                contact_person=self.manager)
+        self.email, self.local = EmailChannel(), LocalChannel()
+        mail.outbox = []
+
+    def send(self, after=timedelta(minutes=5)):
+        with mock.patch('notifications.models.timezone.now', return_value=timezone.now() + after):
+            return Notification.send_next_batch([self.email, self.local])
+
+    def test_switch_request_queues_notifications_and_sends_nothing(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.client.put(reverse('v1.0:communities:switch-safety-status', args=[self.com.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(SafetyStatusChange.objects.values_list('community', 'safety_status', 'changed_by')),
+                         [(self.com.id, False, self.user.id)])
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+    def test_changes_are_expanded_to_one_notification_per_contact_person(self):
+        Building.objects.create(community=self.com, name='building3', state='DC', address='address3',
+                                contact_person=self.manager)
+        self.com.switch_safety_status(self.user.id)
+        self.assertEqual(Notification.expand_changes(), 1)
+        self.assertEqual(sorted(Notification.objects.values_list('recipient', 'safety_status', 'changed_by')),
+                         sorted([(self.supervisor.id, False, self.user.id), (self.manager.id, False, self.user.id)]))
+        self.assertFalse(SafetyStatusChange.objects.exists())
+
+    def test_flurry_of_toggles_is_sent_as_one_digest_per_recipient(self):
+        for _ in range(3):
+            self.com.switch_safety_status(self.user.id)
+        self.assertEqual(self.send(), 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['manager@amity.com',
+                                                                            'supervisor@amity.com'])
+        self.assertIn('Davida is now unlocked', mail.outbox[0].body)
+        self.assertIn('changed 3 times', mail.outbox[0].body)
+        self.assertIn(('+12025550100', 'Amity: Davida unlocked'), self.local.sent)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(self.send(), 0)
+
+    def test_digest_waits_for_toggles_to_settle(self):
+        Community.set_safety_status(self.com.id, False, self.user.id)
+        self.assertEqual(self.send(after=timedelta(seconds=10)), 0)
+        # Changes that keep coming delay the digest only up to the maximum delay.
+        self.assertEqual(self.send(after=timedelta(hours=1)), 2)
+
+    def test_who_made_the_change_is_not_notified(self):
+        Community.bulk_set_safety_status(Community.objects.filter(id=self.com.id), False, self.supervisor.id)
+        Notification.expand_changes()
+        self.assertEqual(list(Notification.objects.values_list('recipient', flat=True)), [self.manager.id])
+
+    def test_failed_channel_is_retried_alone_for_its_recipient(self):
+        self.com.switch_safety_status(self.user.id)
+        self.local.unreachable_recipients.add(self.manager.id)
+        with self.assertLogs('notifications.models', 'WARNING'):
+            self.assertEqual(self.send(), 2)
+        self.assertEqual(list(Notification.objects.filter(sent_at__isnull=True).
+                              values_list('recipient', 'sent_channels', 'attempts')),
+                         [(self.manager.id, ['email'], 1)])
+        self.assertEqual(len(mail.outbox), 2)
+        # Nothing is retried before the backoff runs out.
+        self.assertEqual(self.send(after=timedelta(minutes=5, seconds=10)), 0)
+        self.local.unreachable_recipients.clear()
+        self.assertEqual(self.send(after=timedelta(minutes=10)), 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn(('manager@amity.com', 'Amity: Davida unlocked'), self.local.sent)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_claimed_notifications_are_skipped_by_other_senders(self):
+        self.com.switch_safety_status(self.user.id)
+        Notification.expand_changes()
+        with mock.patch('notifications.models.timezone.now', return_value=timezone.now() + timedelta(hours=1)):
+            self.assertEqual(len(Notification.claim_next_batch()), 2)
+            self.assertEqual(Notification.claim_next_batch(), [])
+        # A sender that died releases its claim once the lease runs out.
+        with mock.patch('notifications.models.timezone.now', return_value=timezone.now() + timedelta(hours=2)):
+            self.assertEqual(len(Notification.claim_next_batch()), 2)
+
+    def test_command_sends_due_digests(self):
+        self.com.switch_safety_status(self.user.id)
+        with mock.patch('notifications.management.commands.send_notifications.get_channels',
+                        return_value=[self.local]), \
+                mock.patch('notifications.models.timezone.now', return_value=timezone.now() + timedelta(hours=1)):
+            call_command('send_notifications', '--once')
+        self.assertEqual(len(self.local.sent), 2)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_email_batches_reuse_one_connection(self):
+        with mock.patch('notifications.channels.get_connection') as get_connection:
+            channel = EmailChannel()
+            self.com.switch_safety_status(self.user.id)
+            with mock.patch('notifications.models.timezone.now', return_value=timezone.now() + timedelta(hours=1)):
+                self.assertEqual(Notification.send_next_batch([channel], batch_size=1), 1)
+                self.assertEqual(Notification.send_next_batch([channel], batch_size=1), 1)
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(get_connection.return_value.send_messages.call_count, 2)
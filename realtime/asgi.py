@@ -0,0 +1,207 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from amity_api.settings import REALTIME_KEEPALIVE, GATEWAY_LONG_POLL_TIMEOUT
+from communities.models import Community
+from stoves.desired_state import desired_state, gateway_version, current_version
+from users.choices_types import ProfileRoles
+from .brokers import get_broker
+from .events import community_channel, building_channel
+
+User = get_user_model()
+
+COMMUNITY_EVENTS_PATH = re.compile(r'^/api/v1\.0/communities/(?P<pk>\d+)/events/$')
+DESIRED_STATE_PATH = re.compile(r'^/api/v1\.0/gateway/desired-state/$')
+
+
+def get_token(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization' and value.startswith(b'Bearer '):
+            return value[len(b'Bearer '):].decode('latin1')
+    # Browsers cannot set headers on EventSource and WebSocket, so the token may come as a query parameter.
+    return parse_qs(scope.get('query_string', b'').decode('latin1')).get('token', [None])[0]
+
+
+@sync_to_async
+def has_community_access(raw_token, community_id):
+    close_old_connections()
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return False
+    if not User.objects.filter(id=token['user_id'], is_active=True).exists():
+        return False
+    if token['role'] == ProfileRoles.AMITY_ADMINISTRATOR:
+        return Community.objects.filter(id=community_id).exists()
+    return token['role'] == ProfileRoles.SUPERVISOR and \
+        Community.objects.filter(id=community_id, contact_person_id=token['user_id']).exists()
+
+
+def get_gateway_key(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization' and value.startswith(b'Gateway '):
+            return value[len(b'Gateway '):].strip().decode('latin1')
+    return None
+
+
+def get_since_version(scope):
+    value = parse_qs(scope.get('query_string', b'').decode('latin1')).get('since_version', [''])[0]
+    return int(value) if value.isdigit() else None
+
+
+@sync_to_async
+def get_gateway_version(key):
+    close_old_connections()
+    return gateway_version(key)
+
+
+@sync_to_async
+def get_current_version(building_id):
+    close_old_connections()
+    return current_version(building_id)
+
+
+@sync_to_async
+def get_desired_state(building_id):
+    close_old_connections()
+    return desired_state(building_id)
+
+
+async def wait_for_disconnect(receive, disconnect_type):
+    while (await receive())['type'] != disconnect_type:
+        pass
+
+
+async def stream_events(subscription, disconnected, send_event, send_keepalive):
+    while True:
+        event = asyncio.ensure_future(subscription.get())
+        done, _ = await asyncio.wait({event, disconnected}, timeout=REALTIME_KEEPALIVE,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if disconnected in done:
+            event.cancel()
+            return
+        if event in done:
+            await send_event(event.result())
+        else:
+            event.cancel()
+            await send_keepalive()
+
+
+async def server_sent_events(scope, receive, send, community_id):
+    token = get_token(scope)
+    if not token or not await has_community_access(token, community_id):
+        await send({'type': 'http.response.start', 'status': 403,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body',
+                    'body': b'{"detail": "You do not have permission to perform this action."}'})
+        return
+
+    subscription = get_broker().subscribe(community_channel(community_id))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive, 'http.disconnect'))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+
+        async def send_event(event):
+            body = f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'.encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        async def send_keepalive():
+            await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+
+        await stream_events(subscription, disconnected, send_event, send_keepalive)
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def websocket_events(scope, receive, send, community_id):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    token = get_token(scope)
+    if not token or not await has_community_access(token, community_id):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    subscription = get_broker().subscribe(community_channel(community_id))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive, 'websocket.disconnect'))
+    try:
+        await send({'type': 'websocket.accept'})
+
+        async def send_event(event):
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+        async def send_keepalive():
+            await send({'type': 'websocket.send', 'text': json.dumps({'type': 'keep-alive'})})
+
+        await stream_events(subscription, disconnected, send_event, send_keepalive)
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def desired_state_long_poll(scope, receive, send, django_application):
+    """
+    Holds a desired-state request whose `since_version` is still current until the building state changes
+    or GATEWAY_LONG_POLL_TIMEOUT passes, answering 304 in the latter case. Requests that can be answered
+    at once or are malformed go to the Django view.
+    """
+    key, since_version = get_gateway_key(scope), get_since_version(scope)
+    found = await get_gateway_version(key) if key and since_version is not None else None
+    if found is None or found[1] > since_version:
+        return await django_application(scope, receive, send)
+
+    building_id = found[0]
+    subscription = get_broker().subscribe(building_channel(building_id))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive, 'http.disconnect'))
+    event = asyncio.ensure_future(subscription.get())
+    try:
+        # The state may have changed between the first read and the subscription.
+        if (await get_current_version(building_id) or 0) <= since_version:
+            done, _ = await asyncio.wait({event, disconnected}, timeout=GATEWAY_LONG_POLL_TIMEOUT,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                return
+            if event not in done:
+                await send({'type': 'http.response.start', 'status': 304, 'headers': []})
+                return await send({'type': 'http.response.body', 'body': b''})
+        document = await get_desired_state(building_id)
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps(document).encode()})
+    finally:
+        event.cancel()
+        disconnected.cancel()
+        subscription.close()
+
+
+class RealtimeRouter:
+    """
+    Serves community event streams over SSE and WebSocket and gateway desired-state long polls,
+    and hands every other request to Django.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+
+    async def __call__(self, scope, receive, send):
+        match = COMMUNITY_EVENTS_PATH.match(scope.get('path', ''))
+        if match and scope['type'] == 'http' and scope['method'] == 'GET':
+            return await server_sent_events(scope, receive, send, int(match['pk']))
+        if match and scope['type'] == 'websocket':
+            return await websocket_events(scope, receive, send, int(match['pk']))
+        if scope['type'] == 'http' and scope.get('method') == 'GET' and DESIRED_STATE_PATH.match(scope['path']):
+            return await desired_state_long_poll(scope, receive, send, self.django_application)
+        if scope['type'] == 'websocket':
+            await receive()
+            return await send({'type': 'websocket.close', 'code': 4404})
+        return await self.django_application(scope, receive, send)
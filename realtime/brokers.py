@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+import psycopg2
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from amity_api.settings import REALTIME_BROKER, REALTIME_QUEUE_SIZE
+
+
+class Subscription:
+    """Events of one channel for one client, handed over to the event loop that subscribed."""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=REALTIME_QUEUE_SIZE)
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self._put_nowait, event)
+
+    def _put_nowait(self, event):
+        if self.queue.full():
+            # A client that does not keep up loses the oldest events rather than slowing down everybody.
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Delivers events to the subscribers of the current process only. Used in tests and local runs."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is None:
+                return False
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[subscription.channel]
+                return True
+        return False
+
+
+class PostgresBroker(InMemoryBroker):
+    """
+    Publishes with NOTIFY so every worker process receives the event. Each process keeps one
+    LISTEN connection and spreads incoming notifications to its local subscribers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, channel, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [channel, json.dumps(event)])
+
+    def subscribe(self, channel):
+        listener = self._get_listener()
+        with self._lock:
+            first = channel not in self._subscriptions
+        subscription = super().subscribe(channel)
+        if first:
+            listener.cursor().execute(f'LISTEN "{channel}"')
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if super().unsubscribe(subscription) and self._listener is not None:
+            self._listener.cursor().execute(f'UNLISTEN "{subscription.channel}"')
+
+    def _get_listener(self):
+        if self._listener is None:
+            params = connection.get_connection_params()
+            self._listener = psycopg2.connect(**params)
+            self._listener.set_session(autocommit=True)
+            asyncio.get_running_loop().add_reader(self._listener.fileno(), self._on_notify)
+        return self._listener
+
+    def _on_notify(self):
+        self._listener.poll()
+        while self._listener.notifies:
+            notify = self._listener.notifies.pop(0)
+            self.deliver(notify.channel, json.loads(notify.payload))
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(REALTIME_BROKER)()
+    return _broker
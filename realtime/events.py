@@ -0,0 +1,28 @@
+from django.db import transaction
+
+from .brokers import get_broker
+
+SAFETY_STATUS = 'safety_status'
+BUILDINGS_SAFETY_STATUS = 'buildings_safety_status'
+ACTIVITY = 'activity'
+DESIRED_STATE = 'desired_state'
+
+
+def community_channel(community_id):
+    return f'community.{community_id}'
+
+
+def building_channel(building_id):
+    return f'building.{building_id}'
+
+
+def publish_community_event(community_id, event_type, data):
+    """Sends the event to the community subscribers once the surrounding transaction commits."""
+    event = {'type': event_type, 'community': community_id, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(community_channel(community_id), event))
+
+
+def publish_building_event(building_id, event_type, data):
+    """Sends the event to the gateway of the building once the surrounding transaction commits."""
+    event = {'type': event_type, 'building': building_id, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(building_channel(building_id), event))
@@ -0,0 +1,191 @@
+import asyncio
+import json
+
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from buildings.models import Building
+from communities.models import Community
+from realtime.asgi import RealtimeRouter
+from realtime.brokers import InMemoryBroker, get_broker
+from realtime.events import community_channel
+from stoves.models import Gateway, StoveCommand
+from users.choices_types import ProfileRoles
+
+User = get_user_model()
+
+
+async def not_found_application(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class InMemoryBrokerTestCase(APITestCase):
+    def test_published_event_reaches_every_subscriber_of_channel(self):
+        async def scenario():
+            broker = InMemoryBroker()
+            first, second = broker.subscribe('community.1'), broker.subscribe('community.1')
+            other = broker.subscribe('community.2')
+            broker.publish('community.1', {'type': 'safety_status'})
+            events = await asyncio.gather(first.get(), second.get())
+            self.assertTrue(other.queue.empty())
+            for subscription in (first, second, other):
+                subscription.close()
+            return events, broker
+
+        events, broker = async_to_sync(scenario)()
+        self.assertEqual(events, [{'type': 'safety_status'}, {'type': 'safety_status'}])
+        self.assertEqual(dict(broker._subscriptions), {})
+
+
+class CommunityEventsStreamTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.user1 = User.objects.create_user(email='user1@user1.user1', password='user1',
+                                              first_name='User1_first', last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.path = f'/api/v1.0/communities/{self.com.id}/events/'
+        self.application = RealtimeRouter(not_found_application)
+
+    def get_token(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        return res.data['access']
+
+    def stream(self, scope, connect_message, disconnect_message):
+        messages = []
+        disconnected = asyncio.Event()
+        event = {'type': 'safety_status', 'community': self.com.id, 'data': {'safety_status': False}}
+
+        async def receive():
+            if connect_message and not messages:
+                return connect_message
+            await disconnected.wait()
+            return disconnect_message
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] in ('http.response.start', 'websocket.accept'):
+                get_broker().publish(community_channel(self.com.id), event)
+            elif message.get('body') or message.get('text'):
+                disconnected.set()
+
+        async def scenario():
+            await asyncio.wait_for(self.application(scope, receive, send), timeout=5)
+
+        async_to_sync(scenario)()
+        return messages
+
+    def test_server_sent_events_stream_community_events(self):
+        token = self.get_token('super@super.super', 'strong')
+        scope = {'type': 'http', 'method': 'GET', 'path': self.path,
+                 'headers': [(b'authorization', f'Bearer {token}'.encode())]}
+        messages = self.stream(scope, None, {'type': 'http.disconnect'})
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), messages[0]['headers'])
+        body = messages[1]['body'].decode()
+        self.assertTrue(body.startswith('event: safety_status\n'))
+        self.assertEqual(json.loads(body.split('data: ')[1])['data'], {'safety_status': False})
+
+    def test_server_sent_events_without_token_are_forbidden(self):
+        scope = {'type': 'http', 'method': 'GET', 'path': self.path, 'headers': []}
+        messages = self.stream(scope, None, {'type': 'http.disconnect'})
+        self.assertEqual(messages[0]['status'], 403)
+
+    def test_websocket_streams_community_events(self):
+        token = self.get_token('super@super.super', 'strong')
+        scope = {'type': 'websocket', 'path': self.path, 'query_string': f'token={token}'.encode()}
+        messages = self.stream(scope, {'type': 'websocket.connect'}, {'type': 'websocket.disconnect'})
+        self.assertEqual(messages[0]['type'], 'websocket.accept')
+        self.assertEqual(json.loads(messages[1]['text'])['type'], 'safety_status')
+
+    def test_websocket_for_supervisor_not_contact_person_is_closed(self):
+        token = self.get_token('user1@user1.user1', 'user1')
+        scope = {'type': 'websocket', 'path': self.path, 'query_string': f'token={token}'.encode()}
+        messages = self.stream(scope, {'type': 'websocket.connect'}, {'type': 'websocket.disconnect'})
+        self.assertEqual(messages, [{'type': 'websocket.close', 'code': 4403}])
+
+    def test_other_requests_are_passed_to_django(self):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/v1.0/communities/', 'headers': []}
+        messages = self.stream(scope, None, {'type': 'http.disconnect'})
+        self.assertEqual(messages[0]['status'], 404)
+
+    def test_safety_status_switch_is_published_after_commit(self):
+        async def subscribe():
+            return get_broker().subscribe(community_channel(self.com.id))
+
+        async def collect(subscription):
+            events = [await subscription.get(), await subscription.get()]
+            subscription.close()
+            return events
+
+        loop = asyncio.new_event_loop()
+        try:
+            subscription = loop.run_until_complete(subscribe())
+            with self.captureOnCommitCallbacks(execute=True):
+                Community.set_safety_status(self.com.id, False, self.user.id)
+            events = loop.run_until_complete(asyncio.wait_for(collect(subscription), timeout=5))
+        finally:
+            loop.close()
+        self.assertEqual({event['type'] for event in events}, {'activity', 'safety_status'})
+
+
+class DesiredStateLongPollTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.application = RealtimeRouter(not_found_application)
+
+    def unlock(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Building.objects.filter(id=self.build.id).set_safety_status(False)
+
+    def poll(self, since_version, during_wait=None):
+        messages = []
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/v1.0/gateway/desired-state/',
+                 'query_string': f'since_version={since_version}'.encode(),
+                 'headers': [(b'authorization', f'Gateway {self.gateway.key}'.encode())]}
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        async def scenario():
+            request = asyncio.ensure_future(self.application(scope, receive, send))
+            if during_wait:
+                await asyncio.sleep(0.1)
+                await sync_to_async(during_wait)()
+            await asyncio.wait_for(request, timeout=5)
+
+        async_to_sync(scenario)()
+        return messages
+
+    def test_outdated_version_is_passed_to_django_at_once(self):
+        self.unlock()
+        messages = self.poll(1)
+        self.assertEqual(messages[0]['status'], 404)
+
+    def test_current_version_is_not_modified_after_timeout(self):
+        with mock.patch('realtime.asgi.GATEWAY_LONG_POLL_TIMEOUT', 0.05):
+            messages = self.poll(1)
+        self.assertEqual(messages[0]['status'], 304)
+
+    def test_waiting_poll_returns_new_state_on_change(self):
+        messages = self.poll(1, during_wait=self.unlock)
+        self.assertEqual(messages[0]['status'], 200)
+        command = StoveCommand.objects.get(building=self.build)
+        self.assertEqual(json.loads(messages[1]['body']),
+                         {'building': self.build.id, 'version': 2, 'safety_status': False,
+                          'commands': [{'id': command.id, 'command': StoveCommand.MASTER_ON}]})
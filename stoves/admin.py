@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+from .models import Gateway, Stove, StoveCommand
+
+admin.site.register(Gateway)
+admin.site.register(Stove)
+admin.site.register(StoveCommand)
@@ -0,0 +1,137 @@
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import Q
+
+from buildings.models import Building
+from communities.activity import activity_batch, record_activity
+from communities.models import RecentActivity
+from .models import Alert, AlertRule, AlertRuleState
+
+
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp), dt_timezone.utc)
+
+
+def detect_violations(stove_index, times, mask, values, since, alerted, duration):
+    """
+    Finds the runs of consecutive violating readings of every stove in one batch.
+
+    Readings are sorted by stove and time; `stove_index` points into the per-stove arrays `since`
+    (start of a violation carried over from the previous batch, NaN when there is none) and `alerted`
+    (that carried violation already raised an alert). Returns a dict of per-run arrays for the runs that
+    reach `duration` seconds (`stove`, `started_at`, `triggered_at`, `peak`, `resolved_at`) and of
+    per-stove arrays for the state after the batch (`since`, `alerted`, `continues`, `cleared_at`).
+    """
+    count = len(mask)
+    new_run = np.ones(count, dtype=bool)
+    new_run[1:] = (stove_index[1:] != stove_index[:-1]) | (mask[1:] != mask[:-1])
+    starts = np.flatnonzero(new_run)
+    ends = np.append(starts[1:], count) - 1
+    run_stove = stove_index[starts]
+    violating = mask[starts]
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = run_stove[1:] != run_stove[:-1]
+    last = np.ones(len(starts), dtype=bool)
+    last[:-1] = run_stove[1:] != run_stove[:-1]
+
+    carried = first & violating & ~np.isnan(since[run_stove])
+    run_start = np.where(carried, since[run_stove], times[starts])
+    was_alerted = carried & alerted[run_stove]
+    triggered = violating & ~was_alerted & (times[ends] - run_start >= duration)
+    peak = np.maximum.reduceat(values, starts)
+    # A run followed by calm readings of the same stove ends where the next run begins.
+    ended_at = np.where(last, np.nan, times[np.minimum(ends + 1, count - 1)])
+
+    final_since = np.full(len(since), np.nan)
+    final_alerted = np.zeros(len(since), dtype=bool)
+    stoves_of_last = run_stove[last]
+    final_since[stoves_of_last] = np.where(violating[last], run_start[last], np.nan)
+    final_alerted[stoves_of_last] = violating[last] & (was_alerted | triggered)[last]
+    continues = np.zeros(len(since), dtype=bool)
+    continues[run_stove[first & last]] = carried[first & last]
+    cleared_at = np.full(len(since), np.nan)
+    calm_stoves, first_calm = np.unique(run_stove[~violating], return_index=True)
+    cleared_at[calm_stoves] = times[starts[~violating]][first_calm]
+
+    return {
+        'stove': run_stove[triggered],
+        'started_at': run_start[triggered],
+        'triggered_at': np.maximum(run_start + duration, times[starts])[triggered],
+        'peak': peak[triggered],
+        'resolved_at': ended_at[triggered],
+        'since': final_since,
+        'alerted': final_alerted,
+        'continues': continues,
+        'cleared_at': cleared_at,
+    }
+
+
+def rule_mask(rule, power, temperature, locked):
+    if rule.kind == AlertRule.TEMPERATURE_ABOVE:
+        return temperature > rule.threshold
+    return power & locked
+
+
+def evaluate_alerts(rows, building_id):
+    """Evaluates the alert rules of the building over a batch of reading rows. Returns the raised alerts."""
+    building = Building.objects.values('community_id', 'safety_status').get(id=building_id)
+    rules = list(AlertRule.objects.filter(community=building['community_id'], is_active=True).
+                 filter(Q(building__isnull=True) | Q(building=building_id)).exclude(kind=AlertRule.LEFT_ON))
+    if not rules or not rows:
+        return []
+
+    stove_ids, _, recorded_at, power, temperature = zip(*rows)
+    stoves = np.array(stove_ids, dtype=np.int64)
+    times = np.array([moment.timestamp() for moment in recorded_at])
+    order = np.lexsort((times, stoves))
+    stoves, times = stoves[order], times[order]
+    power = np.array(power, dtype=bool)[order]
+    temperature = np.array(temperature, dtype=np.float64)[order]
+    unique_stoves, stove_index = np.unique(stoves, return_inverse=True)
+    states = {(state.rule_id, state.stove_id): state for state in
+              AlertRuleState.objects.filter(rule__in=rules, stove__in=unique_stoves.tolist())}
+
+    alerts, finished, open_states = [], [], []
+    for rule in rules:
+        rule_states = [states.get((rule.id, stove_id)) for stove_id in unique_stoves.tolist()]
+        since = np.array([state.violating_since.timestamp() if state else np.nan for state in rule_states])
+        alerted = np.array([bool(state and state.alert_id) for state in rule_states])
+        result = detect_violations(stove_index, times, rule_mask(rule, power, temperature, building['safety_status']),
+                                   temperature, since, alerted, rule.duration)
+
+        raised = {}
+        for position, started_at, triggered_at, peak, resolved_at in zip(
+                result['stove'].tolist(), result['started_at'].tolist(), result['triggered_at'].tolist(),
+                result['peak'].tolist(), result['resolved_at'].tolist()):
+            raised[position] = Alert(rule=rule, stove_id=int(unique_stoves[position]), building_id=building_id,
+                                     community_id=building['community_id'], started_at=to_datetime(started_at),
+                                     triggered_at=to_datetime(triggered_at),
+                                     resolved_at=None if np.isnan(resolved_at) else to_datetime(resolved_at),
+                                     value=peak if rule.kind == AlertRule.TEMPERATURE_ABOVE else None)
+            alerts.append(raised[position])
+        for position, state in enumerate(rule_states):
+            if state and state.alert_id and not result['continues'][position]:
+                finished.append(Alert(id=state.alert_id, resolved_at=to_datetime(result['cleared_at'][position])))
+            if not np.isnan(result['since'][position]):
+                open_states.append((rule, int(unique_stoves[position]), result['since'][position],
+                                    result['alerted'][position], raised.get(position),
+                                    state.alert_id if state and result['continues'][position] else None))
+
+    Alert.objects.bulk_create(alerts)
+    Alert.objects.bulk_update(finished, ['resolved_at'])
+    AlertRuleState.objects.filter(rule__in=rules, stove__in=unique_stoves.tolist()).delete()
+    AlertRuleState.objects.bulk_create([
+        AlertRuleState(rule=rule, stove_id=stove_id, violating_since=to_datetime(since),
+                       alert_id=(new_alert.id if new_alert else carried_alert_id) if alerted else None)
+        for rule, stove_id, since, alerted, new_alert, carried_alert_id in open_states
+    ])
+    record_alert_activities(alerts, building['safety_status'])
+    return alerts
+
+
+def record_alert_activities(alerts, safety_status):
+    with activity_batch():
+        for alert in alerts:
+            record_activity(community_id=alert.community_id, building_id=alert.building_id,
+                            activity=RecentActivity.ALERT, status=safety_status)
@@ -0,0 +1,177 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from amity_api.settings import STOVE_ARCHIVE_DIR, STOVE_ARCHIVE_AFTER_DAYS, STOVE_ARCHIVE_BATCH_SIZE
+from .models import StoveReading
+
+# Narrow fixed-width columns, about 11 bytes per reading: whole seconds since the epoch and tenths of a degree.
+COLUMNS = {
+    'recorded_at': np.dtype('<u4'),
+    'stove': np.dtype('<u4'),
+    'power': np.dtype('u1'),
+    'temperature': np.dtype('<i2'),
+}
+DELETE_CHUNK = 5000
+
+
+class BuildingArchive:
+    """
+    Append-only archive of the readings of one building. Every archiving run adds segments: one file per
+    column with the rows sorted by time, so the `recorded_at` column is the time index of its segment.
+    `meta.json`, replaced atomically, lists the segments with their time bounds and is the only thing
+    readers trust, so a run that dies before publishing it leaves no visible trace. It is published before
+    the database transaction deleting the archived rows commits; rows left behind when that commit fails are
+    older than `archived_before` and the next run deletes them instead of archiving them again.
+    """
+
+    def __init__(self, building_id, root=None):
+        self.path = os.path.join(root or STOVE_ARCHIVE_DIR, str(building_id))
+        self.meta_path = os.path.join(self.path, 'meta.json')
+
+    def read_meta(self):
+        try:
+            with open(self.meta_path) as meta:
+                return json.load(meta)
+        except FileNotFoundError:
+            return {'segments': [], 'archived_before': None}
+
+    def append(self, rows, archived_before):
+        """
+        Writes reading rows (stove_id, recorded_at, power, temperature) sorted by time as a new segment and
+        records that everything older than `archived_before` (epoch seconds) has been archived.
+        """
+        meta = self.read_meta()
+        if rows:
+            os.makedirs(self.path, exist_ok=True)
+            stoves, recorded_at, power, temperature = zip(*rows)
+            columns = {
+                'recorded_at': np.array([moment.timestamp() for moment in recorded_at]).astype(COLUMNS['recorded_at']),
+                'stove': np.array(stoves, dtype=COLUMNS['stove']),
+                'power': np.array(power, dtype=COLUMNS['power']),
+                'temperature': np.round(np.array(temperature) * 10).astype(COLUMNS['temperature']),
+            }
+            order = np.argsort(columns['recorded_at'], kind='stable')
+            name = f'{int(columns["recorded_at"][order[0]])}-{len(meta["segments"])}'
+            for column, values in columns.items():
+                self._write(f'{name}.{column}', values[order].tobytes())
+            meta['segments'].append({'name': name, 'rows': len(order), 'start': int(columns['recorded_at'][order[0]]),
+                                     'end': int(columns['recorded_at'][order[-1]])})
+        meta['archived_before'] = archived_before
+        self._write('meta.json', json.dumps(meta).encode())
+
+    def _write(self, filename, data):
+        temporary = os.path.join(self.path, f'.{filename}.tmp')
+        with open(temporary, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, os.path.join(self.path, filename))
+
+    def read(self, start, end, meta=None, stove_id=None, limit=None):
+        """
+        Archived readings with `start` <= recorded_at < `end` (epoch seconds), of one stove if given, as a dict
+        of NumPy arrays sorted by time, the first `limit` of them at most. Segments are memory-mapped and
+        binary-searched, so only the pages of the range are read and at most `limit` rows of each are copied.
+        """
+        parts = []
+        for segment in (meta or self.read_meta())['segments']:
+            if segment['end'] < start or segment['start'] >= end:
+                continue
+            mapped = {column: np.memmap(os.path.join(self.path, f'{segment["name"]}.{column}'), dtype=dtype,
+                                        mode='r', shape=(segment['rows'],)) for column, dtype in COLUMNS.items()}
+            first, last = np.searchsorted(mapped['recorded_at'], [start, end], side='left')
+            if stove_id is None:
+                rows = slice(first, last if limit is None else min(last, first + limit))
+            else:
+                rows = first + np.flatnonzero(mapped['stove'][first:last] == stove_id)[:limit]
+            parts.append({column: np.array(values[rows]) for column, values in mapped.items()})
+        if not parts:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+        merged = {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+        order = np.argsort(merged['recorded_at'], kind='stable')[:limit]
+        return {column: values[order] for column, values in merged.items()}
+
+
+def to_columns(recorded_at, stove, power, temperature):
+    return {
+        'recorded_at': np.asarray(recorded_at, dtype=np.float64),
+        'stove': np.asarray(stove, dtype=np.int64),
+        'power': np.asarray(power, dtype=bool),
+        'temperature': np.asarray(temperature, dtype=np.float64),
+    }
+
+
+def read_readings(building_id, start, end, stove_id=None, limit=None):
+    """
+    Readings of the building in [start, end) as NumPy columns sorted by time: `recorded_at` (epoch seconds),
+    `stove`, `power` and `temperature`, the first `limit` of them at most. The archive answers for the part
+    before its cutoff, the live table for the rest, so an old range costs no database rows.
+    """
+    archive = BuildingArchive(building_id)
+    meta = archive.read_meta()
+    archived_before = meta['archived_before'] or 0
+    parts = []
+    if start.timestamp() < archived_before:
+        archived = archive.read(start.timestamp(), min(end.timestamp(), archived_before), meta, stove_id, limit)
+        parts.append(to_columns(archived['recorded_at'], archived['stove'], archived['power'],
+                                archived['temperature'] / 10))
+        if limit is not None:
+            limit -= len(archived['recorded_at'])
+    live = StoveReading.objects.filter(building=building_id, recorded_at__gte=start, recorded_at__lt=end)
+    if archived_before:
+        live = live.filter(recorded_at__gte=datetime.fromtimestamp(archived_before, dt_timezone.utc))
+    if stove_id is not None:
+        live = live.filter(stove=stove_id)
+    # Archived readings all come before the live ones, so the live rows only fill what the archive left.
+    rows = list(live.order_by('recorded_at', 'id').values_list('recorded_at', 'stove_id', 'power', 'temperature')
+                [:limit]) if limit != 0 else []
+    if rows:
+        recorded_at, stoves, power, temperature = zip(*rows)
+        parts.append(to_columns([moment.timestamp() for moment in recorded_at], stoves, power, temperature))
+    if not parts:
+        return to_columns([], [], [], [])
+    return {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+
+def archive_building(building_id, cutoff=None, batch_size=None):
+    """
+    Moves the readings of the building older than `cutoff` to its archive, one segment per batch, deleting
+    them from the live table in the same transaction as the segment is published. Returns the moved count.
+    """
+    cutoff = cutoff or timezone.now() - timedelta(days=STOVE_ARCHIVE_AFTER_DAYS)
+    # Whole seconds, so that the archive cutoff matches the precision of the archived timestamps.
+    cutoff = cutoff.replace(microsecond=0)
+    batch_size = batch_size or STOVE_ARCHIVE_BATCH_SIZE
+    archive = BuildingArchive(building_id)
+    if archived_before := archive.read_meta()['archived_before']:
+        # Left over by a run whose delete did not commit after it published the segment holding them.
+        StoveReading.objects.filter(building=building_id,
+                                    recorded_at__lt=datetime.fromtimestamp(archived_before, dt_timezone.utc)).delete()
+    moved = 0
+    while True:
+        with transaction.atomic():
+            pending = StoveReading.objects.filter(building=building_id, recorded_at__lt=cutoff).\
+                order_by('recorded_at', 'id')
+            columns = ('id', 'stove_id', 'recorded_at', 'power', 'temperature')
+            batch = list(pending.values_list(*columns)[:batch_size])
+            archived_before = cutoff
+            if len(batch) == batch_size:
+                # The archive keeps whole seconds, so a batch must end on a second boundary: the rows of the
+                # last second go to the next batch, unless the batch is all one second and takes it whole.
+                archived_before = batch[-1][2].replace(microsecond=0)
+                batch = [row for row in batch if row[2] < archived_before]
+                if not batch:
+                    archived_before += timedelta(seconds=1)
+                    batch = list(pending.filter(recorded_at__lt=archived_before).values_list(*columns))
+            ids = [row[0] for row in batch]
+            for position in range(0, len(ids), DELETE_CHUNK):
+                StoveReading.objects.filter(id__in=ids[position:position + DELETE_CHUNK]).delete()
+            archive.append([row[1:] for row in batch], int(archived_before.timestamp()))
+        moved += len(batch)
+        if archived_before == cutoff:
+            return moved
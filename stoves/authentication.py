@@ -0,0 +1,23 @@
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Gateway
+
+
+class GatewayAuthentication(BaseAuthentication):
+    """Building gateways send `Authorization: Gateway <key>`; the gateway becomes `request.auth`."""
+    keyword = 'Gateway'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid gateway header.')
+        if gateway := Gateway.objects.filter(key=auth[1].decode('latin1')).first():
+            return AnonymousUser(), gateway
+        raise AuthenticationFailed('Invalid gateway key.')
+
+    def authenticate_header(self, request):
+        return self.keyword
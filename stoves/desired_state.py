@@ -0,0 +1,22 @@
+from buildings.models import Building
+from .models import Gateway, StoveCommand
+
+
+def desired_state(building_id):
+    """
+    The state the gateway of the building brings its stoves to; `version` grows with every change.
+    `commands` are the commands the gateway has not acknowledged yet.
+    """
+    version, safety_status = Building.objects.values_list('safety_version', 'safety_status').get(id=building_id)
+    commands = StoveCommand.objects.filter(building=building_id, status__in=StoveCommand.OPEN_STATUSES).\
+        order_by('id').values('id', 'command')
+    return {'building': building_id, 'version': version, 'safety_status': safety_status, 'commands': list(commands)}
+
+
+def gateway_version(key):
+    """Returns the building and the desired-state version of the gateway with the key in one query, or None."""
+    return Gateway.objects.filter(key=key).values_list('building_id', 'building__safety_version').first()
+
+
+def current_version(building_id):
+    return Building.objects.filter(id=building_id).values_list('safety_version', flat=True).first()
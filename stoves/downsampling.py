@@ -0,0 +1,44 @@
+import numpy as np
+
+from amity_api.settings import STOVE_REPORT_INTERVAL
+
+TEMPERATURE = 'temperature'
+USAGE = 'usage'
+METRICS = (TEMPERATURE, USAGE)
+
+
+def readings_series(readings, metric, interval=STOVE_REPORT_INTERVAL):
+    """
+    Folds reading columns (see archive.read_readings) into one point per report interval: the average
+    temperature, or for usage the share of readings with the stove on. Returns (timestamps, values).
+    """
+    slots, inverse = np.unique(np.floor(readings['recorded_at'] / interval), return_inverse=True)
+    values = readings['temperature'] if metric == TEMPERATURE else readings['power'].astype(np.float64)
+    return slots * interval, np.bincount(inverse, weights=values) / np.bincount(inverse)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and from each of `threshold` - 2 equal
+    buckets in between the point forming the largest triangle with the point kept from the previous bucket
+    and the average of the next one. Bucket averages are computed at once; only the choice of the kept point
+    depends on the previous bucket, so the loop runs `threshold` times with NumPy work per bucket.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return x, y
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    average_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts
+    average_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts
+    next_x, next_y = np.append(average_x[1:], x[-1]), np.append(average_y[1:], y[-1])
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas = np.abs((x[previous] - next_x[bucket]) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return x[kept], y[kept]
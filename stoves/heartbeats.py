@@ -0,0 +1,76 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from amity_api.settings import STOVE_OFFLINE_AFTER, STOVE_HEARTBEAT_SWEEP_BATCH_SIZE
+from buildings.models import Building
+from communities.models import Community
+from .models import Stove
+from .snapshot import get_snapshot
+
+
+def heartbeat_key(stove_id):
+    return f'stove-seen:{stove_id}'
+
+
+def record_heartbeats(stove_ids, moment=None):
+    """Remembers when the stoves were last heard from. Only the cache is written; the sweeper persists it."""
+    moment = moment or timezone.now()
+    seen = moment.timestamp()
+    # Keys outlive the offline threshold so a missed sweep does not lose the last heartbeat.
+    cache.set_many({heartbeat_key(stove_id): seen for stove_id in stove_ids}, timeout=STOVE_OFFLINE_AFTER * 2)
+    get_snapshot().record_heartbeats(stove_ids, moment)
+
+
+def sweep_heartbeats(now=None, batch_size=None):
+    """
+    Flushes the cached last-seen times to the stoves in batches, flags stoves silent for longer than
+    STOVE_OFFLINE_AFTER as offline and moves the offline counters of their buildings and communities.
+    Returns the number of stoves whose online state changed. Stoves locked by a running sweep or a
+    registration are skipped and caught up by the next sweep.
+    """
+    now = now or timezone.now()
+    offline_before = now - timedelta(seconds=STOVE_OFFLINE_AFTER)
+    batch_size = batch_size or STOVE_HEARTBEAT_SWEEP_BATCH_SIZE
+    last_id, changed = 0, 0
+    while True:
+        with transaction.atomic():
+            stoves = list(Stove.objects.select_for_update(of=('self',), skip_locked=True).filter(id__gt=last_id).order_by('id').
+                          values_list('id', 'building_id', 'building__community_id', 'last_seen_at', 'is_online')
+                          [:batch_size])
+            if not stoves:
+                return changed
+            changed += sweep_batch(stoves, offline_before)
+        last_id = stoves[-1][0]
+
+
+def sweep_batch(stoves, offline_before):
+    seen = cache.get_many([heartbeat_key(stove_id) for stove_id, *_ in stoves])
+    updates, building_deltas, community_deltas, changed = [], Counter(), Counter(), 0
+    for stove_id, building_id, community_id, last_seen_at, is_online in stoves:
+        cached = seen.get(heartbeat_key(stove_id))
+        cached = cached and datetime.fromtimestamp(cached, dt_timezone.utc)
+        seen_at = max(filter(None, (last_seen_at, cached)), default=None)
+        online = seen_at is not None and seen_at >= offline_before
+        if seen_at != last_seen_at or online != is_online:
+            updates.append(Stove(id=stove_id, last_seen_at=seen_at, is_online=online))
+        if online != is_online:
+            changed += 1
+            delta = -1 if online else 1
+            building_deltas[building_id] += delta
+            community_deltas[community_id] += delta
+    Stove.objects.bulk_update(updates, ['last_seen_at', 'is_online'])
+    apply_offline_deltas(Building, building_deltas)
+    apply_offline_deltas(Community, community_deltas)
+    return changed
+
+
+def apply_offline_deltas(model, deltas):
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        model.objects.filter(id__in=deltas).update(offline_stoves_count=F('offline_stoves_count') + Case(
+            *[When(id=pk, then=Value(delta)) for pk, delta in deltas.items()]))
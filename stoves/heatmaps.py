@@ -0,0 +1,35 @@
+import numpy as np
+
+from amity_api.settings import STOVE_REPORT_INTERVAL
+from buildings.models import Building
+from .models import StoveUsageState, BuildingUsageHeatmap, CommunityUsageHeatmap
+
+# 1970-01-01 was a Thursday, three days after the Monday that starts the week.
+EPOCH_HOUR_OF_WEEK = 3 * 24
+
+
+def batch_counters(rows):
+    """Readings and on-seconds of a batch of reading rows per hour of the week (UTC)."""
+    hours = np.array([row[2].timestamp() for row in rows]) // 3600
+    slots = ((hours + EPOCH_HOUR_OF_WEEK) % StoveUsageState.HOURS_IN_WEEK).astype(np.int64)
+    readings = np.bincount(slots, minlength=StoveUsageState.HOURS_IN_WEEK)
+    on_readings = np.bincount(slots, weights=np.array([row[3] for row in rows], dtype=np.float64),
+                              minlength=StoveUsageState.HOURS_IN_WEEK)
+    return readings, on_readings.astype(np.int64) * STOVE_REPORT_INTERVAL
+
+
+def add_counters(model, owner, owner_id, readings, on_seconds):
+    heatmap, _ = model.objects.select_for_update().get_or_create(**{owner: owner_id})
+    heatmap.readings_count = (np.array(heatmap.readings_count) + readings).tolist()
+    heatmap.on_seconds = (np.array(heatmap.on_seconds) + on_seconds).tolist()
+    heatmap.save()
+
+
+def update_heatmaps(rows, building_id):
+    """Adds a batch of reading rows of the building to its heatmap and the one of its community."""
+    if not rows:
+        return
+    readings, on_seconds = batch_counters(rows)
+    community_id = Building.objects.values_list('community_id', flat=True).get(id=building_id)
+    add_counters(BuildingUsageHeatmap, 'building_id', building_id, readings, on_seconds)
+    add_counters(CommunityUsageHeatmap, 'community_id', community_id, readings, on_seconds)
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from buildings.models import Building
+from .models import Stove, StoveReading
+from .alerts import evaluate_alerts
+from .heartbeats import record_heartbeats
+from .heatmaps import update_heatmaps
+from .rollups import update_rollups
+from .snapshot import get_snapshot
+from .usage import update_usage
+
+READING_COLUMNS = ('stove_id', 'building_id', 'recorded_at', 'power', 'temperature')
+
+
+class InvalidReading(ValueError):
+    pass
+
+
+def parse_timestamp(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if isinstance(value, str) and (timestamp := parse_datetime(value)) and timestamp.tzinfo:
+        # Rollup buckets and hour-of-week slots are cut in UTC, whatever offset the gateway sent.
+        return timestamp.astimezone(timezone.utc)
+    raise InvalidReading('timestamp must be epoch seconds or an ISO 8601 date with timezone.')
+
+
+def parse_reading(item, stove_ids, building_id):
+    if not isinstance(item, dict):
+        raise InvalidReading('Reading must be a JSON object.')
+    if not isinstance(serial_number := item.get('stove'), str) or serial_number not in stove_ids:
+        raise InvalidReading('Unknown stove.')
+    if not isinstance(power := item.get('power'), bool):
+        raise InvalidReading('power must be true or false.')
+    temperature = item.get('temperature')
+    if not isinstance(temperature, (int, float)) or isinstance(temperature, bool):
+        raise InvalidReading('temperature must be a number.')
+    return stove_ids[serial_number], building_id, parse_timestamp(item.get('timestamp')), power, float(temperature)
+
+
+def parse_readings(lines, building_id):
+    """
+    Validates a batch of NDJSON lines of one building gateway.
+    Returns the reading rows (in `READING_COLUMNS` order) and a list of per-line errors.
+    """
+    items, errors = [], []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append((number, json.loads(line)))
+        except ValueError:
+            errors.append({'line': number, 'error': 'Invalid JSON.'})
+
+    serials = {item['stove'] for _, item in items if isinstance(item, dict) and isinstance(item.get('stove'), str)}
+    stove_ids = dict(Stove.objects.filter(building=building_id, serial_number__in=serials).
+                     values_list('serial_number', 'id'))
+    rows = []
+    for number, item in items:
+        try:
+            rows.append(parse_reading(item, stove_ids, building_id))
+        except InvalidReading as e:
+            errors.append({'line': number, 'error': str(e)})
+    errors.sort(key=lambda error: error['line'])
+    return rows, errors
+
+
+def copy_readings(rows):
+    """Inserts reading rows with a single COPY on PostgreSQL and with batched INSERTs elsewhere."""
+    if connection.vendor == 'postgresql':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(f'COPY {StoveReading._meta.db_table} ({", ".join(READING_COLUMNS)}) '
+                                      f'FROM STDIN WITH (FORMAT csv)', buffer)
+    else:
+        StoveReading.objects.bulk_create([StoveReading(**dict(zip(READING_COLUMNS, row))) for row in rows],
+                                         batch_size=1000)
+
+
+def ingest_readings(lines, building_id):
+    rows, errors = parse_readings(lines, building_id)
+    if rows:
+        with transaction.atomic():
+            copy_readings(rows)
+            update_rollups(rows, building_id)
+            update_heatmaps(rows, building_id)
+            evaluate_alerts(rows, building_id)
+            update_usage(rows, building_id)
+        record_heartbeats({row[0] for row in rows})
+        snapshot = get_snapshot()
+        snapshot.update_readings(rows)
+        snapshot.set_locked([building_id], Building.objects.values_list('safety_status', flat=True).get(id=building_id))
+    return rows, errors
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from amity_api.settings import STOVE_ARCHIVE_AFTER_DAYS, STOVE_ARCHIVE_BATCH_SIZE
+from buildings.models import Building
+from stoves.archive import archive_building
+
+
+class Command(BaseCommand):
+    help = 'Move stove readings older than the archive age from the database to the columnar archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=STOVE_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--building', type=int, action='append', help='Archive only this building (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=STOVE_ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        building_ids = options['building'] or Building.objects.order_by('id').values_list('id', flat=True)
+        moved = sum(archive_building(building_id, cutoff, options['batch_size']) for building_id in building_ids)
+        self.stdout.write(f'Archived {moved} readings older than {cutoff:%Y-%m-%d %H:%M}')
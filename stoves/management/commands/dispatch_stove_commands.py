@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from amity_api.settings import STOVE_COMMAND_BATCH_SIZE, STOVE_COMMAND_IDLE_SLEEP
+from stoves.models import StoveCommand
+from stoves.transports import get_transport
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued stove commands to building gateways and redeliver unacknowledged ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=STOVE_COMMAND_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='Exit when there is nothing due for delivery')
+
+    def handle(self, *args, **options):
+        transport = get_transport()
+        while True:
+            if not StoveCommand.dispatch_next_batch(transport, options['batch_size']):
+                if options['once']:
+                    return
+                time.sleep(STOVE_COMMAND_IDLE_SLEEP)
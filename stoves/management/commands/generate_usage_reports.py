@@ -0,0 +1,27 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.models import Community
+from stoves.reports import generate_reports
+
+
+class Command(BaseCommand):
+    help = 'Build monthly stove usage reports of all communities and buildings (the previous month by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to build, as YYYY-MM')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Month must be given as YYYY-MM.')
+        else:
+            today = date.today()
+            month = date(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1)
+        reports = 0
+        for community_id in Community.objects.order_by('id').values_list('id', flat=True).iterator():
+            reports += len(generate_reports(community_id, month))
+        self.stdout.write(f'Generated {reports} reports for {month:%Y-%m}.')
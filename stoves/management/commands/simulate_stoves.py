@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from amity_api.settings import STOVE_REPORT_INTERVAL
+from stoves.simulator import prepare_buildings, simulate, toggle_building
+
+
+class Command(BaseCommand):
+    help = ('Simulate the gateways and stoves of N buildings against a running server and report throughput '
+            'and p50 / p99 latency per request kind. Lock toggles are made in this process, so the server must '
+            'use REALTIME_BROKER=realtime.brokers.PostgresBroker for gateways to be woken up at once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--buildings', type=int, default=100)
+        parser.add_argument('--stoves', type=int, default=20, help='Stoves per building')
+        parser.add_argument('--duration', type=float, default=60.0, help='Seconds')
+        parser.add_argument('--interval', type=float, default=STOVE_REPORT_INTERVAL,
+                            help='Seconds between telemetry reports of a gateway')
+        parser.add_argument('--heartbeat-every', type=int, default=3,
+                            help='Send a heartbeat every that many reports (0 to disable)')
+        parser.add_argument('--toggle-interval', type=float, default=5.0,
+                            help='Seconds between lock toggles of a random building (0 to disable)')
+        parser.add_argument('--community', default='Load simulation', help='Community holding simulated buildings')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        buildings = prepare_buildings(options['community'], options['buildings'], options['stoves'])
+        self.stdout.write(f'Simulating {len(buildings) * options["stoves"]} stoves in {len(buildings)} buildings '
+                          f'for {options["duration"]:g}s against {options["url"]}')
+        report = asyncio.run(simulate(options['url'], buildings, options['duration'], options['interval'],
+                                      options['heartbeat_every'], options['toggle_interval'],
+                                      sync_to_async(toggle_building)))
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self.stdout.write(f'{"request":<14}{"count":>9}{"errors":>8}{"per sec":>10}{"p50 ms":>10}{"p99 ms":>10}')
+        for kind, row in report.items():
+            self.stdout.write(f'{kind:<14}{row["count"]:>9}{row["errors"]:>8}{row["per_second"]:>10}'
+                              f'{row["p50_ms"] if row["p50_ms"] is not None else "-":>10}'
+                              f'{row["p99_ms"] if row["p99_ms"] is not None else "-":>10}')
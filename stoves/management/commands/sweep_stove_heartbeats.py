@@ -0,0 +1,26 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from amity_api.settings import STOVE_HEARTBEAT_SWEEP_BATCH_SIZE, STOVE_HEARTBEAT_SWEEP_INTERVAL
+from stoves.heartbeats import sweep_heartbeats
+
+
+class Command(BaseCommand):
+    help = 'Persist cached stove heartbeats and flag stoves that went silent as offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=STOVE_HEARTBEAT_SWEEP_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='Run a single sweep and exit')
+
+    def handle(self, *args, **options):
+        if isinstance(cache, LocMemCache):
+            raise CommandError('Heartbeats cached in LocMemCache are visible only to the process that received '
+                               'them; set CACHE_BACKEND to a cache shared by all processes.')
+        while True:
+            sweep_heartbeats(batch_size=options['batch_size'])
+            if options['once']:
+                return
+            time.sleep(STOVE_HEARTBEAT_SWEEP_INTERVAL)
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('buildings', '0002_alter_building_contact_person'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial_number', models.CharField(max_length=50, unique=True, verbose_name='serial number')),
+                ('name', models.CharField(blank=True, max_length=100, null=True, verbose_name='name')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stoves', to='buildings.building')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoveReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('power', models.BooleanField()),
+                ('temperature', models.FloatField()),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='buildings.building')),
+                ('stove', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='stoves.stove')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Gateway',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True, verbose_name='key')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('building', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gateway', to='buildings.building')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stovereading',
+            index=models.Index(fields=['stove', 'recorded_at'], name='stoves_stov_stove_i_1a32aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stovereading',
+            index=models.Index(fields=['building', 'recorded_at'], name='stoves_stov_buildin_f3ac59_idx'),
+        ),
+    ]
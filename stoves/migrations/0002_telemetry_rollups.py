@@ -0,0 +1,46 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0009_recentactivity_indexes_and_summary'),
+        ('buildings', '0002_alter_building_contact_person'),
+        ('stoves', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityTelemetryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.SmallIntegerField(choices=[(1, 'minute'), (2, 'hour'), (3, 'day')], verbose_name='resolution')),
+                ('bucket', models.DateTimeField()),
+                ('readings_count', models.IntegerField(default=0)),
+                ('on_seconds', models.IntegerField(default=0)),
+                ('max_temperature', models.FloatField()),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='communities.community')),
+            ],
+            options={
+                'unique_together': {('community', 'resolution', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BuildingTelemetryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.SmallIntegerField(choices=[(1, 'minute'), (2, 'hour'), (3, 'day')], verbose_name='resolution')),
+                ('bucket', models.DateTimeField()),
+                ('readings_count', models.IntegerField(default=0)),
+                ('on_seconds', models.IntegerField(default=0)),
+                ('max_temperature', models.FloatField()),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='buildings.building')),
+            ],
+            options={
+                'unique_together': {('building', 'resolution', 'bucket')},
+            },
+        ),
+    ]
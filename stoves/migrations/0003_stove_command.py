@@ -0,0 +1,41 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0002_alter_building_contact_person'),
+        ('communities', '0009_recentactivity_indexes_and_summary'),
+        ('stoves', '0002_telemetry_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoveCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.SmallIntegerField(choices=[(1, 'master_off'), (2, 'master_on')], verbose_name='command')),
+                ('status', models.SmallIntegerField(choices=[(1, 'pending'), (2, 'delivered'), (3, 'acknowledged'), (4, 'superseded'), (5, 'failed')], default=1, verbose_name='status')),
+                ('attempts', models.SmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.CharField(blank=True, max_length=255, null=True, verbose_name='last error')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('acknowledged_at', models.DateTimeField(blank=True, null=True)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commands', to='buildings.building')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='communities.community')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stovecommand',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='stoves_stov_status_7a524f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stovecommand',
+            index=models.Index(fields=['community', 'created_at'], name='stoves_stov_communi_ca2e86_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_offline_stoves_counters(apps, schema_editor):
+    Stove = apps.get_model('stoves', 'Stove')
+    Building = apps.get_model('buildings', 'Building')
+    Community = apps.get_model('communities', 'Community')
+    offline = Stove.objects.filter(is_online=False).order_by()
+    by_building = offline.filter(building=OuterRef('pk')).values('building').annotate(total=Count('id'))
+    by_community = offline.filter(building__community=OuterRef('pk')).values('building__community').\
+        annotate(total=Count('id'))
+    Building.objects.update(offline_stoves_count=Coalesce(Subquery(by_building.values('total')), 0))
+    Community.objects.update(offline_stoves_count=Coalesce(Subquery(by_community.values('total')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0003_offline_stoves'),
+        ('communities', '0011_offline_stoves'),
+        ('stoves', '0003_stove_command'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stove',
+            name='is_online',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='stove',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_offline_stoves_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0012_alerts'),
+        ('buildings', '0003_offline_stoves'),
+        ('stoves', '0004_offline_stoves'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.SmallIntegerField(choices=[(1, 'temperature_above'), (2, 'on_while_locked')], verbose_name='kind')),
+                ('threshold', models.FloatField(blank=True, null=True, verbose_name='threshold')),
+                ('duration', models.PositiveIntegerField(default=0, help_text='Seconds the condition has to last.', verbose_name='duration')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alert_rules', to='buildings.building')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_rules', to='communities.community')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Alert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('triggered_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('value', models.FloatField(blank=True, null=True, verbose_name='value')),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='buildings.building')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='communities.community')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='stoves.alertrule')),
+                ('stove', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='stoves.stove')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AlertRuleState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('violating_since', models.DateTimeField()),
+                ('alert', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='stoves.alert')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stoves.alertrule')),
+                ('stove', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stoves.stove')),
+            ],
+            options={
+                'unique_together': {('rule', 'stove')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['community', '-triggered_at', '-id'], name='stoves_aler_communi_b4117b_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stoves', '0005_alerts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alertrule',
+            name='kind',
+            field=models.SmallIntegerField(choices=[(1, 'temperature_above'), (2, 'on_while_locked'), (3, 'left_on')], verbose_name='kind'),
+        ),
+        migrations.CreateModel(
+            name='StoveUsageState',
+            fields=[
+                ('stove', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='stoves.stove')),
+                ('on_since', models.DateTimeField(blank=True, null=True)),
+                ('baseline', models.JSONField(default=list)),
+                ('baseline_samples', models.JSONField(default=list)),
+                ('alert', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='stoves.alert')),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0012_alerts'),
+        ('buildings', '0003_offline_stoves'),
+        ('stoves', '0006_stove_usage_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('data', models.JSONField()),
+                ('generated_at', models.DateTimeField()),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='usage_reports', to='buildings.building')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_reports', to='communities.community')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='usagereport',
+            constraint=models.UniqueConstraint(condition=models.Q(('building__isnull', True)), fields=('community', 'month'), name='unique_community_usage_report'),
+        ),
+        migrations.AddConstraint(
+            model_name='usagereport',
+            constraint=models.UniqueConstraint(condition=models.Q(('building__isnull', False)), fields=('building', 'month'), name='unique_building_usage_report'),
+        ),
+    ]
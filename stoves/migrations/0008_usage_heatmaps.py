@@ -0,0 +1,61 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import stoves.models
+
+HOUR = 2
+
+
+def fill_from_hourly_rollups(apps, schema_editor):
+    # The hourly rollups hold the same counters for the telemetry ingested so far.
+    for rollup_name, heatmap_name, owner in (('BuildingTelemetryRollup', 'BuildingUsageHeatmap', 'building_id'),
+                                             ('CommunityTelemetryRollup', 'CommunityUsageHeatmap', 'community_id')):
+        heatmaps = {}
+        rollups = apps.get_model('stoves', rollup_name).objects.filter(resolution=HOUR).\
+            values_list(owner, 'bucket', 'readings_count', 'on_seconds')
+        for owner_id, bucket, readings_count, on_seconds in rollups.iterator():
+            heatmap = heatmaps.setdefault(owner_id, {'readings_count': [0] * 168, 'on_seconds': [0] * 168})
+            slot = bucket.weekday() * 24 + bucket.hour
+            heatmap['readings_count'][slot] += readings_count
+            heatmap['on_seconds'][slot] += on_seconds
+        Heatmap = apps.get_model('stoves', heatmap_name)
+        Heatmap.objects.bulk_create([Heatmap(**{owner: owner_id}, **counters)
+                                     for owner_id, counters in heatmaps.items()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0004_safety_version'),
+        ('communities', '0014_activity_switch_time_default'),
+        ('stoves', '0007_usage_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildingUsageHeatmap',
+            fields=[
+                ('readings_count', models.JSONField(default=stoves.models.empty_week)),
+                ('on_seconds', models.JSONField(default=stoves.models.empty_week)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('building', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='heatmap', serialize=False, to='buildings.building')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CommunityUsageHeatmap',
+            fields=[
+                ('readings_count', models.JSONField(default=stoves.models.empty_week)),
+                ('on_seconds', models.JSONField(default=stoves.models.empty_week)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('community', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='heatmap', serialize=False, to='communities.community')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(fill_from_hourly_rollups, migrations.RunPython.noop),
+    ]
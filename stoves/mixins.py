@@ -0,0 +1,31 @@
+from rest_framework import status
+from rest_framework.response import Response
+
+from amity_api.settings import STOVE_ROLLUP_MAX_POINTS
+from buildings.models import Building
+from .models import TelemetryRollup
+from .rollups import TRUNCATE, select_resolution
+from .serializers import TelemetryRangeSerializer, TelemetryRollupSerializer
+
+
+class BuildingPropertyMixin:
+    community_url_kwarg = 'community_id'
+
+    def building_exists(self):
+        return Building.objects.filter(id=self.kwargs['pk'], community=self.kwargs['community_id']).exists()
+
+
+class TelemetryRollupMixin:
+    def rollups_response(self, queryset):
+        serializer = TelemetryRangeSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start, end = serializer.validated_data['start'], serializer.validated_data['end']
+        resolutions = {name: value for value, name in TelemetryRollup.RESOLUTION_CHOICES}
+        resolution = resolutions.get(serializer.validated_data.get('resolution')) or select_resolution(start, end)
+        if (end - start).total_seconds() / TelemetryRollup.RESOLUTION_SECONDS[resolution] > STOVE_ROLLUP_MAX_POINTS:
+            return Response({'error': f"The range holds more than {STOVE_ROLLUP_MAX_POINTS} buckets of this "
+                                      f"resolution."}, status=status.HTTP_400_BAD_REQUEST)
+        rollups = queryset.filter(resolution=resolution, bucket__gte=TRUNCATE[resolution](start), bucket__lt=end).\
+            order_by('bucket')
+        return Response({'resolution': dict(TelemetryRollup.RESOLUTION_CHOICES)[resolution],
+                         'results': TelemetryRollupSerializer(rollups, many=True).data}, status=status.HTTP_200_OK)
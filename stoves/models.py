@@ -0,0 +1,354 @@
+import secrets
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from amity_api.settings import STOVE_COMMAND_BATCH_SIZE, STOVE_COMMAND_MAX_ATTEMPTS, STOVE_COMMAND_RETRY_DELAY, \
+    STOVE_COMMAND_MAX_RETRY_DELAY, STOVE_COMMAND_ACK_TIMEOUT
+from buildings.models import Building
+
+
+class Gateway(models.Model):
+    building = models.OneToOneField(Building, on_delete=models.CASCADE, related_name='gateway')
+    key = models.CharField('key', max_length=40, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Gateway of {self.building.name}'
+
+    @staticmethod
+    def generate_key():
+        return secrets.token_hex(20)
+
+    @classmethod
+    def issue_for(cls, building_id):
+        gateway, _ = cls.objects.update_or_create(building_id=building_id, defaults={'key': cls.generate_key()})
+        return gateway
+
+
+class Stove(models.Model):
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='stoves')
+    serial_number = models.CharField('serial number', max_length=50, unique=True)
+    name = models.CharField('name', max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    is_online = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.name or self.serial_number
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding and not self.is_online:
+                self._update_offline_counters(1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if not Stove.objects.filter(id=self.id, is_online=True).exists():
+                self._update_offline_counters(-1)
+            return super().delete(*args, **kwargs)
+
+    def _update_offline_counters(self, delta):
+        building = Building.objects.filter(id=self.building_id)
+        building.update(offline_stoves_count=F('offline_stoves_count') + delta)
+        Building._meta.get_field('community').related_model.objects.\
+            filter(id__in=building.values('community_id')).\
+            update(offline_stoves_count=F('offline_stoves_count') + delta)
+
+
+class StoveReading(models.Model):
+    stove = models.ForeignKey(Stove, on_delete=models.CASCADE, related_name='readings')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE)
+    recorded_at = models.DateTimeField()
+    power = models.BooleanField()
+    temperature = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['stove', 'recorded_at']),
+            models.Index(fields=['building', 'recorded_at']),
+        ]
+
+
+class TelemetryRollup(models.Model):
+    MINUTE = 1
+    HOUR = 2
+    DAY = 3
+    RESOLUTION_CHOICES = ((MINUTE, 'minute'), (HOUR, 'hour'), (DAY, 'day'),)
+    RESOLUTION_SECONDS = {MINUTE: 60, HOUR: 60 * 60, DAY: 24 * 60 * 60}
+
+    resolution = models.SmallIntegerField('resolution', choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()
+    readings_count = models.IntegerField(default=0)
+    on_seconds = models.IntegerField(default=0)
+    max_temperature = models.FloatField()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_stoves_on(self):
+        return self.on_seconds / self.RESOLUTION_SECONDS[self.resolution]
+
+
+class BuildingTelemetryRollup(TelemetryRollup):
+    building = models.ForeignKey(Building, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ['building', 'resolution', 'bucket']
+
+
+class CommunityTelemetryRollup(TelemetryRollup):
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ['community', 'resolution', 'bucket']
+
+
+class StoveCommand(models.Model):
+    """
+    Outbox of commands for building gateways, written in the transaction that changes the building
+    safety status. `manage.py dispatch_stove_commands` delivers them through the configured
+    transport and redelivers until the gateway acknowledges, so a command may arrive more than once.
+    """
+    MASTER_OFF = 1
+    MASTER_ON = 2
+    COMMAND_CHOICES = ((MASTER_OFF, "master_off"), (MASTER_ON, "master_on"),)
+
+    PENDING = 1
+    DELIVERED = 2
+    ACKNOWLEDGED = 3
+    SUPERSEDED = 4
+    FAILED = 5
+    STATUS_CHOICES = ((PENDING, "pending"), (DELIVERED, "delivered"), (ACKNOWLEDGED, "acknowledged"),
+                      (SUPERSEDED, "superseded"), (FAILED, "failed"),)
+    OPEN_STATUSES = (PENDING, DELIVERED)
+
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='commands')
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE)
+    command = models.SmallIntegerField('command', choices=COMMAND_CHOICES)
+    status = models.SmallIntegerField('status', choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.SmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField('last error', max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['community', 'created_at']),
+        ]
+
+    @classmethod
+    def issue(cls, buildings, safety_status):
+        """Queues MASTER_OFF (locked) or MASTER_ON for the given (building_id, community_id) pairs."""
+        if not buildings:
+            return []
+        cls.objects.filter(building__in=[building_id for building_id, _ in buildings], status__in=cls.OPEN_STATUSES).\
+            update(status=cls.SUPERSEDED)
+        command = cls.MASTER_OFF if safety_status else cls.MASTER_ON
+        now = timezone.now()
+        return cls.objects.bulk_create([
+            cls(building_id=building_id, community_id=community_id, command=command, created_at=now,
+                next_attempt_at=now) for building_id, community_id in buildings
+        ])
+
+    @classmethod
+    def dispatch_next_batch(cls, transport, batch_size=None):
+        """Claims due commands that no other dispatcher holds, delivers them and returns their number."""
+        with transaction.atomic():
+            commands = list(cls.objects.select_for_update(skip_locked=True).
+                            filter(status__in=cls.OPEN_STATUSES, next_attempt_at__lte=timezone.now()).
+                            order_by('next_attempt_at')[:batch_size or STOVE_COMMAND_BATCH_SIZE])
+            for command in commands:
+                command.deliver(transport)
+            cls.objects.bulk_update(commands, ['status', 'attempts', 'next_attempt_at', 'last_error', 'delivered_at'])
+            return len(commands)
+
+    def deliver(self, transport):
+        """
+        Sends the command once more. STOVE_COMMAND_MAX_ATTEMPTS counts every send, so a command the
+        gateway never acknowledges fails as well as one the transport cannot deliver.
+        """
+        now = timezone.now()
+        if self.attempts >= STOVE_COMMAND_MAX_ATTEMPTS:
+            self.status = self.FAILED
+            self.last_error = self.last_error or 'Not acknowledged.'
+            return
+        self.attempts += 1
+        try:
+            transport.deliver(self)
+        except CommandDeliveryError as error:
+            self.last_error = str(error)[:255]
+            if self.attempts >= STOVE_COMMAND_MAX_ATTEMPTS:
+                self.status = self.FAILED
+            self.next_attempt_at = now + self.retry_delay(self.attempts)
+            return
+        self.status = self.DELIVERED
+        self.last_error = None
+        self.delivered_at = self.delivered_at or now
+        # Delivered but unacknowledged commands are sent again once the ack timeout passes, backing off like
+        # failed deliveries when the gateway keeps not answering.
+        self.next_attempt_at = now + max(timedelta(seconds=STOVE_COMMAND_ACK_TIMEOUT),
+                                         self.retry_delay(self.attempts))
+
+    @staticmethod
+    def retry_delay(attempts):
+        return timedelta(seconds=min(STOVE_COMMAND_RETRY_DELAY * 2 ** (attempts - 1), STOVE_COMMAND_MAX_RETRY_DELAY))
+
+    @classmethod
+    def acknowledge(cls, building_id, command_ids):
+        """Marks commands of the building as acknowledged. Returns the ids that were still open."""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(cls.objects.filter(id__in=command_ids, building=building_id, status__in=cls.OPEN_STATUSES).
+                       values_list('id', flat=True))
+            cls.objects.filter(id__in=ids).update(status=cls.ACKNOWLEDGED, acknowledged_at=now)
+        return ids
+
+    @classmethod
+    def delivery_metrics(cls, community_id, since):
+        """Ack latency of the community commands issued since `since`, plus everything still unacknowledged."""
+        now = timezone.now()
+        commands = cls.objects.filter(community=community_id, created_at__gte=since)
+        counts = dict(commands.order_by().values_list('status').annotate(Count('id')))
+        latencies = sorted((acknowledged_at - created_at).total_seconds() for created_at, acknowledged_at in
+                           commands.filter(status=cls.ACKNOWLEDGED).values_list('created_at', 'acknowledged_at'))
+        unacknowledged = cls.objects.filter(community=community_id, status__in=cls.OPEN_STATUSES + (cls.FAILED,)).\
+            aggregate(count=Count('id'), oldest=Min('created_at'))
+        return {
+            'issued': sum(counts.values()),
+            'acknowledged': counts.get(cls.ACKNOWLEDGED, 0),
+            'failed': counts.get(cls.FAILED, 0),
+            'unacknowledged': unacknowledged['count'],
+            'oldest_unacknowledged_seconds':
+                (now - unacknowledged['oldest']).total_seconds() if unacknowledged['oldest'] else None,
+            'ack_latency': {
+                'average': sum(latencies) / len(latencies),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'max': latencies[-1],
+            } if latencies else None,
+        }
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, -(-len(ordered) * percent // 100) - 1)]
+
+
+class CommandDeliveryError(Exception):
+    pass
+
+
+class AlertRule(models.Model):
+    """
+    Threshold rule of a community, or of one of its buildings when `building` is set. For LEFT_ON
+    `threshold` is how many times longer than usual a stove may stay on and `duration` the minimum time.
+    """
+    TEMPERATURE_ABOVE = 1
+    ON_WHILE_LOCKED = 2
+    LEFT_ON = 3
+    KIND_CHOICES = ((TEMPERATURE_ABOVE, "temperature_above"), (ON_WHILE_LOCKED, "on_while_locked"),
+                    (LEFT_ON, "left_on"),)
+
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE, related_name='alert_rules')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, null=True, blank=True, related_name='alert_rules')
+    kind = models.SmallIntegerField('kind', choices=KIND_CHOICES)
+    threshold = models.FloatField('threshold', null=True, blank=True)
+    duration = models.PositiveIntegerField('duration', default=0, help_text='Seconds the condition has to last.')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class Alert(models.Model):
+    rule = models.ForeignKey(AlertRule, on_delete=models.CASCADE, related_name='alerts')
+    stove = models.ForeignKey(Stove, on_delete=models.CASCADE, related_name='alerts')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE)
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE)
+    started_at = models.DateTimeField()
+    triggered_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    value = models.FloatField('value', null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['community', '-triggered_at', '-id'])]
+
+
+class AlertRuleState(models.Model):
+    """Violation of a rule by a stove that is still going on at the end of the last evaluated batch."""
+    rule = models.ForeignKey(AlertRule, on_delete=models.CASCADE)
+    stove = models.ForeignKey(Stove, on_delete=models.CASCADE)
+    violating_since = models.DateTimeField()
+    alert = models.ForeignKey(Alert, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        unique_together = ['rule', 'stove']
+
+
+class StoveUsageState(models.Model):
+    """
+    Running usage state of a stove: the start of the current on-session and, per hour of the week,
+    the usual session length (exponentially weighted) of sessions that started in that hour.
+    """
+    HOURS_IN_WEEK = 7 * 24
+
+    stove = models.OneToOneField(Stove, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    on_since = models.DateTimeField(null=True, blank=True)
+    baseline = models.JSONField(default=list)
+    baseline_samples = models.JSONField(default=list)
+    alert = models.ForeignKey(Alert, on_delete=models.SET_NULL, null=True, blank=True)
+
+    @classmethod
+    def hour_of_week(cls, moment):
+        return moment.weekday() * 24 + moment.hour
+
+
+def empty_week():
+    return [0] * StoveUsageState.HOURS_IN_WEEK
+
+
+class UsageHeatmap(models.Model):
+    """
+    Readings and on-seconds per hour of the week (Monday 00:00 first), added to by every ingested batch,
+    so the usual usage pattern is one row away however much telemetry it covers.
+    """
+    readings_count = models.JSONField(default=empty_week)
+    on_seconds = models.JSONField(default=empty_week)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class BuildingUsageHeatmap(UsageHeatmap):
+    building = models.OneToOneField(Building, on_delete=models.CASCADE, primary_key=True, related_name='heatmap')
+
+
+class CommunityUsageHeatmap(UsageHeatmap):
+    community = models.OneToOneField('communities.Community', on_delete=models.CASCADE, primary_key=True,
+                                     related_name='heatmap')
+
+
+class UsageReport(models.Model):
+    """Monthly usage of a community, or of one of its buildings, built from the daily rollups."""
+    community = models.ForeignKey('communities.Community', on_delete=models.CASCADE, related_name='usage_reports')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='usage_reports')
+    month = models.DateField()
+    data = models.JSONField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'month'], condition=models.Q(building__isnull=True),
+                                    name='unique_community_usage_report'),
+            models.UniqueConstraint(fields=['building', 'month'], condition=models.Q(building__isnull=False),
+                                    name='unique_building_usage_report'),
+        ]
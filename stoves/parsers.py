@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Newline delimited JSON. Lines are returned undecoded so they can be validated one by one."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return stream.read().decode(encoding).splitlines()
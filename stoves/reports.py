@@ -0,0 +1,96 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from amity_api.settings import STOVE_RATED_POWER, USAGE_REPORT_REFRESH
+from buildings.models import Building
+from communities.models import Community
+from .models import TelemetryRollup, BuildingTelemetryRollup, CommunityTelemetryRollup, UsageReport
+
+
+def month_bounds(month):
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def usage(on_seconds):
+    hours = on_seconds / 3600
+    return {'on_hours': round(hours, 2), 'energy_kwh': round(hours * STOVE_RATED_POWER, 2)}
+
+
+def summarize(day_rows):
+    """Month totals and per-day usage from (bucket, on_seconds, readings_count, max_temperature) day rollups."""
+    return {
+        **usage(sum(row[1] for row in day_rows)),
+        'readings_count': sum(row[2] for row in day_rows),
+        'max_temperature': max((row[3] for row in day_rows), default=None),
+        'days': [{'day': bucket.date().isoformat(), **usage(on_seconds)} for bucket, on_seconds, *_ in day_rows],
+    }
+
+
+def lock_community(community_id):
+    """Locks the community row for the transaction, so its reports are rebuilt one request at a time."""
+    return Community.objects.select_for_update().filter(id=community_id).values_list('id', flat=True).first()
+
+
+@transaction.atomic
+def generate_reports(community_id, month):
+    """
+    Builds and stores the month reports of the community and of each of its buildings from the daily
+    rollups with three queries. Returns the reports keyed by building id, None for the community report,
+    and no reports for an unknown community.
+    """
+    if lock_community(community_id) is None:
+        return {}
+    start, end = month_bounds(month)
+    day_filter = {'resolution': TelemetryRollup.DAY, 'bucket__gte': start, 'bucket__lt': end}
+    community_days = list(CommunityTelemetryRollup.objects.filter(community=community_id, **day_filter).
+                          order_by('bucket').values_list('bucket', 'on_seconds', 'readings_count', 'max_temperature'))
+    building_days = defaultdict(list)
+    for building_id, *row in BuildingTelemetryRollup.objects.filter(building__community=community_id, **day_filter).\
+            order_by('bucket').values_list('building_id', 'bucket', 'on_seconds', 'readings_count', 'max_temperature'):
+        building_days[building_id].append(row)
+
+    now = timezone.now()
+    reports = {building_id: UsageReport(community_id=community_id, building_id=building_id, month=start.date(),
+                                        generated_at=now, data={'name': name, **summarize(building_days[building_id])})
+               for building_id, name in Building.objects.filter(community=community_id).values_list('id', 'name')}
+    community_data = summarize(community_days)
+    community_data['buildings'] = sorted(
+        ({'building': building_id, 'name': report.data['name'], 'on_hours': report.data['on_hours'],
+          'energy_kwh': report.data['energy_kwh']} for building_id, report in reports.items()),
+        key=lambda building: -building['energy_kwh'])
+    reports[None] = UsageReport(community_id=community_id, month=start.date(), generated_at=now, data=community_data)
+
+    UsageReport.objects.filter(community=community_id, month=start.date()).delete()
+    UsageReport.objects.bulk_create(reports.values())
+    return reports
+
+
+def is_current(report):
+    """Reports of finished months never change; the running month is rebuilt after USAGE_REPORT_REFRESH."""
+    _, end = month_bounds(report.month)
+    return report.generated_at >= end or report.generated_at >= timezone.now() - timedelta(seconds=USAGE_REPORT_REFRESH)
+
+
+def get_report(community_id, month, building_id=None):
+    """
+    The stored report when it is still current, otherwise freshly generated. None for unknown communities and
+    buildings. Requests that find the report stale queue on the community lock and the ones after the first
+    get the report it built.
+    """
+    start, _ = month_bounds(month)
+    reports = UsageReport.objects.filter(community=community_id, building=building_id, month=start.date())
+    report = reports.first()
+    if report and is_current(report):
+        return report
+    with transaction.atomic():
+        if lock_community(community_id) is None:
+            return None
+        report = reports.first()
+        if report and is_current(report):
+            return report
+        return generate_reports(community_id, month).get(building_id)
@@ -0,0 +1,64 @@
+from django.db import connection
+
+from amity_api.settings import STOVE_REPORT_INTERVAL, STOVE_ROLLUP_MAX_POINTS
+from buildings.models import Building
+from .models import TelemetryRollup, BuildingTelemetryRollup, CommunityTelemetryRollup
+
+TRUNCATE = {
+    TelemetryRollup.MINUTE: lambda moment: moment.replace(second=0, microsecond=0),
+    TelemetryRollup.HOUR: lambda moment: moment.replace(minute=0, second=0, microsecond=0),
+    TelemetryRollup.DAY: lambda moment: moment.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+
+def aggregate_readings(rows):
+    """Folds reading rows of one batch into {(resolution, bucket): [readings, on_seconds, max_temperature]}."""
+    buckets = {}
+    for _, _, recorded_at, power, temperature in rows:
+        for resolution, truncate in TRUNCATE.items():
+            key = resolution, truncate(recorded_at)
+            if (bucket := buckets.get(key)) is None:
+                buckets[key] = [1, STOVE_REPORT_INTERVAL if power else 0, temperature]
+            else:
+                bucket[0] += 1
+                bucket[1] += STOVE_REPORT_INTERVAL if power else 0
+                bucket[2] = max(bucket[2], temperature)
+    return buckets
+
+
+def merge_rollups(model, owner_column, owner_id, buckets):
+    """
+    Adds the batch aggregates to the stored rollups with one INSERT ... ON CONFLICT DO UPDATE. Rows are upserted
+    in key order, so concurrent batches lock shared buckets in the same order instead of deadlocking.
+    """
+    table = model._meta.db_table
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    values, params = [], []
+    for (resolution, bucket), (readings, on_seconds, max_temperature) in sorted(buckets.items()):
+        values.append('(%s, %s, %s, %s, %s, %s)')
+        params += [owner_id, resolution, bucket, readings, on_seconds, max_temperature]
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} ({owner_column}, resolution, bucket, readings_count, on_seconds, '
+                       f'max_temperature) VALUES {", ".join(values)} '
+                       f'ON CONFLICT ({owner_column}, resolution, bucket) DO UPDATE SET '
+                       f'readings_count = {table}.readings_count + EXCLUDED.readings_count, '
+                       f'on_seconds = {table}.on_seconds + EXCLUDED.on_seconds, '
+                       f'max_temperature = {greatest}({table}.max_temperature, EXCLUDED.max_temperature)', params)
+
+
+def update_rollups(rows, building_id):
+    if not rows:
+        return
+    buckets = aggregate_readings(rows)
+    community_id = Building.objects.values_list('community_id', flat=True).get(id=building_id)
+    merge_rollups(BuildingTelemetryRollup, 'building_id', building_id, buckets)
+    merge_rollups(CommunityTelemetryRollup, 'community_id', community_id, buckets)
+
+
+def select_resolution(start, end):
+    """The finest resolution that answers the range with at most STOVE_ROLLUP_MAX_POINTS buckets."""
+    seconds = (end - start).total_seconds()
+    for resolution, bucket_seconds in TelemetryRollup.RESOLUTION_SECONDS.items():
+        if seconds / bucket_seconds <= STOVE_ROLLUP_MAX_POINTS:
+            return resolution
+    return TelemetryRollup.DAY
@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from amity_api.settings import STOVE_SERIES_MAX_POINTS, STOVE_REPORT_INTERVAL
+from .downsampling import METRICS, TEMPERATURE
+from .models import Stove, TelemetryRollup, AlertRule, Alert, UsageReport, StoveUsageState
+from .snapshot import get_snapshot
+
+
+class StoveSerializer(serializers.ModelSerializer):
+    state = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Stove
+        fields = ['id', 'building', 'serial_number', 'name', 'created_at', 'last_seen_at', 'is_online', 'state']
+        read_only_fields = ['building', 'last_seen_at', 'is_online']
+
+    def get_state(self, obj):
+        return get_snapshot().get(obj.id)
+
+
+class TelemetryRangeSerializer(serializers.Serializer):
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    resolution = serializers.ChoiceField(choices=[name for _, name in TelemetryRollup.RESOLUTION_CHOICES],
+                                         required=False)
+
+    def validate(self, attr):
+        attr.setdefault('end', timezone.now())
+        attr.setdefault('start', attr['end'] - timedelta(days=1))
+        if attr['start'] >= attr['end']:
+            raise serializers.ValidationError({'error': "start must be before end."})
+        return attr
+
+
+class ReadingsQuerySerializer(TelemetryRangeSerializer):
+    resolution = None
+    stove = serializers.IntegerField(required=False)
+
+
+class SeriesQuerySerializer(ReadingsQuerySerializer):
+    metric = serializers.ChoiceField(choices=METRICS, default=TEMPERATURE)
+    points = serializers.IntegerField(min_value=3, max_value=STOVE_SERIES_MAX_POINTS, default=500)
+
+
+class TelemetryRollupSerializer(serializers.Serializer):
+    bucket = serializers.DateTimeField()
+    readings_count = serializers.IntegerField()
+    on_seconds = serializers.IntegerField()
+    average_stoves_on = serializers.FloatField()
+    max_temperature = serializers.FloatField()
+
+
+class CommandMetricsQuerySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+
+    def validate(self, attr):
+        attr.setdefault('since', timezone.now() - timedelta(days=1))
+        return attr
+
+
+class CommandAckSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+
+class DesiredStateQuerySerializer(serializers.Serializer):
+    since_version = serializers.IntegerField(min_value=0, default=0)
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    stoves = serializers.ListField(child=serializers.CharField(max_length=50), allow_empty=False, max_length=10000)
+
+
+class AlertRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlertRule
+        fields = ['id', 'building', 'kind', 'threshold', 'duration', 'is_active', 'created_at']
+
+    def validate_building(self, value):
+        if value is not None and value.community_id != self.context['community_id']:
+            raise serializers.ValidationError("There is no such building in the community.")
+        return value
+
+    def validate(self, attr):
+        kind = attr.get('kind', getattr(self.instance, 'kind', None))
+        threshold = attr.get('threshold', getattr(self.instance, 'threshold', None))
+        duration = attr.get('duration', getattr(self.instance, 'duration', 0))
+        if kind == AlertRule.TEMPERATURE_ABOVE and threshold is None:
+            raise serializers.ValidationError({'error': "Temperature rule needs a threshold."})
+        if kind == AlertRule.LEFT_ON and (not duration or (threshold is not None and threshold < 1)):
+            raise serializers.ValidationError({'error': "Left on rule needs a duration and a threshold of at least 1."})
+        return attr
+
+
+class AlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Alert
+        fields = ['id', 'rule', 'stove', 'building', 'started_at', 'triggered_at', 'resolved_at', 'value']
+
+
+class UsageReportQuerySerializer(serializers.Serializer):
+    month = serializers.DateField(input_formats=['%Y-%m'], required=False)
+
+    def validate(self, attr):
+        attr.setdefault('month', timezone.now().date().replace(day=1))
+        return attr
+
+
+class UsageReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UsageReport
+        fields = ['community', 'building', 'month', 'generated_at', 'data']
+
+
+class UsageHeatmapSerializer(serializers.Serializer):
+    """Counters as 7 rows (Monday first, UTC) of 24 hours; `usage` is the share of reported time stoves were on."""
+    readings_count = serializers.SerializerMethodField()
+    on_seconds = serializers.SerializerMethodField()
+    usage = serializers.SerializerMethodField()
+    updated_at = serializers.DateTimeField()
+
+    @staticmethod
+    def by_day(values):
+        return [values[day * 24:(day + 1) * 24] for day in range(StoveUsageState.HOURS_IN_WEEK // 24)]
+
+    def get_readings_count(self, obj):
+        return self.by_day(obj.readings_count)
+
+    def get_on_seconds(self, obj):
+        return self.by_day(obj.on_seconds)
+
+    def get_usage(self, obj):
+        return self.by_day([round(on_seconds / (readings * STOVE_REPORT_INTERVAL), 3) if readings else None
+                            for readings, on_seconds in zip(obj.readings_count, obj.on_seconds)])
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.db.models import F
+
+from buildings.models import Building
+from communities.models import Community
+from .models import Gateway, Stove, percentile
+
+
+class HttpError(Exception):
+    pass
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client, so one process can hold thousands of connections."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise ValueError('Only http:// servers can be simulated against.')
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        """Returns the status code and the body of the response."""
+        lines = [f'{method} {self.prefix}{path} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                 f'Content-Length: {len(body)}', *(f'{name}: {value}' for name, value in (headers or {}).items())]
+        try:
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin1') + body)
+            await self.writer.drain()
+            return await self._read_response()
+        except (OSError, asyncio.IncompleteReadError, ValueError) as error:
+            self.close()
+            raise HttpError(str(error) or error.__class__.__name__)
+
+    async def _read_response(self):
+        status = int((await self.reader.readuntil(b'\r\n')).split()[1])
+        headers = {}
+        while (line := await self.reader.readuntil(b'\r\n')) != b'\r\n':
+            name, _, value = line.decode('latin1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while size := int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16):
+                body += (await self.reader.readexactly(size + 2))[:-2]
+            await self.reader.readuntil(b'\r\n')
+        else:
+            body = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started_at = time.monotonic()
+
+    def add(self, kind, seconds):
+        self.latencies[kind].append(seconds)
+
+    def fail(self, kind):
+        self.errors[kind] += 1
+
+    def report(self):
+        """Per request kind: count, errors, throughput per second and p50 / p99 latency in milliseconds."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        rows = {}
+        for kind in sorted(set(self.latencies) | set(self.errors)):
+            ordered = sorted(self.latencies[kind])
+            rows[kind] = {
+                'count': len(ordered),
+                'errors': self.errors[kind],
+                'per_second': round(len(ordered) / elapsed, 2),
+                'p50_ms': round(percentile(ordered, 50) * 1000, 2) if ordered else None,
+                'p99_ms': round(percentile(ordered, 99) * 1000, 2) if ordered else None,
+            }
+        return rows
+
+
+def prepare_buildings(community_name, buildings_count, stoves_per_building):
+    """
+    Makes sure the simulation community has the buildings and stoves, and issues fresh gateway keys.
+    Returns (building id, gateway key, stove serial numbers) for every simulated building.
+    """
+    with transaction.atomic():
+        community, _ = Community.objects.get_or_create(name=community_name, defaults={
+            'state': 'DC', 'zip_code': 0, 'address': 'simulation', 'phone_number': '0'})
+        building_ids = list(Building.objects.filter(community=community).order_by('id').
+                            values_list('id', flat=True)[:buildings_count])
+        for number in range(len(building_ids), buildings_count):
+            building_ids.append(Building.objects.create(community=community, name=f'Simulated {number}',
+                                                        state='DC', address=f'simulation {number}').id)
+        serials = {building_id: [f'sim-{building_id}-{number}' for number in range(stoves_per_building)]
+                   for building_id in building_ids}
+        existing = set(Stove.objects.filter(building__in=building_ids).values_list('serial_number', flat=True))
+        missing = [Stove(building_id=building_id, serial_number=serial)
+                   for building_id, building_serials in serials.items() for serial in building_serials
+                   if serial not in existing]
+        Stove.objects.bulk_create(missing, batch_size=1000)
+        if missing:
+            # bulk_create skips Stove.save, so the offline counters are moved here.
+            added = defaultdict(int)
+            for stove in missing:
+                added[stove.building_id] += 1
+            for building_id, count in added.items():
+                Building.objects.filter(id=building_id).update(offline_stoves_count=F('offline_stoves_count') + count)
+            Community.objects.filter(id=community.id).update(
+                offline_stoves_count=F('offline_stoves_count') + len(missing))
+        return [(building_id, Gateway.issue_for(building_id).key, serials[building_id])
+                for building_id in building_ids]
+
+
+class SimulatedGateway:
+    """
+    Gateway of one building: reports its stoves every `interval` seconds and long-polls the desired
+    state, switching the stoves off while the building is locked and acknowledging the commands.
+    """
+
+    def __init__(self, url, building_id, key, serials, recorder, triggers, interval, heartbeat_every):
+        self.url = url
+        self.building_id = building_id
+        self.headers = {'Authorization': f'Gateway {key}'}
+        self.serials = serials
+        self.recorder = recorder
+        self.triggers = triggers
+        self.interval = interval
+        self.heartbeat_every = heartbeat_every
+        self.locked = True
+        self.version = 0
+
+    async def timed(self, connection, kind, method, path, headers=None, body=b''):
+        started_at = time.monotonic()
+        try:
+            status, body = await connection.request(method, path, {**self.headers, **(headers or {})}, body)
+        except HttpError:
+            self.recorder.fail(kind)
+            return None, b''
+        if status >= 400:
+            self.recorder.fail(kind)
+        else:
+            self.recorder.add(kind, time.monotonic() - started_at)
+        return status, body
+
+    async def report(self):
+        connection = HttpConnection(self.url)
+        # Spread the gateways over the interval instead of sending all reports at the same moment.
+        await asyncio.sleep(random.uniform(0, self.interval))
+        tick = 0
+        try:
+            while True:
+                now = time.time()
+                body = '\n'.join(json.dumps({
+                    'stove': serial, 'timestamp': now, 'power': not self.locked and random.random() < 0.3,
+                    'temperature': round(random.uniform(20, 250), 1)}) for serial in self.serials).encode()
+                await self.timed(connection, 'telemetry', 'POST', '/api/v1.0/gateway/telemetry/',
+                                 {'Content-Type': 'application/x-ndjson'}, body)
+                if self.heartbeat_every and tick % self.heartbeat_every == 0:
+                    await self.timed(connection, 'heartbeat', 'POST', '/api/v1.0/gateway/heartbeat/',
+                                     {'Content-Type': 'application/json'},
+                                     json.dumps({'stoves': self.serials}).encode())
+                tick += 1
+                await asyncio.sleep(max(0.0, self.interval - (time.time() - now)))
+        finally:
+            connection.close()
+
+    async def follow_desired_state(self):
+        connection = HttpConnection(self.url)
+        try:
+            while True:
+                # Long polls last until a change or the server timeout, so only their failures are recorded.
+                started_at = time.monotonic()
+                try:
+                    status, body = await connection.request(
+                        'GET', f'/api/v1.0/gateway/desired-state/?since_version={self.version}', self.headers)
+                except HttpError:
+                    status = None
+                if status == 200:
+                    await self.apply(connection, json.loads(body))
+                elif status == 304 and time.monotonic() - started_at < 1:
+                    # A WSGI server answers at once instead of holding the poll.
+                    await asyncio.sleep(self.interval)
+                elif status != 304:
+                    self.recorder.fail('desired-state')
+                    await asyncio.sleep(1)
+        finally:
+            connection.close()
+
+    async def apply(self, connection, document):
+        self.version, self.locked = document['version'], document['safety_status']
+        if not document['commands']:
+            return
+        status, _ = await self.timed(connection, 'ack', 'POST', '/api/v1.0/gateway/commands/ack/',
+                                     {'Content-Type': 'application/json'},
+                                     json.dumps({'ids': [command['id'] for command in document['commands']]}).encode())
+        triggered_at = self.triggers.pop(self.building_id, None)
+        if status == 200 and triggered_at is not None:
+            self.recorder.add('lock-to-ack', time.monotonic() - triggered_at)
+
+
+def toggle_building(building_id):
+    building = Building.objects.filter(id=building_id)
+    building.set_safety_status(not building.values_list('safety_status', flat=True).get())
+
+
+async def toggle_locks(building_ids, triggers, interval, toggle):
+    """Locks or unlocks a random building every `interval` seconds, remembering when for the ack latency."""
+    while True:
+        await asyncio.sleep(interval)
+        building_id = random.choice(building_ids)
+        triggers[building_id] = time.monotonic()
+        await toggle(building_id)
+
+
+async def simulate(url, buildings, duration, interval, heartbeat_every, toggle_interval, toggle):
+    """Runs the gateways of `buildings` for `duration` seconds. Returns the latency report."""
+    recorder, triggers = LatencyRecorder(), {}
+    gateways = [SimulatedGateway(url, building_id, key, serials, recorder, triggers, interval, heartbeat_every)
+                for building_id, key, serials in buildings]
+    tasks = [asyncio.ensure_future(coroutine) for gateway in gateways
+             for coroutine in (gateway.report(), gateway.follow_desired_state())]
+    if toggle_interval:
+        tasks.append(asyncio.ensure_future(
+            toggle_locks([building_id for building_id, _, _ in buildings], triggers, toggle_interval, toggle)))
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return recorder.report()
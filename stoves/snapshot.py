@@ -0,0 +1,113 @@
+import fcntl
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+
+from amity_api.settings import STOVE_SNAPSHOT_PATH, STOVE_SNAPSHOT_STOVES, STOVE_SNAPSHOT_BUILDINGS, \
+    STOVE_OFFLINE_AFTER
+
+# One slot per stove id and per building id; a zero `present` marks a slot nothing was written to yet.
+STOVE_DTYPE = np.dtype([('seen_at', '<f8'), ('recorded_at', '<f8'), ('temperature', '<f4'), ('building', '<u4'),
+                        ('power', 'u1'), ('present', 'u1')])
+BUILDING_DTYPE = np.dtype([('locked', 'u1'), ('present', 'u1')])
+
+
+class StoveSnapshot:
+    """
+    Current state of every stove in fixed-width arrays over a memory-mapped file. Every worker process maps
+    the same file (under /dev/shm it never touches a disk), so a write by one worker is seen by all of them
+    and a read is an array lookup. The file name carries the capacities, as they define its layout.
+    Writes read the stored values they compare with, so writers hold an exclusive lock on the file.
+    """
+
+    def __init__(self, path=STOVE_SNAPSHOT_PATH, stoves=STOVE_SNAPSHOT_STOVES, buildings=STOVE_SNAPSHOT_BUILDINGS):
+        size = stoves * STOVE_DTYPE.itemsize + buildings * BUILDING_DTYPE.itemsize
+        self._fd = os.open(f'{path}-{stoves}x{buildings}', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._mmap = mmap.mmap(self._fd, size)
+        except OSError:
+            os.close(self._fd)
+            raise
+        # flock() does not exclude threads sharing the descriptor, so they queue on a lock of their own first.
+        self._thread_lock = threading.Lock()
+        self.stoves = np.ndarray(stoves, dtype=STOVE_DTYPE, buffer=self._mmap)
+        self.buildings = np.ndarray(buildings, dtype=BUILDING_DTYPE, buffer=self._mmap,
+                                    offset=stoves * STOVE_DTYPE.itemsize)
+
+    @contextmanager
+    def writing(self):
+        """Serialises writers across worker processes, which each open the file, and threads of one process."""
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def update_readings(self, rows):
+        """Takes the newest reading of every stove of a batch of reading rows (see ingest.READING_COLUMNS)."""
+        if not rows:
+            return
+        stove_ids, building_ids, recorded_at, power, temperature = zip(*rows)
+        ids = np.array(stove_ids, dtype=np.int64)
+        times = np.array([moment.timestamp() for moment in recorded_at])
+        order = np.lexsort((times, ids))
+        newest = order[np.append(ids[order][1:] != ids[order][:-1], True)]
+        newest = newest[ids[newest] < len(self.stoves)]
+        slots = ids[newest]
+        with self.writing():
+            # Batches may arrive out of order; an older reading never replaces a newer one.
+            fresh = times[newest] > np.where(self.stoves['present'][slots] == 1, self.stoves['recorded_at'][slots],
+                                             -np.inf)
+            newest, slots = newest[fresh], slots[fresh]
+            self.stoves['recorded_at'][slots] = times[newest]
+            self.stoves['seen_at'][slots] = np.maximum(self.stoves['seen_at'][slots], times[newest])
+            self.stoves['temperature'][slots] = np.array(temperature, dtype=np.float32)[newest]
+            self.stoves['power'][slots] = np.array(power, dtype=np.uint8)[newest]
+            self.stoves['building'][slots] = np.array(building_ids, dtype=np.uint32)[newest]
+            self.stoves['present'][slots] = 1
+
+    def record_heartbeats(self, stove_ids, moment):
+        ids = np.fromiter(stove_ids, dtype=np.int64)
+        ids = ids[ids < len(self.stoves)]
+        with self.writing():
+            self.stoves['seen_at'][ids] = np.maximum(self.stoves['seen_at'][ids], moment.timestamp())
+
+    def set_locked(self, building_ids, locked):
+        ids = np.fromiter(building_ids, dtype=np.int64)
+        ids = ids[ids < len(self.buildings)]
+        with self.writing():
+            self.buildings['locked'][ids] = locked
+            self.buildings['present'][ids] = 1
+
+    def get(self, stove_id, now=None):
+        """State of the stove, or None when nothing was reported since the snapshot was created."""
+        if not 0 <= stove_id < len(self.stoves) or not self.stoves['present'][stove_id]:
+            return None
+        stove = self.stoves[stove_id]
+        building = self.buildings[stove['building']] if stove['building'] < len(self.buildings) else None
+        now = (now or datetime.now(dt_timezone.utc)).timestamp()
+        return {
+            'power': bool(stove['power']),
+            'temperature': round(float(stove['temperature']), 2),
+            'recorded_at': datetime.fromtimestamp(float(stove['recorded_at']), dt_timezone.utc),
+            'last_seen_at': datetime.fromtimestamp(float(stove['seen_at']), dt_timezone.utc),
+            'online': now - float(stove['seen_at']) <= STOVE_OFFLINE_AFTER,
+            'locked': bool(building['locked']) if building is not None and building['present'] else None,
+        }
+
+
+_snapshot = None
+
+
+def get_snapshot():
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = StoveSnapshot()
+    return _snapshot
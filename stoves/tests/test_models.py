@@ -0,0 +1,386 @@
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+import numpy as np
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from buildings.models import Building
+from communities.models import Community
+from stoves.alerts import detect_violations
+from stoves.archive import BuildingArchive, archive_building, read_readings
+from stoves.downsampling import lttb, readings_series
+from stoves.heartbeats import record_heartbeats, sweep_heartbeats
+from stoves.models import Stove, StoveReading, StoveCommand, AlertRule, Alert, StoveUsageState
+from stoves.snapshot import StoveSnapshot
+from stoves.transports import LocalTransport
+from stoves.usage import update_usage
+
+User = get_user_model()
+
+
+class StoveCommandTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.build1 = Building.objects.create(community=self.com, name='building1', state='DC', address='address1',
+                                              safety_status=False)
+        self.build2 = Building.objects.create(community=self.com, name='building2', state='DC', address='address2',
+                                              safety_status=False)
+        self.transport = LocalTransport()
+
+    def test_locking_buildings_queues_master_off_in_same_transaction(self):
+        Building.objects.filter(community=self.com).set_safety_status(True)
+        commands = StoveCommand.objects.order_by('building')
+        self.assertEqual([(c.building_id, c.community_id, c.command) for c in commands],
+                         [(self.build1.id, self.com.id, StoveCommand.MASTER_OFF),
+                          (self.build2.id, self.com.id, StoveCommand.MASTER_OFF)])
+
+    def test_unchanged_buildings_do_not_get_commands(self):
+        Building.objects.filter(community=self.com).set_safety_status(False)
+        self.assertFalse(StoveCommand.objects.exists())
+
+    def test_new_command_supersedes_open_command_of_building(self):
+        Building.objects.filter(id=self.build1.id).set_safety_status(True)
+        Building.objects.filter(id=self.build1.id).set_safety_status(False)
+        self.assertEqual(list(StoveCommand.objects.order_by('id').values_list('command', 'status')),
+                         [(StoveCommand.MASTER_OFF, StoveCommand.SUPERSEDED),
+                          (StoveCommand.MASTER_ON, StoveCommand.PENDING)])
+
+    def test_dispatch_delivers_due_commands_and_waits_for_ack(self):
+        Building.objects.filter(community=self.com).set_safety_status(True)
+        self.assertEqual(StoveCommand.dispatch_next_batch(self.transport), 2)
+        self.assertEqual(len(self.transport.delivered), 2)
+        self.assertFalse(StoveCommand.objects.exclude(status=StoveCommand.DELIVERED).exists())
+        self.assertEqual(StoveCommand.dispatch_next_batch(self.transport), 0)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        Building.objects.filter(id=self.build1.id).set_safety_status(True)
+        self.transport.unreachable_buildings.add(self.build1.id)
+        StoveCommand.dispatch_next_batch(self.transport)
+        command = StoveCommand.objects.get()
+        self.assertEqual((command.status, command.attempts), (StoveCommand.PENDING, 1))
+        self.assertIn('unreachable', command.last_error)
+        self.assertEqual(StoveCommand.dispatch_next_batch(self.transport), 0)
+
+        with mock.patch('stoves.models.timezone.now', return_value=timezone.now() + timedelta(seconds=10)):
+            self.transport.unreachable_buildings.clear()
+            self.assertEqual(StoveCommand.dispatch_next_batch(self.transport), 1)
+        command.refresh_from_db()
+        self.assertEqual((command.status, command.attempts), (StoveCommand.DELIVERED, 2))
+
+    def test_retry_delay_grows_exponentially_up_to_limit(self):
+        with mock.patch('stoves.models.STOVE_COMMAND_RETRY_DELAY', 1.0), \
+                mock.patch('stoves.models.STOVE_COMMAND_MAX_RETRY_DELAY', 10.0):
+            self.assertEqual([StoveCommand.retry_delay(n).total_seconds() for n in range(1, 6)], [1, 2, 4, 8, 10])
+
+    def test_command_fails_after_max_attempts(self):
+        Building.objects.filter(id=self.build1.id).set_safety_status(True)
+        self.transport.unreachable_buildings.add(self.build1.id)
+        with mock.patch('stoves.models.STOVE_COMMAND_MAX_ATTEMPTS', 1):
+            StoveCommand.dispatch_next_batch(self.transport)
+        self.assertEqual(StoveCommand.objects.get().status, StoveCommand.FAILED)
+
+    def test_unacknowledged_command_fails_after_max_attempts(self):
+        Building.objects.filter(id=self.build1.id).set_safety_status(True)
+        with mock.patch('stoves.models.STOVE_COMMAND_MAX_ATTEMPTS', 2):
+            for hours in range(3):
+                with mock.patch('stoves.models.timezone.now', return_value=timezone.now() + timedelta(hours=hours)):
+                    self.assertEqual(StoveCommand.dispatch_next_batch(self.transport), 1)
+        command = StoveCommand.objects.get()
+        self.assertEqual((command.status, command.attempts), (StoveCommand.FAILED, 2))
+        self.assertEqual(len(self.transport.delivered), 2)
+        self.assertEqual(StoveCommand.dispatch_next_batch(self.transport), 0)
+
+    def test_acknowledge_only_open_commands_of_own_building(self):
+        Building.objects.filter(community=self.com).set_safety_status(True)
+        first, second = StoveCommand.objects.order_by('building')
+        self.assertEqual(StoveCommand.acknowledge(self.build1.id, [first.id, second.id]), [first.id])
+        self.assertEqual(StoveCommand.acknowledge(self.build1.id, [first.id]), [])
+        first.refresh_from_db()
+        self.assertEqual(first.status, StoveCommand.ACKNOWLEDGED)
+        self.assertIsNotNone(first.acknowledged_at)
+
+
+class HeartbeatSweepTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+        self.stove1 = Stove.objects.create(building=self.build, serial_number='SN-1')
+        self.stove2 = Stove.objects.create(building=self.build, serial_number='SN-2')
+
+    def offline_counters(self):
+        return (Building.objects.get(id=self.build.id).offline_stoves_count,
+                Community.objects.get(id=self.com.id).offline_stoves_count)
+
+    def test_registered_stoves_are_offline_until_heard_from(self):
+        self.assertEqual(self.offline_counters(), (2, 2))
+
+    def test_heartbeats_are_persisted_only_by_sweep(self):
+        now = timezone.now()
+        record_heartbeats([self.stove1.id], now)
+        self.assertIsNone(Stove.objects.get(id=self.stove1.id).last_seen_at)
+
+        self.assertEqual(sweep_heartbeats(now=now, batch_size=1), 1)
+        stove = Stove.objects.get(id=self.stove1.id)
+        self.assertTrue(stove.is_online)
+        self.assertEqual(stove.last_seen_at, now.replace(microsecond=stove.last_seen_at.microsecond))
+        self.assertEqual(self.offline_counters(), (1, 1))
+        self.assertEqual(sweep_heartbeats(now=now), 0)
+
+    def test_silent_stove_goes_offline(self):
+        now = timezone.now()
+        record_heartbeats([self.stove1.id, self.stove2.id], now)
+        sweep_heartbeats(now=now)
+        self.assertEqual(self.offline_counters(), (0, 0))
+
+        later = now + timedelta(minutes=10)
+        record_heartbeats([self.stove2.id], later)
+        self.assertEqual(sweep_heartbeats(now=later), 1)
+        self.assertFalse(Stove.objects.get(id=self.stove1.id).is_online)
+        self.assertEqual(self.offline_counters(), (1, 1))
+
+    def test_stoves_changing_both_ways_are_all_counted(self):
+        now = timezone.now()
+        record_heartbeats([self.stove1.id], now)
+        sweep_heartbeats(now=now)
+
+        later = now + timedelta(minutes=10)
+        record_heartbeats([self.stove2.id], later)
+        self.assertEqual(sweep_heartbeats(now=later), 2)
+        self.assertEqual(self.offline_counters(), (1, 1))
+
+    def test_deleting_offline_stove_updates_counters(self):
+        self.stove1.delete()
+        self.assertEqual(self.offline_counters(), (1, 1))
+        self.build.delete()
+        self.assertEqual(Community.objects.get(id=self.com.id).offline_stoves_count, 0)
+
+
+class DetectViolationsTestCase(APITestCase):
+    def detect(self, stove_index, times, mask, since, alerted, duration):
+        values = np.arange(len(mask), dtype=np.float64)
+        return detect_violations(np.array(stove_index), np.array(times, dtype=np.float64), np.array(mask),
+                                 values, np.array(since, dtype=np.float64), np.array(alerted), duration)
+
+    def test_run_reaching_duration_is_triggered(self):
+        result = self.detect([0, 0, 0, 1, 1], [0, 10, 20, 0, 10], [True, True, True, True, False],
+                             [np.nan, np.nan], [False, False], 20)
+        self.assertEqual(result['stove'].tolist(), [0])
+        self.assertEqual(result['triggered_at'].tolist(), [20])
+        self.assertEqual(result['peak'].tolist(), [2])
+        self.assertEqual(result['since'].tolist()[0], 0)
+        self.assertTrue(np.isnan(result['since'][1]))
+        self.assertEqual(result['alerted'].tolist(), [True, False])
+
+    def test_violation_carried_over_from_previous_batch(self):
+        result = self.detect([0, 0], [100, 110], [True, True], [50], [False], 60)
+        self.assertEqual(result['started_at'].tolist(), [50])
+        self.assertEqual(result['triggered_at'].tolist(), [110])
+        self.assertTrue(result['continues'][0])
+
+    def test_alerted_violation_is_not_raised_again_and_clears(self):
+        result = self.detect([0, 0, 0], [100, 110, 120], [True, False, False], [50], [True], 10)
+        self.assertEqual(len(result['stove']), 0)
+        self.assertFalse(result['continues'][0])
+        self.assertEqual(result['cleared_at'].tolist(), [110])
+
+    def test_run_that_ends_inside_batch_is_resolved(self):
+        result = self.detect([0, 0, 0], [0, 30, 40], [True, True, False], [np.nan], [False], 30)
+        self.assertEqual(result['resolved_at'].tolist(), [40])
+        self.assertFalse(result['alerted'][0])
+
+
+class StoveUsageTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='First-super', last_name='Last-super')
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            contact_person=self.user, phone_number=1230456204)
+        self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+        self.stove = Stove.objects.create(building=self.build, serial_number='SN-1')
+        # Monday 2026-10-12 18:00 UTC
+        self.monday = datetime(2026, 10, 12, 18, tzinfo=dt_timezone.utc)
+
+    def session(self, start, minutes):
+        update_usage([(self.stove.id, self.build.id, start, True, 100),
+                      (self.stove.id, self.build.id, start + timedelta(minutes=minutes), False, 20)], self.build.id)
+
+    def test_sessions_build_baseline_per_hour_of_week(self):
+        for week in range(2):
+            self.session(self.monday + timedelta(weeks=week), 30)
+        state = StoveUsageState.objects.get(stove=self.stove)
+        slot = StoveUsageState.hour_of_week(self.monday)
+        self.assertEqual((state.baseline[slot], state.baseline_samples[slot]), (1800, 2))
+        self.assertIsNone(state.on_since)
+
+    def test_stove_on_much_longer_than_usual_is_flagged(self):
+        rule = AlertRule.objects.create(community=self.com, kind=AlertRule.LEFT_ON, threshold=2, duration=600)
+        for week in range(3):
+            self.session(self.monday + timedelta(weeks=week), 30)
+        start = self.monday + timedelta(weeks=3)
+        reading = lambda minutes, power: (self.stove.id, self.build.id, start + timedelta(minutes=minutes), power, 90)
+        self.assertEqual(update_usage([reading(0, True), reading(50, True)], self.build.id), [])
+        alerts = update_usage([reading(61, True), reading(70, True)], self.build.id)
+        self.assertEqual([(alert.rule, alert.started_at) for alert in alerts], [(rule, start)])
+
+        update_usage([reading(90, False)], self.build.id)
+        alert = Alert.objects.get()
+        self.assertEqual(alert.resolved_at, start + timedelta(minutes=90))
+        state = StoveUsageState.objects.get(stove=self.stove)
+        self.assertEqual(state.baseline_samples[StoveUsageState.hour_of_week(start)], 3)
+        self.assertIsNone(state.alert)
+
+    def test_minimum_duration_applies_without_baseline(self):
+        AlertRule.objects.create(community=self.com, kind=AlertRule.LEFT_ON, duration=3600)
+        update_usage([(self.stove.id, self.build.id, self.monday, True, 100),
+                      (self.stove.id, self.build.id, self.monday + timedelta(minutes=59), True, 100)], self.build.id)
+        self.assertFalse(Alert.objects.exists())
+        update_usage([(self.stove.id, self.build.id, self.monday + timedelta(minutes=61), True, 100)], self.build.id)
+        self.assertEqual(Alert.objects.count(), 1)
+
+
+class StoveSnapshotTestCase(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = f'{self.directory.name}/snapshot'
+        self.snapshot = StoveSnapshot(self.path, stoves=100, buildings=10)
+        self.moment = datetime(2026, 10, 18, 12, 0, tzinfo=dt_timezone.utc)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_newest_reading_of_each_stove_is_kept(self):
+        self.snapshot.set_locked([3], True)
+        self.snapshot.update_readings([
+            (7, 3, self.moment + timedelta(seconds=10), False, 25.0),
+            (7, 3, self.moment, True, 180.0),
+            (8, 3, self.moment, True, 150.0),
+            (500, 3, self.moment, True, 150.0),
+        ])
+        self.snapshot.update_readings([(7, 3, self.moment - timedelta(seconds=10), True, 200.0)])
+        state = self.snapshot.get(7, now=self.moment + timedelta(seconds=20))
+        self.assertEqual(state, {'power': False, 'temperature': 25.0, 'recorded_at': self.moment + timedelta(seconds=10),
+                                 'last_seen_at': self.moment + timedelta(seconds=10), 'online': True, 'locked': True})
+        self.assertTrue(self.snapshot.get(8)['power'])
+        self.assertIsNone(self.snapshot.get(9))
+        self.assertIsNone(self.snapshot.get(500))
+
+    def test_other_processes_mapping_the_file_see_writes(self):
+        reader = StoveSnapshot(self.path, stoves=100, buildings=10)
+        self.snapshot.update_readings([(7, 3, self.moment, True, 180.0)])
+        self.snapshot.record_heartbeats([7], self.moment + timedelta(minutes=5))
+        self.snapshot.set_locked([3], False)
+        state = reader.get(7, now=self.moment + timedelta(minutes=6))
+        self.assertEqual((state['last_seen_at'], state['online'], state['locked']),
+                         (self.moment + timedelta(minutes=5), True, False))
+
+    def test_writers_of_other_processes_wait_for_the_file_lock(self):
+        other = StoveSnapshot(self.path, stoves=100, buildings=10)
+        writer = threading.Thread(target=other.update_readings, args=([(7, 3, self.moment, True, 180.0)],))
+        with self.snapshot.writing():
+            writer.start()
+            writer.join(timeout=0.2)
+            self.assertTrue(writer.is_alive())
+            self.assertIsNone(self.snapshot.get(7))
+        writer.join()
+        self.assertTrue(self.snapshot.get(7)['power'])
+
+
+class StoveArchiveTestCase(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch('stoves.archive.STOVE_ARCHIVE_DIR', self.directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.com = Community.objects.create(name='Davida', state='DC', zip_code=1111, address='davida_address',
+                                            phone_number=1230456204)
+        self.build = Building.objects.create(community=self.com, name='building1', state='DC', address='address1')
+        self.stove1 = Stove.objects.create(building=self.build, serial_number='SN-1')
+        self.stove2 = Stove.objects.create(building=self.build, serial_number='SN-2')
+        self.moment = datetime(2026, 9, 1, 12, 0, tzinfo=dt_timezone.utc)
+        StoveReading.objects.bulk_create([
+            StoveReading(stove=self.stove1 if minute % 2 else self.stove2, building=self.build, power=minute % 3 == 0,
+                         recorded_at=self.moment + timedelta(minutes=minute, seconds=0.5), temperature=20 + minute)
+            for minute in range(10)])
+
+    def test_aged_readings_are_moved_in_batches_of_segments(self):
+        moved = archive_building(self.build.id, self.moment + timedelta(minutes=7), batch_size=3)
+        self.assertEqual(moved, 7)
+        self.assertEqual(StoveReading.objects.count(), 3)
+        meta = BuildingArchive(self.build.id).read_meta()
+        # A full batch leaves the rows of its last second to the next one.
+        self.assertEqual([segment['rows'] for segment in meta['segments']], [2, 2, 2, 1])
+        self.assertEqual(meta['archived_before'], (self.moment + timedelta(minutes=7)).timestamp())
+
+    def test_archive_slices_time_range_in_seconds_and_tenths_of_degree(self):
+        archive_building(self.build.id, self.moment + timedelta(minutes=7), batch_size=3)
+        archived = BuildingArchive(self.build.id).read((self.moment + timedelta(minutes=2)).timestamp(),
+                                                       (self.moment + timedelta(minutes=5)).timestamp())
+        self.assertEqual(archived['recorded_at'].tolist(),
+                         [(self.moment + timedelta(minutes=minute)).timestamp() for minute in (2, 3, 4)])
+        self.assertEqual(archived['temperature'].tolist(), [220, 230, 240])
+        self.assertEqual(archived['stove'].tolist(), [self.stove2.id, self.stove1.id, self.stove2.id])
+
+    def test_read_readings_joins_archive_and_live_table(self):
+        archive_building(self.build.id, self.moment + timedelta(minutes=5))
+        readings = read_readings(self.build.id, self.moment + timedelta(minutes=3), self.moment + timedelta(minutes=8))
+        self.assertEqual(readings['temperature'].tolist(), [23, 24, 25, 26, 27])
+        self.assertEqual(readings['power'].tolist(), [True, False, False, True, False])
+        stove1 = read_readings(self.build.id, self.moment, self.moment + timedelta(hours=1), self.stove1.id)
+        self.assertEqual(stove1['temperature'].tolist(), [21, 23, 25, 27, 29])
+
+    def test_rows_left_by_a_failed_commit_are_not_archived_twice(self):
+        rows = list(StoveReading.objects.filter(recorded_at__lt=self.moment + timedelta(minutes=5)))
+        archive_building(self.build.id, self.moment + timedelta(minutes=5))
+        # The segment was published but the delete of its rows rolled back.
+        StoveReading.objects.bulk_create(rows)
+        archive_building(self.build.id, self.moment + timedelta(minutes=7))
+        self.assertEqual([segment['rows'] for segment in BuildingArchive(self.build.id).read_meta()['segments']],
+                         [5, 2])
+        readings = read_readings(self.build.id, self.moment, self.moment + timedelta(hours=1))
+        self.assertEqual(readings['temperature'].tolist(), list(range(20, 30)))
+
+    def test_batch_of_a_single_second_is_archived_whole(self):
+        StoveReading.objects.all().delete()
+        StoveReading.objects.bulk_create([
+            StoveReading(stove=self.stove1, building=self.build, power=True, temperature=100,
+                         recorded_at=self.moment + timedelta(milliseconds=millisecond)) for millisecond in range(5)])
+        self.assertEqual(archive_building(self.build.id, self.moment + timedelta(minutes=1), batch_size=2), 5)
+        self.assertEqual(len(read_readings(self.build.id, self.moment, self.moment + timedelta(minutes=1))['stove']), 5)
+
+
+class DownsamplingTestCase(APITestCase):
+    def test_lttb_keeps_ends_and_spikes(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.sin(x / 50)
+        y[437] = 10
+        sampled_x, sampled_y = lttb(x, y, 50)
+        self.assertEqual(len(sampled_x), 50)
+        self.assertEqual((sampled_x[0], sampled_x[-1]), (0, 999))
+        self.assertIn(437, sampled_x)
+        self.assertTrue(np.all(np.diff(sampled_x) > 0))
+        self.assertTrue(np.array_equal(sampled_y, y[sampled_x.astype(np.int64)]))
+
+    def test_lttb_returns_short_series_as_is(self):
+        x, y = np.arange(5.0), np.arange(5.0)
+        self.assertIs(lttb(x, y, 10)[0], x)
+
+    def test_readings_are_folded_per_report_interval(self):
+        readings = {'recorded_at': np.array([0.0, 3.0, 12.0, 15.0]), 'stove': np.array([1, 2, 1, 2]),
+                    'power': np.array([True, False, True, True]), 'temperature': np.array([20.0, 30.0, 40.0, 60.0])}
+        self.assertEqual([values.tolist() for values in readings_series(readings, 'temperature', 10)],
+                         [[0, 10], [25, 50]])
+        self.assertEqual(readings_series(readings, 'usage', 10)[1].tolist(), [0.5, 1])
@@ -0,0 +1,648 @@
+import io
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from django.test import LiveServerTestCase
+from rest_framework.test import APITestCase, APIClient
+
+from buildings.models import Building
+from communities.models import Community
+from stoves.archive import read_readings
+from stoves.models import Gateway, Stove, StoveReading, TelemetryRollup, BuildingTelemetryRollup, \
+    CommunityTelemetryRollup, StoveCommand, AlertRule, Alert, UsageReport
+from communities.models import RecentActivity
+from stoves.snapshot import StoveSnapshot
+from stoves.transports import get_transport
+from users.choices_types import ProfileRoles
+
+User = get_user_model()
+
+
+def ndjson(*items):
+    return '\n'.join(item if isinstance(item, str) else json.dumps(item) for item in items)
+
+
+class StoveViewSetTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.user1 = User.objects.create_user(email='user1@user.com', password='strong1',
+                                              first_name='First User1', last_name='Last User1',
+                                              role=ProfileRoles.SUPERVISOR)
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        self.url = reverse('v1.0:stoves:stoves-list', args=[self.community.id, self.build.id])
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_register_and_list_stoves(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.post(self.url, {'serial_number': 'SN-1', 'name': 'Kitchen'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['building'], self.build.id)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['serial_number'], 'SN-1')
+
+    def test_register_stove_in_building_of_other_community(self):
+        self.login('super@super.super', 'strong')
+        url = reverse('v1.0:stoves:stoves-list', args=[self.community.id, 333])
+        response = self.client.post(url, {'serial_number': 'SN-1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_stove_no_access_for_supervisor_not_contact_person(self):
+        self.login('user1@user.com', 'strong1')
+        response = self.client.post(self.url, {'serial_number': 'SN-1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_issue_gateway_key(self):
+        self.login('super@super.super', 'strong')
+        url = reverse('v1.0:stoves:gateway-key', args=[self.community.id, self.build.id])
+        first = self.client.put(url)
+        second = self.client.put(url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(first.data['key'], second.data['key'])
+        self.assertEqual(Gateway.objects.get(building=self.build).key, second.data['key'])
+
+
+class TelemetryIngestAPIViewTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        self.other_build = Building.objects.create(community=self.community, name='building2', state='AL',
+                                                   address='address2')
+        self.stove1 = Stove.objects.create(building=self.build, serial_number='SN-1')
+        self.stove2 = Stove.objects.create(building=self.build, serial_number='SN-2')
+        Stove.objects.create(building=self.other_build, serial_number='SN-3')
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.url = reverse('v1.0:stoves:telemetry-ingest')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type='application/x-ndjson')
+
+    def test_ingest_batch_of_readings(self):
+        response = self.post(ndjson(
+            {'stove': 'SN-1', 'power': True, 'temperature': 180.5, 'timestamp': '2026-10-18T01:00:00Z'},
+            {'stove': 'SN-2', 'power': False, 'temperature': 21, 'timestamp': 1792285200},
+        ))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'accepted': 2, 'rejected': 0, 'errors': []})
+        reading = StoveReading.objects.get(stove=self.stove1)
+        self.assertEqual(reading.building_id, self.build.id)
+        self.assertTrue(reading.power)
+        self.assertEqual(reading.temperature, 180.5)
+
+    def test_ingested_state_is_listed_from_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('stoves.snapshot._snapshot', StoveSnapshot(f'{directory}/snapshot', 100, 100)):
+            self.post(ndjson({'stove': 'SN-1', 'power': True, 'temperature': 180.5, 'timestamp': time.time()}))
+            res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super',
+                                                                        'password': 'strong'})
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+            # Auth, permission, count and page; the states come from the snapshot.
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('v1.0:stoves:stoves-list', args=[self.community.id, self.build.id]))
+        states = {stove['serial_number']: stove['state'] for stove in response.data['results']}
+        self.assertEqual((states['SN-1']['power'], states['SN-1']['temperature'], states['SN-1']['online'],
+                          states['SN-1']['locked']), (True, 180.5, True, True))
+        self.assertIsNone(states['SN-2'])
+
+    def test_invalid_lines_are_reported_and_valid_ones_stored(self):
+        response = self.post(ndjson(
+            {'stove': 'SN-1', 'power': True, 'temperature': 180.5, 'timestamp': '2026-10-18T01:00:00Z'},
+            'not json',
+            {'stove': 'SN-3', 'power': True, 'temperature': 20, 'timestamp': 1792285200},
+            {'stove': 'SN-2', 'power': 'on', 'temperature': 20, 'timestamp': 1792285200},
+            {'stove': 'SN-2', 'power': True, 'temperature': 20, 'timestamp': '2026-10-18T01:00:00'},
+        ))
+        self.assertEqual(response.data['accepted'], 1)
+        self.assertEqual(response.data['rejected'], 4)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3, 4, 5])
+        self.assertEqual(response.data['errors'][1]['error'], 'Unknown stove.')
+        self.assertEqual(StoveReading.objects.count(), 1)
+
+    def test_readings_count_as_heartbeats(self):
+        self.post(ndjson({'stove': 'SN-1', 'power': True, 'temperature': 20, 'timestamp': 1792285200}))
+        call_command('sweep_stove_heartbeats', '--once')
+        self.assertEqual(list(Stove.objects.filter(is_online=True)), [self.stove1])
+
+    def test_sweep_refuses_per_process_cache(self):
+        with mock.patch('stoves.management.commands.sweep_stove_heartbeats.cache', LocMemCache('sweep', {})), \
+                self.assertRaises(CommandError):
+            call_command('sweep_stove_heartbeats', '--once')
+
+    def test_gateway_heartbeat_of_own_stoves(self):
+        response = self.client.post(reverse('v1.0:stoves:heartbeat'), {'stoves': ['SN-1', 'SN-2', 'SN-3']},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'accepted': 2})
+        call_command('sweep_stove_heartbeats', '--once')
+        self.assertEqual(Building.objects.get(id=self.build.id).offline_stoves_count, 0)
+        self.assertEqual(Building.objects.get(id=self.other_build.id).offline_stoves_count, 1)
+
+    def test_ingest_with_wrong_gateway_key(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Gateway wrong')
+        response = self.post(ndjson({'stove': 'SN-1', 'power': True, 'temperature': 20, 'timestamp': 1792285200}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ingest_with_user_token_is_not_allowed(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        response = self.post(ndjson({'stove': 'SN-1', 'power': True, 'temperature': 20, 'timestamp': 1792285200}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TelemetryRollupAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.user1 = User.objects.create_user(email='user1@user1.user1', password='user1',
+                                              first_name='User1_first', last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        Stove.objects.create(building=self.build, serial_number='SN-1')
+        Stove.objects.create(building=self.build, serial_number='SN-2')
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.building_url = reverse('v1.0:stoves:building-telemetry', args=[self.community.id, self.build.id])
+        self.community_url = reverse('v1.0:stoves:community-telemetry', args=[self.community.id])
+
+    def ingest(self, *items):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+        self.client.post(reverse('v1.0:stoves:telemetry-ingest'), ndjson(*items),
+                         content_type='application/x-ndjson')
+        self.client.credentials()
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_batches_are_added_to_existing_rollups(self):
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 180, 'timestamp': '2026-10-18T01:00:05Z'},
+                    {'stove': 'SN-2', 'power': False, 'temperature': 20, 'timestamp': '2026-10-18T01:00:05Z'})
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 210, 'timestamp': '2026-10-18T01:00:15Z'})
+        rollup = BuildingTelemetryRollup.objects.get(building=self.build, resolution=TelemetryRollup.MINUTE)
+        self.assertEqual((rollup.readings_count, rollup.on_seconds, rollup.max_temperature), (3, 20, 210))
+        self.assertEqual(CommunityTelemetryRollup.objects.filter(community=self.community).count(), 3)
+
+    def test_offset_timestamps_land_in_utc_buckets(self):
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 180, 'timestamp': '2026-10-01T01:30:00+02:00'},
+                    {'stove': 'SN-2', 'power': True, 'temperature': 180, 'timestamp': '2026-09-30T23:30:00Z'})
+        day = BuildingTelemetryRollup.objects.get(building=self.build, resolution=TelemetryRollup.DAY)
+        self.assertEqual((day.bucket, day.readings_count), (datetime(2026, 9, 30, tzinfo=dt_timezone.utc), 2))
+        self.assertEqual(StoveReading.objects.get(stove__serial_number='SN-1').recorded_at,
+                         datetime(2026, 9, 30, 23, 30, tzinfo=dt_timezone.utc))
+
+    def test_get_building_rollups_in_requested_resolution(self):
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 180, 'timestamp': '2026-10-18T01:00:05Z'},
+                    {'stove': 'SN-1', 'power': True, 'temperature': 190, 'timestamp': '2026-10-18T02:30:00Z'})
+        self.login('super@super.super', 'strong')
+        response = self.client.get(self.building_url, {'start': '2026-10-18T00:00:00Z',
+                                                       'end': '2026-10-19T00:00:00Z', 'resolution': 'hour'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resolution'], 'hour')
+        self.assertEqual([rollup['max_temperature'] for rollup in response.data['results']], [180, 190])
+
+    def test_resolution_is_chosen_from_range_length(self):
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 180, 'timestamp': '2026-10-18T01:00:05Z'})
+        self.login('super@super.super', 'strong')
+        response = self.client.get(self.community_url, {'start': '2026-09-18T00:00:00Z',
+                                                        'end': '2026-10-19T00:00:00Z'})
+        self.assertEqual(response.data['resolution'], 'hour')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_get_rollups_in_resolution_over_points_limit(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.get(self.community_url, {'start': '2026-09-18T00:00:00Z',
+                                                        'end': '2026-10-19T00:00:00Z', 'resolution': 'minute'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_rollups_with_start_after_end(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.get(self.community_url, {'start': '2026-10-19T00:00:00Z',
+                                                        'end': '2026-10-18T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_rollups_no_access_for_supervisor_not_contact_person(self):
+        self.login('user1@user1.user1', 'user1')
+        response = self.client.get(self.building_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BuildingReadingsAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        self.stove = Stove.objects.create(building=self.build, serial_number='SN-1')
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch('stoves.archive.STOVE_ARCHIVE_DIR', self.directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.url = reverse('v1.0:stoves:building-readings', args=[self.community.id, self.build.id])
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def add_readings(self, *days):
+        StoveReading.objects.bulk_create([
+            StoveReading(stove=self.stove, building=self.build, power=True, temperature=100 + day,
+                         recorded_at=timezone.now() - timedelta(days=day)) for day in days])
+
+    def test_archived_and_live_readings_are_returned_in_columns(self):
+        self.add_readings(40, 30, 2)
+        call_command('archive_stove_readings', stdout=io.StringIO())
+        self.assertEqual(StoveReading.objects.count(), 1)
+        response = self.client.get(self.url, {'start': (timezone.now() - timedelta(days=50)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['temperature'], [140, 130, 102])
+        self.assertEqual(response.data['stove'], [self.stove.id] * 3)
+
+    def test_get_readings_over_row_limit(self):
+        self.add_readings(0.5, 0.4)
+        with mock.patch('stoves.views.STOVE_READINGS_MAX_ROWS', 1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_readings_are_limited_across_archive_and_live_table(self):
+        self.add_readings(40, 30, 2, 1)
+        call_command('archive_stove_readings', stdout=io.StringIO())
+        start, end = timezone.now() - timedelta(days=50), timezone.now()
+        self.assertEqual(read_readings(self.build.id, start, end, limit=1)['temperature'].tolist(), [140])
+        self.assertEqual(read_readings(self.build.id, start, end, limit=3)['temperature'].tolist(), [140, 130, 102])
+        self.assertEqual(read_readings(self.build.id, start, end, self.stove.id, limit=2)['temperature'].tolist(),
+                         [140, 130])
+        with self.assertNumQueries(1):
+            readings = read_readings(self.build.id, start, end, limit=3)
+        self.assertEqual(len(readings['recorded_at']), 3)
+
+    def test_get_readings_of_building_from_other_community(self):
+        url = reverse('v1.0:stoves:building-readings', args=[self.community.id + 1, self.build.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BuildingSeriesAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        self.stove = Stove.objects.create(building=self.build, serial_number='SN-1')
+        self.start = timezone.now().replace(second=0, microsecond=0) - timedelta(hours=5)
+        StoveReading.objects.bulk_create([
+            StoveReading(stove=self.stove, building=self.build, power=step % 2 == 0, temperature=step % 7,
+                         recorded_at=self.start + timedelta(seconds=10 * step)) for step in range(1000)])
+        self.url = reverse('v1.0:stoves:building-series', args=[self.community.id, self.build.id])
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_series_is_downsampled_to_requested_points(self):
+        response = self.client.get(self.url, {'points': 100, 'start': self.start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((len(response.data['recorded_at']), len(response.data['value'])), (100, 100))
+        self.assertEqual(response.data['recorded_at'][0], self.start.timestamp())
+        self.assertEqual(max(response.data['value']), 6)
+
+    def test_usage_series_is_share_of_stoves_on(self):
+        response = self.client.get(self.url, {'metric': 'usage', 'points': 2000, 'start': self.start.isoformat()})
+        self.assertEqual(len(response.data['value']), 1000)
+        self.assertEqual(response.data['value'][:3], [1, 0, 1])
+
+    def test_get_series_over_row_limit(self):
+        with mock.patch('stoves.views.STOVE_SERIES_MAX_ROWS', 999):
+            response = self.client.get(self.url, {'start': self.start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_series_with_too_few_points(self):
+        response = self.client.get(self.url, {'points': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UsageHeatmapAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        Stove.objects.create(building=self.build, serial_number='SN-1')
+        Stove.objects.create(building=self.build, serial_number='SN-2')
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.building_url = reverse('v1.0:stoves:building-usage-heatmap', args=[self.community.id, self.build.id])
+        self.community_url = reverse('v1.0:stoves:community-usage-heatmap', args=[self.community.id])
+
+    def ingest(self, *items):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+        self.client.post(reverse('v1.0:stoves:telemetry-ingest'), ndjson(*items),
+                         content_type='application/x-ndjson')
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_batches_are_added_to_hour_of_week_counters(self):
+        # Sunday 23:00 and Monday 01:00 UTC, the second given with its offset.
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 180, 'timestamp': '2026-10-18T23:10:00Z'},
+                    {'stove': 'SN-2', 'power': False, 'temperature': 20, 'timestamp': '2026-10-18T23:20:00Z'})
+        self.ingest({'stove': 'SN-1', 'power': True, 'temperature': 180, 'timestamp': '2026-10-19T03:30:00+02:00'})
+        with self.assertNumQueries(4):
+            response = self.client.get(self.building_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['readings_count'][6][23], response.data['readings_count'][0][1]), (2, 1))
+        self.assertEqual(response.data['on_seconds'][6][23], 10)
+        self.assertEqual((response.data['usage'][6][23], response.data['usage'][0][1], response.data['usage'][0][0]),
+                         (0.5, 1, None))
+        response = self.client.get(self.community_url)
+        self.assertEqual(sum(map(sum, response.data['readings_count'])), 3)
+
+    def test_get_heatmap_of_building_without_readings(self):
+        self.ingest()
+        response = self.client.get(self.building_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['usage']), 7)
+        self.assertEqual(response.data['usage'][3], [None] * 24)
+
+    def test_get_heatmap_of_building_from_other_community(self):
+        self.ingest()
+        response = self.client.get(reverse('v1.0:stoves:building-usage-heatmap',
+                                           args=[self.community.id + 1, self.build.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StoveCommandAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.user1 = User.objects.create_user(email='user1@user1.user1', password='user1',
+                                              first_name='User1_first', last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1', safety_status=False)
+        self.other_build = Building.objects.create(community=self.community, name='building2', state='AL',
+                                                   address='address2', safety_status=False)
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.ack_url = reverse('v1.0:stoves:command-ack')
+        self.metrics_url = reverse('v1.0:stoves:command-metrics', args=[self.community.id])
+        Building.objects.filter(community=self.community).set_safety_status(True)
+        call_command('dispatch_stove_commands', '--once')
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_dispatched_commands_reach_transport(self):
+        delivered_ids = {command.id for command in get_transport().delivered}
+        self.assertTrue(set(StoveCommand.objects.values_list('id', flat=True)) <= delivered_ids)
+
+    def test_gateway_acknowledges_commands(self):
+        command = StoveCommand.objects.get(building=self.build)
+        other = StoveCommand.objects.get(building=self.other_build)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+        response = self.client.post(self.ack_url, {'ids': [command.id, other.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'acknowledged': [command.id]})
+        self.assertEqual(StoveCommand.objects.get(id=other.id).status, StoveCommand.DELIVERED)
+
+    def test_acknowledge_without_ids(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+        response = self.client.post(self.ack_url, {'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command_metrics_of_community(self):
+        StoveCommand.acknowledge(self.build.id, StoveCommand.objects.values_list('id', flat=True))
+        self.login('super@super.super', 'strong')
+        response = self.client.get(self.metrics_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['issued'], response.data['acknowledged'], response.data['unacknowledged']),
+                         (2, 1, 1))
+        self.assertIsNotNone(response.data['oldest_unacknowledged_seconds'])
+        self.assertGreaterEqual(response.data['ack_latency']['max'], 0)
+
+    def test_command_metrics_no_access_for_supervisor_not_contact_person(self):
+        self.login('user1@user1.user1', 'user1')
+        response = self.client.get(self.metrics_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GatewayDesiredStateAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.url = reverse('v1.0:stoves:desired-state')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+
+    def test_desired_state_newer_than_since_version_is_returned(self):
+        Building.objects.filter(id=self.build.id).set_safety_status(False)
+        response = self.client.get(self.url, {'since_version': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        command = StoveCommand.objects.get(building=self.build)
+        self.assertEqual(response.data, {'building': self.build.id, 'version': 2, 'safety_status': False,
+                                         'commands': [{'id': command.id, 'command': StoveCommand.MASTER_ON}]})
+
+    def test_current_since_version_is_not_modified(self):
+        response = self.client.get(self.url, {'since_version': 1})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_desired_state_without_gateway_key_is_unauthorized(self):
+        self.client.credentials()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AlertRulesTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.user1 = User.objects.create_user(email='user1@user1.user1', password='user1',
+                                              first_name='User1_first', last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1', safety_status=False)
+        self.stove1 = Stove.objects.create(building=self.build, serial_number='SN-1')
+        self.stove2 = Stove.objects.create(building=self.build, serial_number='SN-2')
+        self.gateway = Gateway.issue_for(self.build.id)
+        self.rules_url = reverse('v1.0:stoves:alert-rules', args=[self.community.id])
+        self.alerts_url = reverse('v1.0:stoves:alerts', args=[self.community.id])
+
+    def ingest(self, *items):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {self.gateway.key}')
+        self.client.post(reverse('v1.0:stoves:telemetry-ingest'), ndjson(*items),
+                         content_type='application/x-ndjson')
+        self.client.credentials()
+
+    def reading(self, serial, seconds, temperature, power=True):
+        return {'stove': serial, 'power': power, 'temperature': temperature, 'timestamp': 1792285200 + seconds}
+
+    def login(self, email, password):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': email, 'password': password})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+    def test_temperature_rule_fires_across_batches_and_resolves(self):
+        rule = AlertRule.objects.create(community=self.community, kind=AlertRule.TEMPERATURE_ABOVE, threshold=250,
+                                        duration=60)
+        self.ingest(self.reading('SN-1', 0, 260), self.reading('SN-1', 30, 270), self.reading('SN-2', 0, 300),
+                    self.reading('SN-2', 30, 200))
+        self.assertFalse(Alert.objects.exists())
+
+        self.ingest(self.reading('SN-1', 60, 280), self.reading('SN-1', 90, 290))
+        alert = Alert.objects.get()
+        self.assertEqual((alert.rule, alert.stove, alert.value), (rule, self.stove1, 290))
+        self.assertEqual(alert.triggered_at - alert.started_at, timedelta(seconds=60))
+        self.assertTrue(RecentActivity.objects.filter(activity=RecentActivity.ALERT, building=self.build,
+                                                      user=None).exists())
+
+        self.ingest(self.reading('SN-1', 120, 295))
+        self.assertEqual(Alert.objects.count(), 1)
+        self.ingest(self.reading('SN-1', 150, 100))
+        self.assertIsNotNone(Alert.objects.get().resolved_at)
+
+    def test_on_while_locked_rule_applies_to_locked_building_only(self):
+        AlertRule.objects.create(community=self.community, building=self.build, kind=AlertRule.ON_WHILE_LOCKED)
+        self.ingest(self.reading('SN-1', 0, 100))
+        self.assertFalse(Alert.objects.exists())
+        Building.objects.filter(id=self.build.id).set_safety_status(True)
+        self.ingest(self.reading('SN-1', 10, 100), self.reading('SN-2', 10, 20, power=False))
+        self.assertEqual(list(Alert.objects.values_list('stove', flat=True)), [self.stove1.id])
+
+    def test_create_rule_and_list_alerts(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.post(self.rules_url, {'kind': AlertRule.TEMPERATURE_ABOVE, 'threshold': 250,
+                                                     'duration': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.ingest(self.reading('SN-1', 0, 260))
+        self.login('super@super.super', 'strong')
+        response = self.client.get(self.alerts_url, {'open': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([alert['stove'] for alert in response.data['results']], [self.stove1.id])
+
+    def test_create_temperature_rule_without_threshold(self):
+        self.login('super@super.super', 'strong')
+        response = self.client.post(self.rules_url, {'kind': AlertRule.TEMPERATURE_ABOVE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_alerts_no_access_for_supervisor_not_contact_person(self):
+        self.login('user1@user1.user1', 'user1')
+        response = self.client.get(self.alerts_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UsageReportAPIViewTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='super@super.super', password='strong',
+                                                  first_name='Fsuper', last_name='Lastsuper')
+        self.user1 = User.objects.create_user(email='user1@user1.user1', password='user1',
+                                              first_name='User1_first', last_name='Last1', role=ProfileRoles.SUPERVISOR)
+        self.community = Community.objects.create(name='community1', state='AL', zip_code=1234, address='address1',
+                                                  contact_person=self.user, phone_number=1234567)
+        self.build = Building.objects.create(community=self.community, name='building1', state='AL',
+                                             address='address1')
+        self.other_build = Building.objects.create(community=self.community, name='building2', state='AL',
+                                                   address='address2')
+        Stove.objects.create(building=self.build, serial_number='SN-1')
+        gateway = Gateway.issue_for(self.build.id)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Gateway {gateway.key}')
+        # 360 readings with power on, 10 seconds apart: one hour on 2026-09-10.
+        self.client.post(reverse('v1.0:stoves:telemetry-ingest'), ndjson(*[
+            {'stove': 'SN-1', 'power': True, 'temperature': 150, 'timestamp': 1789034400 + 10 * i} for i in range(360)
+        ]), content_type='application/x-ndjson')
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'super@super.super', 'password': 'strong'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.url = reverse('v1.0:stoves:community-usage-report', args=[self.community.id])
+
+    def test_community_report_from_daily_rollups(self):
+        response = self.client.get(self.url, {'month': '2026-09'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual((data['on_hours'], data['energy_kwh'], data['readings_count']), (1, 2, 360))
+        self.assertEqual(data['days'], [{'day': '2026-09-10', 'on_hours': 1, 'energy_kwh': 2}])
+        self.assertEqual([building['building'] for building in data['buildings']], [self.build.id, self.other_build.id])
+
+    def test_finished_month_report_is_generated_once(self):
+        first = self.client.get(self.url, {'month': '2026-09'}).data['generated_at']
+        second = self.client.get(self.url, {'month': '2026-09'}).data['generated_at']
+        self.assertEqual(first, second)
+        self.assertEqual(UsageReport.objects.count(), 3)
+
+    def test_building_report(self):
+        url = reverse('v1.0:stoves:building-usage-report', args=[self.community.id, self.build.id])
+        response = self.client.get(url, {'month': '2026-09'})
+        self.assertEqual(response.data['data']['energy_kwh'], 2)
+        url = reverse('v1.0:stoves:building-usage-report', args=[self.community.id, 0])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_generate_reports_in_background(self):
+        call_command('generate_usage_reports', '--month', '2026-09', stdout=io.StringIO())
+        self.assertEqual(UsageReport.objects.filter(month='2026-09-01').count(), 3)
+
+    def test_report_of_unknown_community(self):
+        url = reverse('v1.0:stoves:community-usage-report', args=[0])
+        response = self.client.get(url, {'month': '2026-09'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': "There is no such community"})
+        self.assertFalse(UsageReport.objects.exists())
+
+    def test_report_with_wrong_month(self):
+        response = self.client.get(self.url, {'month': 'september'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_no_access_for_supervisor_not_contact_person(self):
+        res = self.client.post(reverse('v1.0:token_obtain_pair'), {'email': 'user1@user1.user1', 'password': 'user1'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SimulateStovesTestCase(LiveServerTestCase):
+    def test_simulated_gateways_report_telemetry_and_heartbeats(self):
+        out = io.StringIO()
+        call_command('simulate_stoves', '--url', self.live_server_url, '--buildings', '2', '--stoves', '3',
+                     '--duration', '1.5', '--interval', '0.5', '--heartbeat-every', '1', '--toggle-interval', '0',
+                     '--json', stdout=out)
+        report = json.loads(out.getvalue().splitlines()[-1])
+        self.assertGreater(report['telemetry']['count'], 0)
+        self.assertEqual(report['telemetry']['errors'], 0)
+        self.assertGreater(report['heartbeat']['count'], 0)
+        self.assertEqual(Stove.objects.filter(building__community__name='Load simulation').count(), 6)
+        self.assertTrue(StoveReading.objects.exists())
@@ -0,0 +1,34 @@
+from django.utils.module_loading import import_string
+
+from amity_api.settings import STOVE_COMMAND_TRANSPORT
+from .models import CommandDeliveryError
+
+
+class BaseTransport:
+    """Hands a command over to the gateway of its building; raises CommandDeliveryError on failure."""
+
+    def deliver(self, command):
+        raise NotImplementedError
+
+
+class LocalTransport(BaseTransport):
+    """Keeps delivered commands in memory. Used in tests and local runs."""
+
+    def __init__(self):
+        self.delivered = []
+        self.unreachable_buildings = set()
+
+    def deliver(self, command):
+        if command.building_id in self.unreachable_buildings:
+            raise CommandDeliveryError(f'Gateway of building {command.building_id} is unreachable.')
+        self.delivered.append(command)
+
+
+_transport = None
+
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        _transport = import_string(STOVE_COMMAND_TRANSPORT)()
+    return _transport
@@ -0,0 +1,37 @@
+from django.urls import path
+
+from .views import StoveViewSet, GatewayKeyAPIView, TelemetryIngestAPIView, BuildingTelemetryRollupAPIView, \
+    CommunityTelemetryRollupAPIView, GatewayCommandAckAPIView, CommunityCommandMetricsAPIView, \
+    HeartbeatAPIView, GatewayDesiredStateAPIView, AlertRulesAPIView, AlertRuleAPIView, AlertsAPIView, \
+    CommunityUsageReportAPIView, BuildingUsageReportAPIView, BuildingReadingsAPIView, \
+    BuildingSeriesAPIView, CommunityUsageHeatmapAPIView, BuildingUsageHeatmapAPIView
+
+app_name = 'stoves'
+
+urlpatterns = [
+  path('communities/<int:community_id>/buildings/<int:pk>/stoves/',
+       StoveViewSet.as_view({'post': 'create', 'get': 'list'}), name='stoves-list'),
+  path('communities/<int:community_id>/buildings/<int:pk>/gateway-key/', GatewayKeyAPIView.as_view(),
+       name='gateway-key'),
+  path('communities/<int:community_id>/buildings/<int:pk>/telemetry/', BuildingTelemetryRollupAPIView.as_view(),
+       name='building-telemetry'),
+  path('communities/<int:community_id>/buildings/<int:pk>/readings/', BuildingReadingsAPIView.as_view(),
+       name='building-readings'),
+  path('communities/<int:community_id>/buildings/<int:pk>/series/', BuildingSeriesAPIView.as_view(),
+       name='building-series'),
+  path('communities/<int:pk>/telemetry/', CommunityTelemetryRollupAPIView.as_view(), name='community-telemetry'),
+  path('communities/<int:community_id>/buildings/<int:pk>/usage-report/', BuildingUsageReportAPIView.as_view(),
+       name='building-usage-report'),
+  path('communities/<int:community_id>/buildings/<int:pk>/usage-heatmap/', BuildingUsageHeatmapAPIView.as_view(),
+       name='building-usage-heatmap'),
+  path('communities/<int:pk>/usage-heatmap/', CommunityUsageHeatmapAPIView.as_view(), name='community-usage-heatmap'),
+  path('communities/<int:pk>/usage-report/', CommunityUsageReportAPIView.as_view(), name='community-usage-report'),
+  path('communities/<int:pk>/command-metrics/', CommunityCommandMetricsAPIView.as_view(), name='command-metrics'),
+  path('communities/<int:pk>/alert-rules/', AlertRulesAPIView.as_view(), name='alert-rules'),
+  path('communities/<int:pk>/alert-rules/<int:rule_pk>/', AlertRuleAPIView.as_view(), name='alert-rule'),
+  path('communities/<int:pk>/alerts/', AlertsAPIView.as_view(), name='alerts'),
+  path('gateway/telemetry/', TelemetryIngestAPIView.as_view(), name='telemetry-ingest'),
+  path('gateway/heartbeat/', HeartbeatAPIView.as_view(), name='heartbeat'),
+  path('gateway/commands/ack/', GatewayCommandAckAPIView.as_view(), name='command-ack'),
+  path('gateway/desired-state/', GatewayDesiredStateAPIView.as_view(), name='desired-state'),
+]
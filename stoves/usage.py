@@ -0,0 +1,84 @@
+from django.db.models import F, Q
+
+from amity_api.settings import STOVE_USAGE_BASELINE_WEIGHT, STOVE_USAGE_MIN_SAMPLES, STOVE_LEFT_ON_FACTOR
+from buildings.models import Building
+from .alerts import record_alert_activities
+from .models import Alert, AlertRule, StoveUsageState
+
+
+def left_on_rule(building_id, community_id):
+    """The LEFT_ON rule of the building, or else the one of its community."""
+    return AlertRule.objects.filter(community=community_id, kind=AlertRule.LEFT_ON, is_active=True).\
+        filter(Q(building__isnull=True) | Q(building=building_id)).order_by(F('building').asc(nulls_last=True)).first()
+
+
+def new_state(stove_id):
+    return StoveUsageState(stove_id=stove_id, baseline=[0.0] * StoveUsageState.HOURS_IN_WEEK,
+                           baseline_samples=[0] * StoveUsageState.HOURS_IN_WEEK)
+
+
+def usual_session(state):
+    slot = StoveUsageState.hour_of_week(state.on_since)
+    if state.baseline_samples[slot] < STOVE_USAGE_MIN_SAMPLES:
+        return None
+    return state.baseline[slot]
+
+
+def is_left_on(state, moment, rule):
+    limit = rule.duration
+    if (usual := usual_session(state)) is not None:
+        limit = max(limit, (rule.threshold or STOVE_LEFT_ON_FACTOR) * usual)
+    return (moment - state.on_since).total_seconds() > limit
+
+
+def learn_session(state, moment):
+    slot = StoveUsageState.hour_of_week(state.on_since)
+    length = (moment - state.on_since).total_seconds()
+    samples = state.baseline_samples[slot]
+    state.baseline[slot] = length if not samples else \
+        state.baseline[slot] + STOVE_USAGE_BASELINE_WEIGHT * (length - state.baseline[slot])
+    state.baseline_samples[slot] = samples + 1
+
+
+def update_usage(rows, building_id):
+    """
+    Feeds a batch of reading rows to the usage state of their stoves, doing constant work per reading,
+    and raises LEFT_ON alerts for stoves on much longer than usual. Returns the raised alerts.
+    """
+    building = Building.objects.values('community_id', 'safety_status').get(id=building_id)
+    rule = left_on_rule(building_id, building['community_id'])
+    states = StoveUsageState.objects.in_bulk({row[0] for row in rows})
+    changed, alerts, open_alerts, resolved = {}, [], {}, []
+    for stove_id, _, recorded_at, power, _ in sorted(rows, key=lambda row: (row[0], row[2])):
+        state = states.get(stove_id) or states.setdefault(stove_id, new_state(stove_id))
+        if power and state.on_since is None:
+            state.on_since = recorded_at
+        elif power:
+            if not rule or state.alert_id or stove_id in open_alerts or not is_left_on(state, recorded_at, rule):
+                continue
+            state.alert = open_alerts[stove_id] = Alert(
+                rule=rule, stove_id=stove_id, building_id=building_id, community_id=building['community_id'],
+                started_at=state.on_since, triggered_at=recorded_at,
+                value=(recorded_at - state.on_since).total_seconds())
+            alerts.append(state.alert)
+        elif state.on_since is not None:
+            if stove_id in open_alerts:
+                open_alerts.pop(stove_id).resolved_at = recorded_at
+            elif state.alert_id:
+                resolved.append(Alert(id=state.alert_id, resolved_at=recorded_at))
+            else:
+                # Sessions that had to be flagged are not the usual pattern and stay out of the baseline.
+                learn_session(state, recorded_at)
+            state.on_since, state.alert = None, None
+        else:
+            continue
+        changed[stove_id] = state
+
+    created = [state for state in changed.values() if state._state.adding]
+    updated = [state for state in changed.values() if not state._state.adding]
+    Alert.objects.bulk_create(alerts)
+    Alert.objects.bulk_update(resolved, ['resolved_at'])
+    StoveUsageState.objects.bulk_create(created)
+    StoveUsageState.objects.bulk_update(updated, ['on_since', 'baseline', 'baseline_samples', 'alert'])
+    record_alert_activities(alerts, building['safety_status'])
+    return alerts
@@ -0,0 +1,322 @@
+from django.utils.decorators import method_decorator
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, mixins, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.viewsets import GenericViewSet
+
+from amity_api.pagination import AlertPagination
+from amity_api.permission import IsAmityAdministratorOrCommunityContactPerson, IsGateway
+from amity_api.settings import STOVE_INGEST_MAX_READINGS, STOVE_READINGS_MAX_ROWS, STOVE_SERIES_MAX_ROWS
+from .archive import read_readings
+from .downsampling import lttb, readings_series
+from .authentication import GatewayAuthentication
+from .ingest import ingest_readings
+from .mixins import BuildingPropertyMixin, TelemetryRollupMixin
+from .models import Gateway, Stove, BuildingTelemetryRollup, CommunityTelemetryRollup, StoveCommand, AlertRule, \
+    Alert, BuildingUsageHeatmap, CommunityUsageHeatmap
+from .parsers import NDJSONParser
+from .reports import get_report
+from .heartbeats import record_heartbeats
+from .desired_state import desired_state
+from .serializers import StoveSerializer, CommandMetricsQuerySerializer, CommandAckSerializer, HeartbeatSerializer, \
+    AlertRuleSerializer, AlertSerializer, UsageReportQuerySerializer, UsageReportSerializer, \
+    DesiredStateQuerySerializer, ReadingsQuerySerializer, SeriesQuerySerializer, UsageHeatmapSerializer
+
+
+@method_decorator(name='list', decorator=swagger_auto_schema(
+    operation_summary="List of building stoves"
+))
+@method_decorator(name='create', decorator=swagger_auto_schema(
+    operation_summary="Register stove in building"
+))
+class StoveViewSet(BuildingPropertyMixin, mixins.ListModelMixin, mixins.CreateModelMixin, GenericViewSet):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+    serializer_class = StoveSerializer
+
+    def get_queryset(self):
+        return Stove.objects.filter(building=self.kwargs['pk'], building__community=self.kwargs['community_id']).\
+            order_by('id')
+
+    def perform_create(self, serializer):
+        if not self.building_exists():
+            raise ValidationError({'error': "There is no such building"})
+        serializer.save(building_id=self.kwargs['pk'])
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    operation_summary="Issue new gateway key for building"
+))
+class GatewayKeyAPIView(BuildingPropertyMixin, APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def put(self, request, community_id, pk, *args, **kwargs):
+        if not self.building_exists():
+            return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        gateway = Gateway.issue_for(pk)
+        return Response({'key': gateway.key}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='post', decorator=swagger_auto_schema(
+    operation_summary="Ingest batch of stove readings (NDJSON) from building gateway"
+))
+class TelemetryIngestAPIView(APIView):
+    authentication_classes = (GatewayAuthentication,)
+    permission_classes = (IsGateway,)
+    parser_classes = (NDJSONParser,)
+
+    def post(self, request, *args, **kwargs):
+        lines = request.data
+        if len(lines) > STOVE_INGEST_MAX_READINGS:
+            return Response({'error': f'Batch can contain at most {STOVE_INGEST_MAX_READINGS} readings.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        rows, errors = ingest_readings(lines, request.auth.building_id)
+        return Response({'accepted': len(rows), 'rejected': len(errors), 'errors': errors}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='post', decorator=swagger_auto_schema(
+    operation_summary="Report stoves of building gateway that are alive",
+    request_body=HeartbeatSerializer
+))
+class HeartbeatAPIView(APIView):
+    authentication_classes = (GatewayAuthentication,)
+    permission_classes = (IsGateway,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = HeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stove_ids = list(Stove.objects.filter(building=request.auth.building_id,
+                                              serial_number__in=serializer.validated_data['stoves']).
+                         values_list('id', flat=True))
+        record_heartbeats(stove_ids)
+        return Response({'accepted': len(stove_ids)}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Desired state of building stoves for its gateway",
+    query_serializer=DesiredStateQuerySerializer
+))
+class GatewayDesiredStateAPIView(APIView):
+    """
+    Answers at once. Served over ASGI, requests with `since_version` that is still current are held
+    by realtime.asgi until the state changes.
+    """
+    authentication_classes = (GatewayAuthentication,)
+    permission_classes = (IsGateway,)
+
+    def get(self, request, *args, **kwargs):
+        serializer = DesiredStateQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        document = desired_state(request.auth.building_id)
+        if document['version'] <= serializer.validated_data['since_version']:
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return Response(document, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Stove usage aggregates of building for a time range"
+))
+class BuildingTelemetryRollupAPIView(BuildingPropertyMixin, TelemetryRollupMixin, APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, community_id, pk, *args, **kwargs):
+        if not self.building_exists():
+            return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        return self.rollups_response(BuildingTelemetryRollup.objects.filter(building=pk))
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Raw stove readings of building for a time range, in columns",
+    query_serializer=ReadingsQuerySerializer
+))
+class BuildingReadingsAPIView(BuildingPropertyMixin, APIView):
+    """Reads the archive for the part of the range it holds and the live table for the rest."""
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, community_id, pk, *args, **kwargs):
+        if not self.building_exists():
+            return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ReadingsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        # One row past the limit tells an oversized range without loading it.
+        readings = read_readings(pk, serializer.validated_data['start'], serializer.validated_data['end'],
+                                 serializer.validated_data.get('stove'), limit=STOVE_READINGS_MAX_ROWS + 1)
+        if len(readings['recorded_at']) > STOVE_READINGS_MAX_ROWS:
+            return Response({'error': f'Range holds more than {STOVE_READINGS_MAX_ROWS} readings, narrow it.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({column: values.tolist() for column, values in readings.items()}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Stove temperature or usage of building downsampled to a number of chart points",
+    query_serializer=SeriesQuerySerializer
+))
+class BuildingSeriesAPIView(BuildingPropertyMixin, APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, community_id, pk, *args, **kwargs):
+        if not self.building_exists():
+            return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = SeriesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        readings = read_readings(pk, data['start'], data['end'], data.get('stove'), limit=STOVE_SERIES_MAX_ROWS + 1)
+        if len(readings['recorded_at']) > STOVE_SERIES_MAX_ROWS:
+            return Response({'error': f'Range holds more than {STOVE_SERIES_MAX_ROWS} readings, narrow it.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        timestamps, values = readings_series(readings, data['metric'])
+        timestamps, values = lttb(timestamps, values, data['points'])
+        return Response({'metric': data['metric'], 'recorded_at': timestamps.tolist(),
+                         'value': values.round(3).tolist()}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Stove usage aggregates of community for a time range"
+))
+class CommunityTelemetryRollupAPIView(TelemetryRollupMixin, APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, *args, **kwargs):
+        return self.rollups_response(CommunityTelemetryRollup.objects.filter(community=pk))
+
+
+@method_decorator(name='post', decorator=swagger_auto_schema(
+    operation_summary="Acknowledge stove commands executed by building gateway",
+    request_body=CommandAckSerializer
+))
+class GatewayCommandAckAPIView(APIView):
+    authentication_classes = (GatewayAuthentication,)
+    permission_classes = (IsGateway,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = CommandAckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = StoveCommand.acknowledge(request.auth.building_id, serializer.validated_data['ids'])
+        return Response({'acknowledged': ids}, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Stove command delivery metrics of community",
+    query_serializer=CommandMetricsQuerySerializer
+))
+class CommunityCommandMetricsAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, *args, **kwargs):
+        serializer = CommandMetricsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(StoveCommand.delivery_metrics(pk, serializer.validated_data['since']),
+                        status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="List of community stove alert rules"
+))
+@method_decorator(name='post', decorator=swagger_auto_schema(
+    operation_summary="Create stove alert rule for community or one of its buildings"
+))
+class AlertRulesAPIView(generics.ListCreateAPIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+    serializer_class = AlertRuleSerializer
+
+    def get_queryset(self):
+        return AlertRule.objects.filter(community=self.kwargs['pk']).order_by('id')
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'community_id': self.kwargs['pk']}
+
+    def perform_create(self, serializer):
+        serializer.save(community_id=self.kwargs['pk'])
+
+
+@method_decorator(name='put', decorator=swagger_auto_schema(
+    operation_summary="Edit stove alert rule",
+    request_body=AlertRuleSerializer
+))
+@method_decorator(name='delete', decorator=swagger_auto_schema(
+    operation_summary="Delete stove alert rule"
+))
+class AlertRuleAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def put(self, request, pk, rule_pk, *args, **kwargs):
+        if not (rule := AlertRule.objects.filter(id=rule_pk, community=pk).first()):
+            return Response({'error': "There is no such rule."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = AlertRuleSerializer(rule, data=request.data, partial=True, context={'community_id': pk})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk, rule_pk, *args, **kwargs):
+        AlertRule.objects.filter(id=rule_pk, community=pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Stove alerts of community, newest first"
+))
+class AlertsAPIView(generics.ListAPIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+    serializer_class = AlertSerializer
+    pagination_class = AlertPagination
+
+    def get_queryset(self):
+        queryset = Alert.objects.filter(community=self.kwargs['pk'])
+        if self.request.query_params.get('open') == 'true':
+            queryset = queryset.filter(resolved_at__isnull=True)
+        return queryset
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Monthly stove usage and estimated energy of community",
+    query_serializer=UsageReportQuerySerializer
+))
+class CommunityUsageReportAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, *args, **kwargs):
+        serializer = UsageReportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        if not (report := get_report(pk, serializer.validated_data['month'])):
+            return Response({'error': "There is no such community"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UsageReportSerializer(report).data, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Monthly stove usage and estimated energy of building",
+    query_serializer=UsageReportQuerySerializer
+))
+class BuildingUsageReportAPIView(BuildingPropertyMixin, APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, community_id, pk, *args, **kwargs):
+        serializer = UsageReportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        if not (report := get_report(community_id, serializer.validated_data['month'], building_id=pk)):
+            return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UsageReportSerializer(report).data, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Usual stove usage of community per hour of the week"
+))
+class CommunityUsageHeatmapAPIView(APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, pk, *args, **kwargs):
+        heatmap = CommunityUsageHeatmap.objects.filter(community=pk).first() or CommunityUsageHeatmap(community_id=pk)
+        return Response(UsageHeatmapSerializer(heatmap).data, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_summary="Usual stove usage of building per hour of the week"
+))
+class BuildingUsageHeatmapAPIView(BuildingPropertyMixin, APIView):
+    permission_classes = (IsAmityAdministratorOrCommunityContactPerson,)
+
+    def get(self, request, community_id, pk, *args, **kwargs):
+        if not self.building_exists():
+            return Response({'error': "There is no such building"}, status=status.HTTP_400_BAD_REQUEST)
+        heatmap = BuildingUsageHeatmap.objects.filter(building=pk).first() or BuildingUsageHeatmap(building_id=pk)
+        return Response(UsageHeatmapSerializer(heatmap).data, status=status.HTTP_200_OK)
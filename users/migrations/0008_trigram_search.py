@@ -0,0 +1,22 @@
+# Generated by Django 4.1.1 on 2026-10-18 02:40
+
+import amity_api.db
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_alter_user_phone_number'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        amity_api.db.AddPostgresIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(amity_api.db.FullName()), name='gin_trgm_ops'), name='user_full_name_trgm'),
+        ),
+    ]
@@ -2,14 +2,17 @@ import random
 import time
 from string import digits
 from django.contrib.auth.models import AbstractBaseUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.mail import send_mail
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models.functions import Upper
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
 import rest_framework.authtoken.models
 
+from amity_api.db import FullName
 from amity_api.settings import EMAIL_HOST_USER, FRONT_END_NEW_PASSWORD_URL, VALID_EXTENSIONS
 from .choices_types import ProfileRoles
 from .managers import UserManager
@@ -39,6 +42,10 @@ class User(AbstractBaseUser):
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        # Serves `icontains` searches on FullName(), which compare UPPER() of it.
+        indexes = [GinIndex(OpClass(Upper(FullName()), name='gin_trgm_ops'), name='user_full_name_trgm')]
+
     def get_full_name(self):
         return f'{self.first_name} {self.last_name}'
 